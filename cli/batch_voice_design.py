@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+ボイスデザイン一括生成
+
+プロンプトシート（CSV）に書いた全キャラ分のボイス候補をまとめて生成し、
+候補の音声とメタデータを保存する。GUIで1キャラずつ待つ代わりに、生成後にまとめて試聴して選ぶ。
+
+プロンプトシートの列（1行目は見出し）:
+  character, description, guidance, sample_text, count
+  guidance（既定 2.0）/ sample_text（空欄なら自動生成。100文字以上）/ count（既定 3）は省略可
+
+出力（既定: output/voice_design/<シート名>/）:
+  <キャラ名>/01_<generated_voice_id>.mp3 ...   候補の音声
+  <キャラ名>/candidates.json                   プロンプト・seed・失敗した候補
+候補はすべて voice_design_log.jsonl にも記録される（voice_design_gui.py の履歴タブで試聴できる）。
+
+使い方:
+  python cli/batch_voice_design.py prompts.csv
+  python cli/batch_voice_design.py prompts.csv -j 3 --out output/voice_design/新章
+  python cli/batch_voice_design.py prompts.csv --dry-run     # シートの確認だけ
+
+.env に ELEVENLABS_BASE_URL を書くと API の接続先を差し替えられる（ローカルのスタブサーバーで試すとき）。
+"""
+import argparse
+import os
+import sys
+import time
+
+# プロジェクトルートをパスに追加（cli/ の1つ上）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.client import get_client
+from core.voice_design import BATCH_OUTPUT_DIR, MAX_PREVIEW_WORKERS, design_batch, read_prompt_sheet
+
+
+def main():
+    parser = argparse.ArgumentParser(description="プロンプトシートからボイス候補を一括生成")
+    parser.add_argument("sheet", help="プロンプトシート（CSV）")
+    parser.add_argument("--out", help="出力フォルダ（既定: output/voice_design/<シート名>）")
+    parser.add_argument("--concurrency", "-j", type=int, default=MAX_PREVIEW_WORKERS,
+                        help=f"全キャラ合計の同時リクエスト数（既定: {MAX_PREVIEW_WORKERS}）")
+    parser.add_argument("--dry-run", action="store_true", help="シートを読んで内容を表示するだけ")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.sheet):
+        print(f"エラー: ファイルが見つかりません: {args.sheet}")
+        sys.exit(1)
+
+    prompts, errors = read_prompt_sheet(args.sheet)
+    for message in errors:
+        print(f"⚠ {message}")
+    if not prompts:
+        print("エラー: 生成するキャラがありません")
+        sys.exit(1)
+
+    batch_name = os.path.splitext(os.path.basename(args.sheet))[0]
+    out_dir = args.out or os.path.join(BATCH_OUTPUT_DIR, batch_name)
+    total = sum(p.count for p in prompts)
+    print(f"プロンプトシート: {args.sheet}（{len(prompts)}キャラ / 候補 {total}件）")
+    for p in prompts:
+        sample = "自動生成" if p.sample_text is None else f"{len(p.sample_text)}文字"
+        print(f"  {p.char_name}: {p.count}種 guidance={p.guidance:.1f} サンプル={sample}")
+        print(f"    {p.description[:70]}{'...' if len(p.description) > 70 else ''}")
+    if args.dry_run:
+        return
+
+    client = get_client()
+    print(f"\n生成中...（同時 {args.concurrency}件）→ {out_dir}")
+    start = time.time()
+    results = design_batch(client, prompts, out_dir, concurrency=args.concurrency, batch_name=batch_name)
+    elapsed = time.time() - start
+
+    done = sum(len(r["candidates"]) for r in results)
+    print(f"\n完了: 候補 {done}/{total}件（{elapsed:.1f}秒）")
+    for r in results:
+        mark = "✓" if not r["errors"] else "⚠"
+        print(f"  {mark} {r['char_name']}: {len(r['candidates'])}件"
+              + (f"（失敗 {len(r['errors'])}件）" if r["errors"] else "") + f"  {r['dir']}")
+    if done < total:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+起動時間ベンチマーク
+
+各エントリポイントを新しいプロセスで何回か起動し、終了までの時間（最小・中央値）を表示する。
+CLI は --help、GUI は環境変数 STARTUP_BENCH=1 で起動して画面を作り終えたら閉じる。
+あわせて -X importtime で elevenlabs SDK / ymm4_generate を読み込んだかを表示する
+（--help や画面表示だけで読み込んでいたら遅延読み込みが効いていない）。
+
+使い方:
+  python cli/bench_startup.py                      # 全エントリポイント（各5回）
+  python cli/bench_startup.py -n 10 --no-gui       # CLIだけ10回ずつ
+  python cli/bench_startup.py --exe "dist/ElevenLabsGUI.exe"          # PyInstaller 版も計測
+  python cli/bench_startup.py --exe "dist/pipeline.exe --help"
+"""
+import argparse
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+# プロジェクトルート（cli/ の1つ上）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (表示名, スクリプト, 引数, GUIか)
+ENTRY_POINTS = [
+    ("generate.py --help", "generate.py", ["--help"], False),
+    ("pipeline.py --help", "pipeline.py", ["--help"], False),
+    ("cli/pipeline.py --help", os.path.join("cli", "pipeline.py"), ["--help"], False),
+    ("pronunciation_dict.py --help", "pronunciation_dict.py", ["--help"], False),
+    ("verify_voice.py --help", "verify_voice.py", ["--help"], False),
+    ("elevenlabs_gui.py", "elevenlabs_gui.py", [], True),
+    ("voice_design_gui.py", "voice_design_gui.py", [], True),
+]
+# 起動時に読み込まれていたら報告する重いモジュール
+HEAVY_MODULES = ("elevenlabs", "ymm4_generate", "pykakasi", "numpy")
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["STARTUP_BENCH"] = "1"
+    return env
+
+
+def time_command(cmd: list[str], runs: int) -> tuple[list[float], str | None]:
+    """cmd を runs 回起動して所要時間（秒）のリストを返す。失敗したらエラーメッセージ"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=PROJECT_ROOT, env=_env(),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            err = proc.stderr.decode("utf-8", "replace").strip().splitlines()
+            return times, err[-1] if err else f"終了コード {proc.returncode}"
+        times.append(elapsed)
+    return times, None
+
+
+def heavy_imports(script: str, args: list[str]) -> list[str]:
+    """-X importtime の出力から、読み込まれた重いモジュールを返す"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", script, *args],
+                          cwd=PROJECT_ROOT, env=_env(),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    loaded = set()
+    for line in proc.stderr.decode("utf-8", "replace").splitlines():
+        if not line.startswith("import time:"):
+            continue
+        module = line.rsplit("|", 1)[-1].strip()
+        top = module.split(".")[0]
+        if top in HEAVY_MODULES:
+            loaded.add(top)
+    return sorted(loaded)
+
+
+def print_row(name: str, times: list[float], error: str | None, heavy: list[str] | None = None):
+    if error:
+        print(f"  {name:<32} 失敗: {error[:60]}")
+        return
+    note = ""
+    if heavy is not None:
+        note = f"  読込: {', '.join(heavy)}" if heavy else "  読込: なし"
+    print(f"  {name:<32} 最小 {min(times) * 1000:7.0f}ms  中央値 {statistics.median(times) * 1000:7.0f}ms{note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="起動時間ベンチマーク")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="各エントリポイントの起動回数")
+    parser.add_argument("--no-gui", action="store_true", help="GUIを計測しない")
+    parser.add_argument("--exe", action="append", default=[],
+                        help="PyInstaller 版の実行ファイル（引数込みで引用符で囲む。複数指定可）")
+    args = parser.parse_args()
+
+    print(f"Python: {sys.executable}")
+    print(f"起動回数: {args.runs}回\n")
+    for name, script, script_args, is_gui in ENTRY_POINTS:
+        if is_gui and args.no_gui:
+            continue
+        times, error = time_command([sys.executable, script, *script_args], args.runs)
+        heavy = None if error else heavy_imports(script, script_args)
+        print_row(name, times, error, heavy)
+
+    if args.exe:
+        print("\nPyInstaller 版:")
+        for spec in args.exe:
+            cmd = shlex.split(spec, posix=os.name != "nt")
+            times, error = time_command(cmd, args.runs)
+            print_row(os.path.basename(cmd[0]) + (" " + " ".join(cmd[1:]) if cmd[1:] else ""),
+                      times, error)
+
+
+if __name__ == "__main__":
+    main()
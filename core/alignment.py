@@ -0,0 +1,76 @@
+"""文字単位タイムスタンプ（アライメント）の保存と読み込み
+
+config.json の "save_alignment": true で生成すると、convert_with_timestamps の応答から
+各文字の開始・終了秒を取り出し、MP3の隣に <ファイル名>.alignment.json として保存する。
+検証は verify/alignment_check.py がこのファイルだけで行う（音声認識APIを使わない）。
+"""
+import base64
+import json
+import os
+
+ALIGNMENT_SUFFIX = ".alignment.json"
+
+
+def alignment_path(mp3_path: str) -> str:
+    """MP3に対応するアライメントファイルのパス"""
+    return os.path.splitext(mp3_path)[0] + ALIGNMENT_SUFFIX
+
+
+def _field(obj, name: str):
+    """SDKのモデルと dict（JSON応答）の両方から値を取る"""
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def parse_timestamps_response(response) -> tuple[bytes, dict | None]:
+    """convert_with_timestamps の応答から (MP3バイト列, アライメント) を取り出す
+
+    アライメントは入力テキストに対するもの（alignment）を優先し、
+    なければ正規化後テキストのもの（normalized_alignment）を使う。
+    """
+    audio = base64.b64decode(_field(response, "audio_base_64") or b"")
+    source = _field(response, "alignment") or _field(response, "normalized_alignment")
+    if source is None:
+        return audio, None
+    alignment = {
+        "characters": list(_field(source, "characters") or []),
+        "starts": [float(t) for t in _field(source, "character_start_times_seconds") or []],
+        "ends": [float(t) for t in _field(source, "character_end_times_seconds") or []],
+    }
+    return audio, alignment
+
+
+def save_alignment(mp3_path: str, text: str, alignment: dict, script: str | None = None):
+    """アライメントを MP3 の隣に保存（送信したテキストも一緒に記録）
+
+    script: 台本のテキスト。発音ルールで書き換えて送った場合（text と異なる場合）だけ記録する
+    """
+    path = alignment_path(mp3_path)
+    tmp = path + ".tmp"
+    data = {"text": text, **alignment}
+    if script is not None and script != text:
+        data["script"] = script
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_alignment(mp3_path: str) -> dict | None:
+    """保存済みアライメント。なければ（壊れていれば）None"""
+    try:
+        with open(alignment_path(mp3_path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not all(k in data for k in ("characters", "starts", "ends")):
+        return None
+    return data
+
+
+def discard_alignment(mp3_path: str):
+    """古いアライメントを削除（タイムスタンプなしで作り直したMP3用）"""
+    try:
+        os.remove(alignment_path(mp3_path))
+    except FileNotFoundError:
+        pass
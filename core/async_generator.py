@@ -0,0 +1,321 @@
+"""asyncio 版の音声生成エンジン（AsyncElevenLabs クライアント使用）
+
+同期版 core.generator と同じファイル名・結果形式で、複数セリフを
+セマフォで並列数を制限しながら同時生成し、レスポンスをそのままディスクへ書き出す。
+
+CLI からは asyncio.run(process_dialogues_async(...))、
+Tk GUI からは AsyncLoopThread にコルーチンを投げて使う。
+"""
+import asyncio
+import inspect
+import os
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable
+
+from core.alignment import discard_alignment, parse_timestamps_response, save_alignment
+from core.audio_cache import AudioCache, audio_cache_key
+from core.client import REQUEST_TIMEOUT, get_async_client
+from core.generator import (
+    BROKEN_AUDIO_RETRIES,
+    BrokenAudioError,
+    build_context,
+    build_tts_kwargs,
+    dialogue_filename,
+    get_voice_id,
+    is_silence_text,
+    load_pronunciation_dict,
+    silence_seconds,
+    write_silence_file,
+)
+from core.mp3 import output_format_sample_rate, validate_file, validate_mp3
+from core.parser import DialogueLine
+from core.rewriter import format_hits, rewriter_from_config
+
+# 同時リクエスト数のデフォルト（config.json の "concurrency" で上書き）
+DEFAULT_CONCURRENCY = 4
+# リクエスト開始間隔の下限（秒）。同時に走らせるリクエストの開始を少しずつずらす
+# （同期版の delay=0.5 は1件終わるごとの待ち時間で、これとは別物）
+DEFAULT_MIN_INTERVAL = 0.1
+
+
+class AsyncRateLimiter:
+    """同時実行数の上限 + リクエスト開始間隔の下限をまとめたレート制限
+
+    async with limiter: で使う。ジョブサーバーでは全ジョブで1つを共有し、
+    複数ツールからの要求をまとめてクォータ内に収める。
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, min_interval: float = DEFAULT_MIN_INTERVAL):
+        self.concurrency = max(1, concurrency)
+        self.min_interval = min_interval
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._lock = asyncio.Lock()
+        self._last_start = 0.0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        try:
+            async with self._lock:
+                wait = self._last_start + self.min_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_start = time.monotonic()
+        except BaseException:
+            # 待っている間にキャンセルされると __aexit__ が呼ばれないので、枠はここで返す
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+
+
+async def _iter_audio(client, kwargs: dict):
+    """text_to_speech.convert のチャンクを非同期に返す
+
+    SDKのバージョンにより convert が async generator を直接返す場合と
+    コルーチンが async iterator を返す場合があるため両方に対応する。
+    """
+    stream = client.text_to_speech.convert(**kwargs)
+    if inspect.isawaitable(stream):
+        stream = await stream
+    async for chunk in stream:
+        yield chunk
+
+
+async def generate_audio_async(
+    client,
+    text: str,
+    voice_id: str,
+    model_id: str = "eleven_v3",
+    output_format: str = "mp3_44100_128",
+    language_code: str = "ja",
+    previous_text: str | None = None,
+    next_text: str | None = None,
+    pronunciation_dictionary_locators: list | None = None,
+) -> bytes:
+    """ElevenLabs APIで音声を生成（非同期版 generate_audio）"""
+    kwargs = build_tts_kwargs(
+        text, voice_id, model_id, output_format, language_code,
+        previous_text, next_text, pronunciation_dictionary_locators,
+    )
+    chunks = []
+    async for chunk in _iter_audio(client, kwargs):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def stream_audio_to_file_async(client, filepath: str, **tts_args) -> int:
+    """音声を生成しながらチャンクごとにファイルへ書き出す。書き込んだバイト数を返す。
+
+    途中で失敗しても壊れたMP3が残らないよう .part に書き、フレーム構造を検査してから置き換える。
+    壊れていれば BrokenAudioError。
+    """
+    kwargs = build_tts_kwargs(**tts_args)
+    sample_rate = output_format_sample_rate(tts_args.get("output_format", ""))
+    part_path = filepath + ".part"
+    written = 0
+    try:
+        with open(part_path, "wb") as f:
+            async for chunk in _iter_audio(client, kwargs):
+                # チャンクは数KB程度なのでループ内で同期書き込みしても待ちは無視できる
+                f.write(chunk)
+                written += len(chunk)
+        if sample_rate is not None:
+            ok, reason = validate_file(part_path, sample_rate)
+            if not ok:
+                raise BrokenAudioError(f"MP3破損: {reason}")
+        os.replace(part_path, filepath)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return written
+
+
+async def timestamps_to_file_async(client, filepath: str, script: str | None = None, **tts_args) -> int:
+    """音声と文字単位のタイムスタンプを生成し、MP3とアライメントを保存する。書き込んだバイト数を返す。
+
+    convert_with_timestamps は全体を1つのJSONで返すのでストリーミングせずに検査してから書く。
+    壊れていれば BrokenAudioError。script は書き換え前の台本（アライメントに記録する）。
+    """
+    kwargs = build_tts_kwargs(**tts_args)
+    response = await client.text_to_speech.convert_with_timestamps(**kwargs)
+    audio, alignment = parse_timestamps_response(response)
+    sample_rate = output_format_sample_rate(tts_args.get("output_format", ""))
+    if sample_rate is not None:
+        ok, reason = validate_mp3(audio, sample_rate)
+        if not ok:
+            raise BrokenAudioError(f"MP3破損: {reason}")
+    part_path = filepath + ".part"
+    with open(part_path, "wb") as f:
+        f.write(audio)
+    os.replace(part_path, filepath)
+    if alignment:
+        save_alignment(filepath, tts_args["text"], alignment, script=script)
+    else:
+        discard_alignment(filepath)
+    return len(audio)
+
+
+async def process_dialogues_async(
+    dialogues: list[DialogueLine],
+    config: dict,
+    client,
+    output_dir: str,
+    use_context: bool = True,
+    concurrency: int | None = None,
+    limiter: AsyncRateLimiter | None = None,
+    cache: AudioCache | None = None,
+    on_result: Callable[[dict], None] | None = None,
+) -> list[dict]:
+    """複数のセリフを並列に処理して音声生成（非同期版 process_dialogues）
+
+    結果リストは dialogues と同じ順序で返す。
+    limiter を渡すと呼び出し元と同時実行枠を共有する（ジョブサーバー用）。
+    cache を渡すと同一条件の音声はAPIを叩かずキャッシュから配置する。
+    config の save_alignment が真なら文字単位のタイムスタンプも取得して保存する。
+    on_result は1件終わるごとに結果dictで呼ばれる（進捗通知用）。
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    model_id = config.get("default_model", "eleven_v3")
+    output_format = config.get("default_output_format", "mp3_44100_128")
+    language_code = config.get("language_code", "ja")
+    with_alignment = config.get("save_alignment", False)
+    if limiter is None:
+        if concurrency is None:
+            concurrency = config.get("concurrency", DEFAULT_CONCURRENCY)
+        limiter = AsyncRateLimiter(concurrency)
+
+    # 発音ルール（ローカル適用が有効ならサーバーの発音辞書は使わない）
+    rewriter = rewriter_from_config(config)
+    pd_locators = None if rewriter else load_pronunciation_dict(config)
+    if rewriter:
+        print(f"発音ルールをローカルで適用します（{len(rewriter.rules)}件）")
+    elif pd_locators:
+        print("発音辞書を適用します")
+    print(f"並列生成: 最大{limiter.concurrency}件同時")
+
+    async def process_one(i: int, dialogue: DialogueLine) -> dict:
+        filename = dialogue_filename(dialogue)
+        filepath = output_path / filename
+        base = {"index": dialogue.index, "character": dialogue.character}
+
+        # 無音判定：APIを叩く前にチェック
+        if is_silence_text(dialogue.text):
+            seconds = silence_seconds(dialogue.text, config)
+            print(f"[{dialogue.index:03d}] {dialogue.character} → 無音 {seconds:g}秒")
+            if write_silence_file(str(filepath), seconds, config):
+                return {**base, "status": "success", "filepath": str(filepath), "silence": True}
+            return {**base, "status": "error", "reason": "無音ファイルの作成に失敗"}
+
+        voice_id = get_voice_id(dialogue.character, config)
+        if not voice_id:
+            print(f"[SKIP] voice_id not found: {dialogue.character}")
+            return {**base, "status": "skipped", "reason": "voice_id not found"}
+
+        previous_text, next_text = build_context(dialogues, i, model_id, use_context)
+        # キャッシュのキーは書き換え後のテキストで作る（辞書の版に左右されない）
+        text, hits = rewriter.rewrite(dialogue.text) if rewriter else (dialogue.text, [])
+        if hits:
+            base["rewrites"] = [h.original for h in hits]
+        tts_args = dict(
+            text=text,
+            voice_id=voice_id,
+            model_id=model_id,
+            output_format=output_format,
+            language_code=language_code,
+            previous_text=previous_text,
+            next_text=next_text,
+            pronunciation_dictionary_locators=pd_locators,
+        )
+
+        cache_key = audio_cache_key(**tts_args) if cache else None
+        if cache and cache.fetch_to(cache_key, str(filepath), with_alignment=with_alignment):
+            print(f"[{dialogue.index:03d}] {dialogue.character} → キャッシュから配置")
+            return {**base, "status": "success", "filepath": str(filepath), "cached": True}
+
+        print(f"[{dialogue.index:03d}] Generating: {dialogue.character} ({dialogue.char_count}字)...")
+        if hits:
+            print(f"    読み置換: {format_hits(hits)}")
+        for attempt in range(BROKEN_AUDIO_RETRIES + 1):
+            async with limiter:
+                try:
+                    if with_alignment:
+                        await timestamps_to_file_async(client, str(filepath), script=dialogue.text, **tts_args)
+                    else:
+                        await stream_audio_to_file_async(client, str(filepath), **tts_args)
+                        discard_alignment(str(filepath))
+                    break
+                except BrokenAudioError as e:
+                    if attempt == BROKEN_AUDIO_RETRIES:
+                        print(f"[ERROR] {dialogue.character}: {e}")
+                        return {**base, "status": "error", "reason": str(e)}
+                    print(f"    警告: #{dialogue.index} 壊れたMP3を受信しました。再生成します")
+                except Exception as e:
+                    print(f"[ERROR] {dialogue.character}: {e}")
+                    return {**base, "status": "error", "reason": str(e)}
+
+        if cache:
+            cache.store(cache_key, str(filepath))
+        print(f"    -> Saved: {filename}")
+        return {**base, "status": "success", "filepath": str(filepath)}
+
+    async def run_one(i: int, dialogue: DialogueLine) -> dict:
+        result = await process_one(i, dialogue)
+        if on_result:
+            on_result(result)
+        return result
+
+    tasks = [run_one(i, d) for i, d in enumerate(dialogues)]
+    return list(await asyncio.gather(*tasks))
+
+
+async def generate_with_new_client(
+    dialogues: list[DialogueLine],
+    config: dict,
+    output_dir: str,
+    use_context: bool = True,
+    concurrency: int | None = None,
+) -> list[dict]:
+    """実行中のイベントループ上でクライアントを作って process_dialogues_async を実行
+
+    接続プール（httpx.AsyncClient）は終わったら閉じる。
+    """
+    import httpx
+
+    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as http_client:
+        client = get_async_client(http_client)
+        return await process_dialogues_async(
+            dialogues, config, client, output_dir,
+            use_context=use_context, concurrency=concurrency,
+        )
+
+
+class AsyncLoopThread:
+    """専用スレッドでイベントループを回し、他スレッドからコルーチンを投入する
+
+    Tk のメインループをブロックせずに非同期生成を走らせるためのもの。
+    リクエストごとにOSスレッドを作らず、1本のループ上で並列に待つ。
+    """
+
+    def __init__(self, name: str = "elevenlabs-async"):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(self, coro) -> Future:
+        """コルーチンをループに投入し concurrent.futures.Future を返す"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def stop(self):
+        """ループを停止する（アプリ終了時）"""
+        self._loop.call_soon_threadsafe(self._loop.stop)
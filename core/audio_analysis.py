@@ -0,0 +1,224 @@
+"""音声解析（無音区間・ピーク・ラウドネス）
+
+MP3を1回だけ NumPy 配列にデコードし、10ms 窓の RMS/dBFS をベクトル演算でまとめて求める。
+結果はボイスフォルダの _manifest.json（sections["audio_analysis"]）にファイルの
+サイズ+更新時刻つきでキャッシュし、音声長チェック・末尾無音トリミング・音量チェックで共有する。
+
+ラウドネスは ITU-R BS.1770 のゲート付き積分。scipy があれば K特性フィルタをかけ、
+なければフィルタなし（LUFS近似）で計算する。
+"""
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+try:
+    from scipy.signal import lfilter
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+from core.manifest import RunManifest, file_fingerprint
+
+SECTION = "audio_analysis"
+# 解析時のサンプリングレート（ffmpeg でモノラル float32 に変換）
+ANALYSIS_SAMPLE_RATE = 44100
+# 無音判定の窓幅(ms)
+WINDOW_MS = 10
+# 既定の無音閾値(dBFS)
+DEFAULT_SILENCE_THRESH = -45
+# 完全無音の dB 値（-inf の代わり。JSON に保存するため）
+FLOOR_DB = -120.0
+# YMM4同梱のffmpeg（PATH になければこちらを使う）
+YMM4_FFMPEG = "D:/YukkuriMovieMaker4/user/resources/ffmpeg/ffmpeg.exe"
+
+
+def find_ffmpeg() -> str | None:
+    path = shutil.which("ffmpeg")
+    if path:
+        return path
+    return YMM4_FFMPEG if os.path.exists(YMM4_FFMPEG) else None
+
+
+def decode_audio(path: str) -> tuple["np.ndarray", int]:
+    """MP3をモノラル float32（-1.0〜1.0）にデコード"""
+    ffmpeg = find_ffmpeg()
+    if ffmpeg:
+        proc = subprocess.run(
+            [ffmpeg, "-v", "error", "-i", path, "-f", "f32le", "-ac", "1",
+             "-ar", str(ANALYSIS_SAMPLE_RATE), "-"],
+            capture_output=True, check=True,
+        )
+        return np.frombuffer(proc.stdout, dtype=np.float32), ANALYSIS_SAMPLE_RATE
+
+    from pydub import AudioSegment
+    seg = AudioSegment.from_mp3(path).set_channels(1)
+    scale = float(1 << (8 * seg.sample_width - 1))
+    samples = np.asarray(seg.get_array_of_samples(), dtype=np.float32) / scale
+    return samples, seg.frame_rate
+
+
+def _to_db(values: "np.ndarray") -> "np.ndarray":
+    return np.maximum(20 * np.log10(np.maximum(values, 1e-12)), FLOOR_DB)
+
+
+def _k_weighting_coeffs(sample_rate: int) -> list[tuple[list[float], list[float]]]:
+    """BS.1770 の K特性（高域シェルフ + 高域通過）の biquad 係数"""
+    # 高域シェルフ
+    gain_db, q, fc = 3.999843853973347, 0.7071752369554196, 1681.974450955533
+    a = 10 ** (gain_db / 40)
+    w0 = 2 * np.pi * fc / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    sqrt_a = np.sqrt(a)
+    shelf = (
+        [a * ((a + 1) + (a - 1) * cos_w0 + 2 * sqrt_a * alpha),
+         -2 * a * ((a - 1) + (a + 1) * cos_w0),
+         a * ((a + 1) + (a - 1) * cos_w0 - 2 * sqrt_a * alpha)],
+        [(a + 1) - (a - 1) * cos_w0 + 2 * sqrt_a * alpha,
+         2 * ((a - 1) - (a + 1) * cos_w0),
+         (a + 1) - (a - 1) * cos_w0 - 2 * sqrt_a * alpha],
+    )
+    # 高域通過
+    q, fc = 0.5003270373238773, 38.13547087602444
+    w0 = 2 * np.pi * fc / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    highpass = (
+        [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2],
+        [1 + alpha, -2 * cos_w0, 1 - alpha],
+    )
+    return [shelf, highpass]
+
+
+def integrated_loudness(samples: "np.ndarray", sample_rate: int) -> float:
+    """ゲート付き積分ラウドネス (LUFS)。400ms ブロック・75% オーバーラップ"""
+    y = samples.astype(np.float64)
+    if HAS_SCIPY:
+        for b, a in _k_weighting_coeffs(sample_rate):
+            y = lfilter(b, a, y)
+
+    block = int(0.4 * sample_rate)
+    step = int(0.1 * sample_rate)
+    if len(y) < block:
+        power = np.array([np.mean(y ** 2)]) if len(y) else np.array([0.0])
+    else:
+        csum = np.concatenate(([0.0], np.cumsum(y ** 2)))
+        starts = np.arange(0, len(y) - block + 1, step)
+        power = (csum[starts + block] - csum[starts]) / block
+
+    loud = -0.691 + 10 * np.log10(np.maximum(power, 1e-12))
+    gated = power[loud > -70.0]
+    if gated.size == 0:
+        return FLOOR_DB
+    relative = -0.691 + 10 * np.log10(np.mean(gated)) - 10.0
+    gated = power[(loud > -70.0) & (loud > relative)]
+    if gated.size == 0:
+        return FLOOR_DB
+    return float(max(-0.691 + 10 * np.log10(np.mean(gated)), FLOOR_DB))
+
+
+def analyze_samples(samples: "np.ndarray", sample_rate: int,
+                    silence_thresh: float = DEFAULT_SILENCE_THRESH) -> dict:
+    """デコード済み音声を解析する"""
+    duration_ms = int(round(len(samples) * 1000 / sample_rate))
+    win = max(1, sample_rate * WINDOW_MS // 1000)
+    n_windows = -(-len(samples) // win)  # 端数の窓も含める
+    padded = np.zeros(n_windows * win, dtype=np.float32)
+    padded[:len(samples)] = samples
+    frames = padded.reshape(n_windows, win)
+    rms_db = _to_db(np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1)))
+
+    loud_windows = np.flatnonzero(rms_db > silence_thresh)
+    if loud_windows.size:
+        content_start_ms = int(loud_windows[0]) * WINDOW_MS
+        content_end_ms = min((int(loud_windows[-1]) + 1) * WINDOW_MS, duration_ms)
+    else:
+        content_start_ms = duration_ms
+        content_end_ms = 0
+
+    return {
+        "duration_ms": duration_ms,
+        "peak_dbfs": round(float(_to_db(np.max(np.abs(samples)) if len(samples) else 0.0)), 2),
+        "rms_dbfs": round(float(_to_db(np.sqrt(np.mean(samples.astype(np.float64) ** 2))
+                                       if len(samples) else 0.0)), 2),
+        "loudness_lufs": round(integrated_loudness(samples, sample_rate), 2),
+        "k_weighted": HAS_SCIPY,
+        "leading_ms": content_start_ms,
+        "trailing_ms": duration_ms - content_end_ms,
+        "content_end_ms": content_end_ms,
+        "silence_thresh": silence_thresh,
+    }
+
+
+def analyze_file(path: str, silence_thresh: float = DEFAULT_SILENCE_THRESH) -> dict:
+    """MP3を1つ解析する（デコード失敗時は {"error": ...}）"""
+    try:
+        samples, sample_rate = decode_audio(path)
+    except Exception as e:
+        return {"error": str(e)}
+    return analyze_samples(samples, sample_rate, silence_thresh)
+
+
+def _analyze_job(args: tuple[str, float]) -> dict:
+    return analyze_file(*args)
+
+
+def analyze_files(
+    voice_dir: str,
+    files: list[str] | None = None,
+    silence_thresh: float = DEFAULT_SILENCE_THRESH,
+    workers: int | None = None,
+) -> dict[str, dict]:
+    """ボイスフォルダのMP3をまとめて解析し {ファイル名: 結果} を返す
+
+    マニフェストのキャッシュが有効（サイズ・更新時刻・閾値が同じ）なファイルは読み直さない。
+    未解析のファイルはプロセスプールで並列に解析する。
+    """
+    if not HAS_NUMPY:
+        raise ImportError("音声解析には numpy が必要です（pip install numpy）")
+
+    all_mp3s = sorted(f for f in os.listdir(voice_dir) if f.endswith(".mp3"))
+    if files is None:
+        names = all_mp3s
+    else:
+        existing = set(all_mp3s)
+        names = [f for f in files if f in existing]
+
+    manifest = RunManifest.load(voice_dir)
+    cache = manifest.section(SECTION)
+    results = {}
+    pending = []
+    for name in names:
+        fp = file_fingerprint(os.path.join(voice_dir, name))
+        cached = cache.get(name)
+        if cached and cached.get("fp") == fp and cached.get("silence_thresh") == silence_thresh:
+            results[name] = cached
+        else:
+            pending.append((name, fp))
+
+    if pending:
+        jobs = [(os.path.join(voice_dir, name), silence_thresh) for name, _ in pending]
+        if len(jobs) <= 2 or workers == 1:
+            analyzed = [_analyze_job(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                analyzed = list(pool.map(_analyze_job, jobs, chunksize=4))
+        for (name, fp), result in zip(pending, analyzed):
+            results[name] = result
+            if "error" not in result:
+                cache[name] = {"fp": fp, **result}
+
+    if files is None:
+        # 消えたファイルのキャッシュを掃除
+        for name in set(cache) - set(all_mp3s):
+            del cache[name]
+    if pending or files is None:
+        manifest.save()
+    return results
@@ -0,0 +1,94 @@
+"""生成済み音声のキャッシュ（内容アドレス方式）
+
+同じテキスト・ボイス・モデル・出力形式・発音辞書バージョンの組み合わせは
+同じ音声になる前提で、APIを叩かずにキャッシュからコピーする。
+"""
+import hashlib
+import json
+import os
+import shutil
+
+from core.alignment import alignment_path, discard_alignment
+from core.config import BASE_DIR
+
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, "output", ".audio_cache")
+
+
+def audio_cache_key(**tts_args) -> str:
+    """build_tts_kwargs と同じ引数からキャッシュキー（sha256）を作る
+
+    発音辞書ロケータは version_id 単位で区別する。
+    """
+    key_src = dict(tts_args)
+    locators = key_src.pop("pronunciation_dictionary_locators", None) or []
+    key_src["pronunciation_dictionaries"] = [
+        f"{getattr(loc, 'pronunciation_dictionary_id', '')}:{getattr(loc, 'version_id', '')}"
+        for loc in locators
+    ]
+    raw = json.dumps(key_src, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """キー → MP3 ファイルのキャッシュ。ハードリンクできればリンク、無理ならコピー。"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.mp3")
+
+    @staticmethod
+    def _place(src: str, dest_path: str):
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(src, dest_path)
+        except OSError:
+            shutil.copy2(src, dest_path)
+
+    def fetch_to(self, key: str, dest_path: str, with_alignment: bool = False) -> bool:
+        """キャッシュがあれば dest_path に配置して True
+
+        with_alignment=True ならアライメント（文字単位タイムスタンプ）もある場合だけ配置する。
+        """
+        src = self._path(key)
+        if not os.path.exists(src):
+            return False
+        src_alignment = alignment_path(src)
+        has_alignment = os.path.exists(src_alignment)
+        if with_alignment and not has_alignment:
+            return False
+        self._place(src, dest_path)
+        if has_alignment:
+            self._place(src_alignment, alignment_path(dest_path))
+        else:
+            discard_alignment(dest_path)
+        return True
+
+    def store(self, key: str, src_path: str):
+        """生成済みファイルをキャッシュに登録（アライメントがあれば一緒に）"""
+        dest = self._path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        src_alignment = alignment_path(src_path)
+        if os.path.exists(src_alignment) and not os.path.exists(alignment_path(dest)):
+            tmp = alignment_path(dest) + ".tmp"
+            shutil.copy2(src_alignment, tmp)
+            os.replace(tmp, alignment_path(dest))
+        if os.path.exists(dest):
+            return
+        tmp = dest + ".tmp"
+        shutil.copy2(src_path, tmp)
+        os.replace(tmp, dest)
+
+    def store_bytes(self, key: str, data: bytes):
+        """メモリ上の音声をキャッシュに登録"""
+        dest = self._path(key)
+        if os.path.exists(dest):
+            return
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = dest + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, dest)
@@ -0,0 +1,47 @@
+"""時間のかかる処理を別スレッドで動かし、経過をイベントとして受け渡す（GUI非依存）
+
+GUI は start() したあと after() で poll() を繰り返し、届いたイベントをまとめて画面に反映する。
+処理側は emit でログ・進捗を送るだけなので、Tk のウィジェットに触れない。
+"""
+import queue
+import threading
+from typing import Callable
+
+
+class BackgroundJob:
+    """fn(emit) を別スレッドで実行する
+
+    emit(kind, payload) で送ったイベントと、終了時の ("result", 戻り値) または
+    ("error", 例外) が poll() で取り出せる。
+    """
+
+    def __init__(self, fn: Callable[[Callable[[str, object], None]], object]):
+        self._fn = fn
+        self._events: queue.SimpleQueue = queue.SimpleQueue()
+        self.finished = False
+
+    def start(self) -> "BackgroundJob":
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def _emit(self, kind: str, payload=None):
+        self._events.put((kind, payload))
+
+    def _run(self):
+        try:
+            self._emit("result", self._fn(self._emit))
+        except Exception as e:
+            self._emit("error", e)
+
+    def poll(self, max_events: int = 1000) -> list[tuple[str, object]]:
+        """届いているイベントを最大 max_events 件取り出す（待たない）"""
+        events = []
+        while len(events) < max_events:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] in ("result", "error"):
+                self.finished = True
+            events.append(event)
+        return events
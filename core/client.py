@@ -3,14 +3,48 @@ import os
 
 from core.config import BASE_DIR
 
+# 1リクエストのタイムアウト（秒）。SDK が自分で httpx クライアントを作るときの既定値と同じ
+REQUEST_TIMEOUT = 240.0
 
-def get_client():
-    """dotenv 読込 + ElevenLabs クライアント初期化。APIキーなしは RuntimeError。"""
+
+def _load_api_key() -> str:
+    """dotenv 読込 + APIキー取得。APIキーなしは RuntimeError。"""
     from dotenv import load_dotenv
-    from elevenlabs.client import ElevenLabs
 
     load_dotenv(os.path.join(BASE_DIR, ".env"))
     api_key = os.getenv("ELEVENLABS_API_KEY")
     if not api_key:
         raise RuntimeError("ELEVENLABS_API_KEY が .env に設定されていません")
-    return ElevenLabs(api_key=api_key)
+    return api_key
+
+
+def _client_kwargs() -> dict:
+    """クライアントの引数。ELEVENLABS_BASE_URL があれば API の接続先を差し替える（ローカルのスタブサーバーなど）"""
+    kwargs = {"api_key": _load_api_key()}
+    base_url = os.getenv("ELEVENLABS_BASE_URL")
+    if base_url:
+        kwargs["base_url"] = base_url
+    return kwargs
+
+
+def get_client():
+    """dotenv 読込 + ElevenLabs クライアント初期化。APIキーなしは RuntimeError。"""
+    from elevenlabs.client import ElevenLabs
+
+    return ElevenLabs(**_client_kwargs())
+
+
+def get_async_client(httpx_client=None):
+    """dotenv 読込 + AsyncElevenLabs クライアント初期化。APIキーなしは RuntimeError。
+
+    httpx の非同期クライアントはイベントループに紐づくため、
+    実際に使うループ内（コルーチン内）で呼ぶこと。
+    httpx_client（httpx.AsyncClient）を渡すとその接続プールを使う。閉じるのは呼び出し側。
+    """
+    from elevenlabs.client import AsyncElevenLabs
+
+    kwargs = _client_kwargs()
+    if httpx_client is not None:
+        # 自前の httpx クライアントでは SDK 既定のタイムアウトが付かないので明示する
+        kwargs.update(httpx_client=httpx_client, timeout=REQUEST_TIMEOUT)
+    return AsyncElevenLabs(**kwargs)
@@ -1,24 +1,128 @@
-"""設定ファイル (config.json) の読み書き"""
+"""設定ファイル (config.json) の読み書き
+
+読み込みはファイルのサイズ+更新時刻が変わるまでメモリ上のスナップショットを使い回し、
+呼び出し元には毎回コピーを返す（書き換えても他の呼び出し元に影響しない）。
+
+書き込みは一時ファイルに書いてから置き換えるので、途中で落ちても config.json が壊れない。
+書き込み中は config.json.lock でロックし（GUIのスレッド同士・別プロセスのツール同士）、
+character_voices はディスク上の最新の内容とマージして書く。別スレッドが先に追加した
+キャラの voice_id を古いスナップショットで上書きして消すことがない。
+"""
+import copy
 import json
 import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # プロジェクトルート（core/ の1つ上）
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# パス → (サイズ+更新時刻, 内容)
+_snapshots: dict[str, tuple[tuple, dict]] = {}
+_thread_lock = threading.RLock()
 
-def load_config(config_path: str = None) -> dict:
-    """config.json を読み込む。config_path 省略時はプロジェクトルートの config.json。"""
+
+def _default_path(config_path: str | None) -> str:
     if config_path is None:
         config_path = os.path.join(BASE_DIR, "config.json")
-    if not os.path.exists(config_path):
-        return {}
-    with open(config_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return os.path.abspath(config_path)
 
 
-def save_config(config: dict, config_path: str = None):
-    """config.json を保存する。"""
-    if config_path is None:
-        config_path = os.path.join(BASE_DIR, "config.json")
-    with open(config_path, "w", encoding="utf-8") as f:
+def _stat_key(path: str) -> tuple | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+@contextmanager
+def _locked(path: str):
+    """同じプロセスのスレッド間 + プロセス間の排他ロック"""
+    with _thread_lock:
+        with open(path + ".lock", "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read(path: str) -> dict:
+    """スナップショットを返す（ファイルが変わっていれば読み直す）。コピーしないので書き換え禁止"""
+    with _thread_lock:
+        key = _stat_key(path)
+        if key is None:
+            _snapshots.pop(path, None)
+            return {}
+        cached = _snapshots.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        _snapshots[path] = (key, data)
+        return data
+
+
+def _write(path: str, config: dict):
+    """一時ファイルに書いて置き換える（ロックは呼び出し元で取る）"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(config, f, ensure_ascii=False, indent=4)
+    os.replace(tmp, path)
+    _snapshots[path] = (_stat_key(path), copy.deepcopy(config))
+
+
+def load_config(config_path: str = None) -> dict:
+    """config.json を読み込む。config_path 省略時はプロジェクトルートの config.json。"""
+    return copy.deepcopy(_read(_default_path(config_path)))
+
+
+def save_config(config: dict, config_path: str = None):
+    """config.json を保存する。
+
+    character_voices はディスク上の内容とマージする（config にないキャラは残す）。
+    キャラを削除するときは update_config を使う。
+    """
+    path = _default_path(config_path)
+    with _locked(path):
+        current = _read(path)
+        merged = dict(config)
+        if "character_voices" in config or "character_voices" in current:
+            merged["character_voices"] = {
+                **current.get("character_voices", {}),
+                **config.get("character_voices", {}),
+            }
+        _write(path, merged)
+
+
+def update_config(mutate, config_path: str = None) -> dict:
+    """ロックしたまま最新の config.json を読み、mutate(config) で書き換えて保存する。保存後の内容を返す"""
+    path = _default_path(config_path)
+    with _locked(path):
+        config = copy.deepcopy(_read(path))
+        mutate(config)
+        _write(path, config)
+        return copy.deepcopy(config)
+
+
+def set_character_voices(voices: dict[str, str], config_path: str = None) -> dict:
+    """キャラ → voice_id を追加・更新して保存する。保存後の内容を返す"""
+    return update_config(
+        lambda config: config.setdefault("character_voices", {}).update(voices),
+        config_path,
+    )
@@ -1,5 +1,12 @@
 """CSV読み込み・整合性チェック"""
 import csv
+import os
+
+
+def file_key(path: str) -> tuple[str, int, int]:
+    """結果をキャッシュするときのキー (絶対パス, サイズ, 更新時刻)。ファイルが変わればキーも変わる"""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
 
 
 def read_csv_rows(filepath: str) -> list[dict]:
@@ -62,3 +69,18 @@ def check_csv_alignment(split_path: str, elevenlabs_path: str) -> tuple[bool, li
         ok = True
 
     return ok, messages
+
+
+# (_split.csv のキー, _elevenlabs.csv のキー) → 結果
+_alignment_cache: dict[tuple, tuple[bool, list[str]]] = {}
+
+
+def check_csv_alignment_cached(split_path: str, elevenlabs_path: str) -> tuple[bool, list[str]]:
+    """check_csv_alignment の結果を、どちらかのファイルが変わるまで使い回す"""
+    key = (file_key(split_path), file_key(elevenlabs_path))
+    cached = _alignment_cache.get(key)
+    if cached is None:
+        cached = check_csv_alignment(split_path, elevenlabs_path)
+        _alignment_cache.clear()   # 直近の組み合わせだけ持てば十分
+        _alignment_cache[key] = cached
+    return cached
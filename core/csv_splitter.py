@@ -1,7 +1,12 @@
 """CSV複数キャラ行分割ロジック（GUI非依存）"""
 import csv
+from typing import Callable
 
 from core.char_normalize import EXCLUDE_NAMES, normalize_char_name
+from core.csv_io import file_key
+
+# progress を呼ぶ間隔（入力行数）
+PROGRESS_EVERY = 500
 
 # グループ名 → メンバー展開マッピング
 # パイプライン実行時に毎回確認すること（台本によってメンバーが異なる場合がある）
@@ -11,9 +16,17 @@ GROUP_EXPAND = {
 }
 
 
-def split_multi_character_rows(input_path: str, apply_normalization: bool = True):
+def split_multi_character_rows(
+    input_path: str,
+    apply_normalization: bool = True,
+    log: Callable[[str], None] = print,
+    progress: Callable[[int], None] | None = None,
+):
     """CSVを読み込み、A列に複数キャラがある行を分割し、除外対象を削除する
 
+    log: 分割・除外・展開した行の報告先
+    progress: PROGRESS_EVERY 行ごとに読み込んだ行数を渡す
+
     Returns: (rows, split_count, exclude_count, normalize_count)
     """
     rows = []
@@ -28,6 +41,8 @@ def split_multi_character_rows(input_path: str, apply_normalization: bool = True
         rows.append(['連番'] + header)
 
         for row_num, row in enumerate(reader, start=2):
+            if progress and row_num % PROGRESS_EVERY == 0:
+                progress(row_num - 1)
             if not row or not row[0].strip():
                 continue
 
@@ -51,7 +66,7 @@ def split_multi_character_rows(input_path: str, apply_normalization: bool = True
                     for char in characters:
                         if char in GROUP_EXPAND:
                             expanded.extend(GROUP_EXPAND[char])
-                            print(f'  行{row_num}: {char} → {", ".join(GROUP_EXPAND[char])} に展開')
+                            log(f'  行{row_num}: {char} → {", ".join(GROUP_EXPAND[char])} に展開')
                         else:
                             expanded.append(char)
                     characters = expanded
@@ -62,7 +77,7 @@ def split_multi_character_rows(input_path: str, apply_normalization: bool = True
                     for char in characters:
                         if char in EXCLUDE_NAMES:
                             exclude_count += 1
-                            print(f'  行{row_num}: 除外 ({char})')
+                            log(f'  行{row_num}: 除外 ({char})')
                             continue
                         if apply_normalization:
                             normalized = normalize_char_name(char)
@@ -74,12 +89,12 @@ def split_multi_character_rows(input_path: str, apply_normalization: bool = True
                         serial_number += 1
 
                     split_count += 1
-                    print(f'  行{row_num}: {len(characters)}キャラに分割 ({", ".join(characters)})')
+                    log(f'  行{row_num}: {len(characters)}キャラに分割 ({", ".join(characters)})')
                     continue
 
             if char_name in EXCLUDE_NAMES:
                 exclude_count += 1
-                print(f'  行{row_num}: 除外 ({char_name})')
+                log(f'  行{row_num}: 除外 ({char_name})')
                 continue
 
             # 単独グループ名の展開
@@ -87,7 +102,7 @@ def split_multi_character_rows(input_path: str, apply_normalization: bool = True
                 members = GROUP_EXPAND[char_name]
                 serif = row[1] if len(row) > 1 else ''
                 rest = row[2:] if len(row) > 2 else []
-                print(f'  行{row_num}: {char_name} → {", ".join(members)} に展開')
+                log(f'  行{row_num}: {char_name} → {", ".join(members)} に展開')
                 for member in members:
                     if apply_normalization:
                         normalized = normalize_char_name(member)
@@ -111,3 +126,38 @@ def split_multi_character_rows(input_path: str, apply_normalization: bool = True
             serial_number += 1
 
     return rows, split_count, exclude_count, normalize_count
+
+
+# (パス, サイズ, 更新時刻, 正規化するか) → (結果, ログ)
+_split_cache: dict[tuple, tuple[tuple, list[str]]] = {}
+
+
+def split_cached(
+    input_path: str,
+    apply_normalization: bool = True,
+    log: Callable[[str], None] = print,
+    progress: Callable[[int], None] | None = None,
+):
+    """split_multi_character_rows の結果をファイルが変わるまで使い回す（ログも再生する）
+
+    Returns: (rows, split_count, exclude_count, normalize_count)。rows は書き換えないこと
+    """
+    key = (*file_key(input_path), apply_normalization)
+    cached = _split_cache.get(key)
+    if cached is None:
+        lines = []
+
+        def record(message: str):
+            lines.append(message)
+            log(message)
+
+        result = split_multi_character_rows(input_path, apply_normalization, record, progress)
+        # 同じファイルの古い結果は捨てる
+        for old in [k for k in _split_cache if k[0] == key[0]]:
+            del _split_cache[old]
+        _split_cache[key] = (result, lines)
+        return result
+    result, lines = cached
+    for message in lines:
+        log(message)
+    return result
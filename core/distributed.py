@@ -0,0 +1,122 @@
+"""分散生成のワーカー / コーディネーター処理
+
+同じ共有フォルダ（voice_base_dir_win 配下のプロジェクトフォルダ）を見ている
+複数マシンで動かす。1台でも複数プロセスを立てれば同じ動作を確認できる。
+"""
+import os
+import time
+
+from core.manifest import RunManifest, worker_manifest_name
+from core.parser import DialogueLine
+from core.work_queue import WorkQueue
+
+# キューが空のときの待ち間隔（秒）
+POLL_INTERVAL = 2.0
+
+
+def run_worker(
+    queue: WorkQueue,
+    config: dict,
+    client,
+    output_dir: str,
+    worker_id: str,
+    batch: int = 1,
+    generate_fn=None,
+    stop_when_empty: bool = True,
+) -> list[dict]:
+    """キューからタスクを取り続けて生成する。取れるタスクがなくなったら終了。
+
+    コーディネーターが実行を開始する（populate する）まではタスクを取らずに待ち、
+    参加した実行の全タスクが終わるか、その実行が終了したら戻る。
+
+    generate_fn(dialogues, config, client, output_dir) -> results を差し替え可能
+    （既定は core.generator.process_dialogues、コンテキストなし）。
+    結果はワーカー用マニフェスト _manifest.<worker_id>.json にも随時書き出す。
+    """
+    if generate_fn is None:
+        from core.generator import process_dialogues
+
+        def generate_fn(dialogues, config, client, output_dir):
+            return process_dialogues(dialogues, config, client, output_dir, use_context=False, delay=0)
+
+    manifest = RunManifest.load(output_dir, worker_manifest_name(worker_id))
+    all_results = []
+    run_id = None
+    waiting = False
+    while True:
+        if run_id is None:
+            run_id = queue.current_run()
+            if run_id is None:
+                # コーディネーターの登録待ち（前回の実行が残っていても取らない）
+                if not waiting:
+                    print(f"[{worker_id}] コーディネーターのタスク登録を待っています")
+                    waiting = True
+                time.sleep(POLL_INTERVAL)
+                continue
+        tasks = queue.claim(worker_id, batch=batch)
+        if not tasks:
+            if stop_when_empty and (queue.is_finished() or queue.current_run() != run_id):
+                break
+            # 他ワーカーの処理中タスクがリース切れになる可能性があるので待つ
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        for d in tasks:
+            results = generate_fn([d], config, client, output_dir)
+            # 完了報告より先にマニフェストを書く（コーディネーターの統合に間に合わせる）
+            manifest.record_results(results, [d], worker=worker_id)
+            manifest.save()
+            for r in results:
+                queue.complete(worker_id, r)
+            all_results.extend(results)
+            queue.renew(worker_id, [t.index for t in tasks])
+
+    print(f"[{worker_id}] ワーカー終了: {len(all_results)}件処理")
+    return all_results
+
+
+def run_coordinator(
+    queue: WorkQueue,
+    dialogues: list[DialogueLine],
+    config: dict,
+    client,
+    output_dir: str,
+    worker_id: str,
+    work: bool = True,
+    reset: bool = False,
+    generate_fn=None,
+) -> list[dict]:
+    """タスクを登録し（自分も処理しつつ）全タスクの完了を待って結果を返す
+
+    完了後、各ワーカーのマニフェストを _manifest.json に統合し、実行を終了にする。
+    """
+    added = queue.populate(dialogues, reset=reset)
+    print(f"  キュー: {queue.db_path}")
+    print(f"  タスク登録: {added}件（全{len(dialogues)}件）")
+
+    try:
+        if work:
+            run_worker(queue, config, client, output_dir, worker_id, generate_fn=generate_fn)
+
+        last = None
+        while not queue.is_finished():
+            counts = queue.counts()
+            if counts != last:
+                print(f"  待機中: {counts}")
+                last = counts
+            time.sleep(POLL_INTERVAL)
+    finally:
+        queue.close_run()
+
+    manifest = RunManifest.load(output_dir)
+    merged = manifest.merge_worker_manifests(output_dir)
+    manifest.save()
+    print(f"  マニフェスト統合: {merged}ワーカー分 → {os.path.basename(manifest.path)}")
+
+    results = queue.results()
+    done = {r["index"] for r in results}
+    for d in dialogues:
+        if d.index not in done:
+            results.append({"index": d.index, "character": d.character,
+                            "status": "error", "reason": "分散生成で未完了（試行上限）"})
+    return sorted(results, key=lambda r: r["index"])
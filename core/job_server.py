@@ -0,0 +1,330 @@
+"""ローカル ジョブサーバー（GUI / CLI 共通の生成キュー）
+
+常駐プロセスが ElevenLabs クライアント・レート制限・音声キャッシュ・ジョブキューを持ち、
+GUI や CLI は HTTP (127.0.0.1) でジョブを投げて進捗を購読するだけの薄いクライアントになる。
+複数ツールを同時に動かしても同時実行枠を1つに集約するのでクォータを取り合わない。
+
+エンドポイント:
+  GET  /health                              生存確認
+  POST /jobs                                ジョブ投入 → {"job_id": ...}
+  GET  /jobs/<id>/events?since=N&timeout=S  進捗イベントのロングポーリング
+"""
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.parser import DialogueLine
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# ロングポーリングの最大待ち時間（秒）
+MAX_POLL_TIMEOUT = 60.0
+# 終わったジョブを残しておく時間（秒）と件数。超えたら古いものから捨てる
+JOB_TTL = 3600.0
+MAX_FINISHED_JOBS = 200
+
+
+class JobLostError(RuntimeError):
+    """サーバーにジョブがない（再起動した・終わったジョブが掃除された）"""
+
+
+def server_address(config: dict) -> tuple[str, int]:
+    """config.json の job_server セクションから (host, port) を取得"""
+    js = config.get("job_server", {})
+    return js.get("host", DEFAULT_HOST), int(js.get("port", DEFAULT_PORT))
+
+
+# ══════════════════════════════════════════════════════════════════
+# サーバー
+# ══════════════════════════════════════════════════════════════════
+
+class JobServer:
+    """ジョブキューと生成ランタイム（クライアント・レート制限・キャッシュ）を保持する"""
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        concurrency: int | None = None,
+        cache_dir: str | None = None,
+    ):
+        from core.async_generator import AsyncLoopThread, DEFAULT_CONCURRENCY
+        from core.audio_cache import AudioCache, DEFAULT_CACHE_DIR
+
+        self.host = host
+        self.port = port
+        self.concurrency = concurrency or DEFAULT_CONCURRENCY
+        self.cache = AudioCache(cache_dir or DEFAULT_CACHE_DIR)
+        self.jobs: dict[str, dict] = {}
+        self._cond = threading.Condition()
+        self._loop = AsyncLoopThread("job-server")
+        self._client = None
+        self._limiter = None
+        self._httpd = None
+
+    # ── ジョブ管理 ──
+
+    def submit(self, payload: dict) -> str:
+        """ジョブを登録してイベントループに投入し、job_id を返す
+
+        必須キー（dialogues / config / output_dir）が欠けていれば何も登録せず ValueError。
+        """
+        for key, kind in (("dialogues", list), ("config", dict), ("output_dir", str)):
+            if not isinstance(payload.get(key), kind):
+                raise ValueError(f"{key} がないか形式が違います")
+        dialogues = [DialogueLine(**d) for d in payload["dialogues"]]
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "total": len(dialogues),
+            "events": [],
+            "results": None,
+            "error": None,
+            "created": time.time(),
+        }
+        with self._cond:
+            self._prune()
+            self.jobs[job_id] = job
+        self._loop.submit(self._run_job(job, dialogues, payload))
+        print(f"[job {job_id}] 受付: {len(dialogues)}件 → {payload['output_dir']}")
+        return job_id
+
+    async def _ensure_runtime(self):
+        """クライアントとレート制限はループ上で1度だけ作り、全ジョブで共有する"""
+        if self._client is None:
+            from core.async_generator import AsyncRateLimiter
+            from core.client import get_async_client
+            self._client = get_async_client()
+            self._limiter = AsyncRateLimiter(self.concurrency)
+
+    async def _run_job(self, job: dict, dialogues: list[DialogueLine], payload: dict):
+        from core.async_generator import process_dialogues_async
+
+        self._update(job, status="running")
+        try:
+            await self._ensure_runtime()
+            results = await process_dialogues_async(
+                dialogues,
+                payload["config"],
+                self._client,
+                payload["output_dir"],
+                use_context=payload.get("use_context", True),
+                limiter=self._limiter,
+                cache=self.cache,
+                on_result=lambda r: self._push_event(job, {"type": "result", **r}),
+            )
+            self._update(job, status="done", results=results)
+            print(f"[job {job['id']}] 完了")
+        except Exception as e:
+            self._update(job, status="error", error=str(e))
+            print(f"[job {job['id']}] エラー: {e}")
+
+    def _update(self, job: dict, **fields):
+        with self._cond:
+            job.update(fields)
+            if job["status"] in ("done", "error"):
+                job["finished"] = time.time()
+            job["events"].append({"type": "status", "status": job["status"]})
+            self._cond.notify_all()
+
+    def _prune(self):
+        """終わってから JOB_TTL 秒たったジョブと、MAX_FINISHED_JOBS 件を超えた古いジョブを捨てる（ロック内で呼ぶ）"""
+        now = time.time()
+        finished = sorted((job["finished"], job_id) for job_id, job in self.jobs.items() if job.get("finished"))
+        excess = len(finished) - MAX_FINISHED_JOBS
+        for i, (finished_at, job_id) in enumerate(finished):
+            if i < excess or now - finished_at > JOB_TTL:
+                del self.jobs[job_id]
+
+    def _push_event(self, job: dict, event: dict):
+        with self._cond:
+            job["events"].append(event)
+            self._cond.notify_all()
+
+    def wait_events(self, job_id: str, since: int, timeout: float) -> dict | None:
+        """since 以降のイベントを返す。新着がなければ timeout 秒まで待つ。"""
+        deadline = time.monotonic() + min(timeout, MAX_POLL_TIMEOUT)
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            while len(job["events"]) <= since and job["status"] not in ("done", "error"):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return {
+                "status": job["status"],
+                "total": job["total"],
+                "events": job["events"][since:],
+                "next": len(job["events"]),
+                "results": job["results"],
+                "error": job["error"],
+            }
+
+    # ── HTTP ──
+
+    def serve_forever(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass  # アクセスログは出さない（進捗は print で出す）
+
+            def _send(self, code: int, body: dict):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                if parts == ["health"]:
+                    self._send(200, {"ok": True, "pid": os.getpid(), "jobs": len(server.jobs)})
+                    return
+                if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+                    query = urllib.parse.parse_qs(url.query)
+                    since = int(query.get("since", ["0"])[0])
+                    timeout = float(query.get("timeout", ["30"])[0])
+                    body = server.wait_events(parts[1], since, timeout)
+                    if body is None:
+                        self._send(404, {"error": "job not found"})
+                    else:
+                        self._send(200, body)
+                    return
+                self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path.rstrip("/") != "/jobs":
+                    self._send(404, {"error": "not found"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    payload = json.loads(self.rfile.read(length).decode("utf-8"))
+                    job_id = server.submit(payload)
+                except (KeyError, TypeError, ValueError) as e:
+                    self._send(400, {"error": f"不正なジョブ: {e}"})
+                    return
+                self._send(200, {"job_id": job_id})
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        print(f"ジョブサーバー起動: http://{self.host}:{self.port}  (同時生成 {self.concurrency}件)")
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+            self._loop.stop()
+
+    def shutdown(self):
+        if self._httpd:
+            self._httpd.shutdown()
+
+
+# ══════════════════════════════════════════════════════════════════
+# クライアント
+# ══════════════════════════════════════════════════════════════════
+
+class JobClient:
+    """ジョブサーバーへの薄いクライアント（標準ライブラリのみ。SDKは読み込まない）"""
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.base_url = f"http://{host}:{port}"
+
+    @classmethod
+    def from_config(cls, config: dict) -> "JobClient":
+        return cls(*server_address(config))
+
+    def _request(self, method: str, path: str, body: dict | None = None, timeout: float = 5.0) -> dict:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def available(self) -> bool:
+        """サーバーが起動していれば True"""
+        try:
+            return bool(self._request("GET", "/health", timeout=0.5).get("ok"))
+        except (urllib.error.URLError, OSError, ValueError):
+            return False
+
+    def submit(self, dialogues: list[DialogueLine], config: dict, output_dir: str,
+               use_context: bool = True) -> str:
+        body = {
+            "dialogues": [asdict(d) for d in dialogues],
+            "config": config,
+            "output_dir": os.path.abspath(output_dir),
+            "use_context": use_context,
+        }
+        return self._request("POST", "/jobs", body)["job_id"]
+
+    def follow(self, job_id: str, on_event=None, poll_timeout: float = 30.0) -> list[dict]:
+        """ジョブ完了までイベントを購読し、結果リストを返す
+
+        サーバーがジョブを見失った（404）ときは JobLostError。
+        """
+        since = 0
+        while True:
+            try:
+                body = self._request("GET", f"/jobs/{job_id}/events?since={since}&timeout={poll_timeout}",
+                                     timeout=poll_timeout + 5)
+            except urllib.error.HTTPError as e:
+                if e.code == 404:
+                    raise JobLostError(f"ジョブサーバーにジョブ {job_id} がありません（再起動または掃除済み）") from e
+                raise
+            for event in body["events"]:
+                if on_event:
+                    on_event(event)
+            since = body["next"]
+            if body["status"] == "done":
+                return body["results"]
+            if body["status"] == "error":
+                raise RuntimeError(f"ジョブサーバーでエラー: {body['error']}")
+
+
+def print_job_event(event: dict):
+    """進捗イベントを process_dialogues と同じ調子で表示"""
+    if event.get("type") != "result":
+        return
+    status = event.get("status")
+    if status == "success":
+        note = "（キャッシュ）" if event.get("cached") else ""
+        print(f"[{event['index']:03d}] {event['character']} -> {os.path.basename(event.get('filepath', ''))}{note}")
+    elif status == "skipped":
+        print(f"[SKIP] {event['character']}: {event.get('reason', '')}")
+    else:
+        print(f"[ERROR] {event['character']}: {event.get('reason', '')}")
+
+
+def run_via_server(
+    dialogues: list[DialogueLine],
+    config: dict,
+    output_dir: str,
+    use_context: bool = True,
+) -> list[dict] | None:
+    """ジョブサーバーが起動していればそこで生成して結果を返す。なければ None。
+
+    途中でサーバーがジョブを見失ったときも None（呼び出し側でこのプロセスの生成に切り替える）。
+    """
+    client = JobClient.from_config(config)
+    if not client.available():
+        return None
+    print(f"ジョブサーバーに投入します: {client.base_url}")
+    job_id = client.submit(dialogues, config, output_dir, use_context=use_context)
+    try:
+        return client.follow(job_id, on_event=print_job_event)
+    except JobLostError as e:
+        print(f"  ⚠ {e}。このプロセスで生成します")
+        return None
@@ -0,0 +1,104 @@
+"""実行マニフェスト（ボイスフォルダ内 _manifest.json）
+
+連番ごとに「どのテキストで生成したか・結果はどうだったか」を記録する。
+分散生成ではワーカーごとの部分マニフェスト (_manifest.<worker>.json) を
+コーディネーターが統合する。解析結果などのキャッシュも sections に置く。
+"""
+import glob
+import hashlib
+import json
+import os
+import time
+
+MANIFEST_NAME = "_manifest.json"
+
+
+def text_hash(character: str, text: str) -> str:
+    """キャラ名+セリフのハッシュ（変更検出用）"""
+    return hashlib.sha1(f"{character}\t{text}".encode("utf-8")).hexdigest()[:16]
+
+
+def file_fingerprint(path: str) -> str:
+    """ファイルのサイズ+更新時刻。キャッシュの有効判定に使う"""
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def worker_manifest_name(worker_id: str) -> str:
+    return f"_manifest.{worker_id}.json"
+
+
+class RunManifest:
+    """_manifest.json の読み書き"""
+
+    def __init__(self, path: str, data: dict | None = None):
+        self.path = path
+        data = data or {}
+        self.entries: dict[str, dict] = data.get("entries", {})
+        self.sections: dict[str, dict] = data.get("sections", {})
+
+    @classmethod
+    def load(cls, voice_dir: str, name: str = MANIFEST_NAME) -> "RunManifest":
+        path = os.path.join(voice_dir, name)
+        data = None
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                data = None
+        return cls(path, data)
+
+    def save(self):
+        """一時ファイルに書いてから置き換える（途中で落ちても壊さない）"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries, "sections": self.sections},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    # ── 生成結果 ──
+
+    def record_results(self, results: list[dict], dialogues: list, worker: str | None = None):
+        """process_dialogues / generate_voices の結果を連番ごとに記録"""
+        by_index = {d.index: d for d in dialogues}
+        now = time.time()
+        for r in results:
+            d = by_index.get(r["index"])
+            entry = {
+                "character": r["character"],
+                "status": r["status"],
+                "updated": now,
+            }
+            if d is not None:
+                entry["text_hash"] = text_hash(d.character, d.text)
+            if r.get("filepath"):
+                entry["filename"] = os.path.basename(r["filepath"])
+            if r.get("reason"):
+                entry["reason"] = r["reason"]
+            if worker:
+                entry["worker"] = worker
+            self.entries[str(r["index"])] = entry
+
+    def merge(self, other: "RunManifest"):
+        """他のマニフェストのエントリを更新時刻が新しいほう優先で取り込む"""
+        for serial, entry in other.entries.items():
+            mine = self.entries.get(serial)
+            if mine is None or entry.get("updated", 0) >= mine.get("updated", 0):
+                self.entries[serial] = entry
+
+    def merge_worker_manifests(self, voice_dir: str, remove: bool = True) -> int:
+        """_manifest.<worker>.json をすべて統合する。統合したファイル数を返す。"""
+        paths = sorted(glob.glob(os.path.join(voice_dir, worker_manifest_name("*"))))
+        for path in paths:
+            self.merge(RunManifest.load(voice_dir, os.path.basename(path)))
+            if remove:
+                os.remove(path)
+        return len(paths)
+
+    # ── キャッシュ ──
+
+    def section(self, name: str) -> dict:
+        """名前付きキャッシュ領域（{ファイル名: {"fp": fingerprint, ...}}）"""
+        return self.sections.setdefault(name, {})
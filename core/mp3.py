@@ -0,0 +1,523 @@
+"""MP3 フレーム単位の処理（デコードなし）
+
+フレームヘッダを辿ってフレーム位置を求め、再エンコードせずにフレーム境界で切り詰める。
+先頭の Xing/Info フレーム（LAMEタグ）があればフレーム数・バイト数・TOC・
+エンコーダ遅延/パディング・CRC を書き換えるので、ffmpeg 等はサンプル単位で正しい長さを再生する。
+無音MP3もエンコーダなしで組み立てる（サイド情報が全て0のフレーム = 無音）。
+"""
+import functools
+import mmap
+import os
+from dataclasses import dataclass
+
+# ビットレート表 (kbps) [MPEG1, MPEG2/2.5] の Layer III
+_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+}
+_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],     # MPEG1
+    2: [22050, 24000, 16000],     # MPEG2
+    25: [11025, 12000, 8000],     # MPEG2.5
+}
+# LAMEタグのCRC計算範囲（Info フレーム先頭からのバイト数）
+_TAG_CRC_LENGTH = 190
+# 有効とみなす最低フレーム数（これ未満の応答は壊れているとみなす）
+MIN_FRAMES = 4
+# 無音MP3のLAMEタグに書くエンコーダ遅延（LAME既定値）と、デコーダ側の遅延
+_SILENCE_ENCODER_DELAY = 576
+DECODER_DELAY = 529
+_VERSION_BITS = {1: 0b11, 2: 0b10, 25: 0b00}
+
+
+class Mp3Error(ValueError):
+    """MP3として解釈できない"""
+
+
+@dataclass
+class FrameHeader:
+    version: int          # 1 / 2 / 25 (MPEG2.5)
+    bitrate: int          # kbps
+    sample_rate: int
+    padding: int
+    channels: int
+    length: int           # フレーム長（バイト）
+    samples: int          # 1フレームのサンプル数
+
+    @property
+    def side_info_size(self) -> int:
+        if self.version == 1:
+            return 17 if self.channels == 1 else 32
+        return 9 if self.channels == 1 else 17
+
+
+def parse_header(buf, pos: int) -> FrameHeader | None:
+    """pos から Layer III のフレームヘッダを読む。ヘッダでなければ None"""
+    if pos + 4 > len(buf):
+        return None
+    b1, b2, b3 = buf[pos + 1], buf[pos + 2], buf[pos + 3]
+    if buf[pos] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = {0b11: 1, 0b10: 2, 0b00: 25}.get((b1 >> 3) & 0b11)
+    if version is None or ((b1 >> 1) & 0b11) != 0b01:  # Layer III のみ
+        return None
+    bitrate_index = b2 >> 4
+    sr_index = (b2 >> 2) & 0b11
+    if bitrate_index in (0, 15) or sr_index == 3:  # フリーフォーマット・不正値
+        return None
+    bitrate = _BITRATES[1 if version == 1 else 2][bitrate_index]
+    sample_rate = _SAMPLE_RATES[version][sr_index]
+    padding = (b2 >> 1) & 1
+    channels = 1 if (b3 >> 6) == 0b11 else 2
+    if version == 1:
+        samples, length = 1152, 144000 * bitrate // sample_rate + padding
+    else:
+        samples, length = 576, 72000 * bitrate // sample_rate + padding
+    return FrameHeader(version, bitrate, sample_rate, padding, channels, length, samples)
+
+
+def id3v2_size(buf) -> int:
+    """先頭の ID3v2 タグのバイト数（なければ 0）"""
+    if len(buf) >= 10 and buf[:3] == b"ID3":
+        size = (buf[6] & 0x7F) << 21 | (buf[7] & 0x7F) << 14 | (buf[8] & 0x7F) << 7 | (buf[9] & 0x7F)
+        footer = 10 if buf[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def crc16(data, crc: int = 0) -> int:
+    """LAMEタグで使う CRC-16 (多項式 0x8005 反転)"""
+    table = _CRC_TABLE
+    for b in data:
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+    return crc
+
+
+def _make_crc_table() -> list[int]:
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC_TABLE = _make_crc_table()
+
+
+# ══════════════════════════════════════════════════════════════════
+# フレーム配置の読み取り
+# ══════════════════════════════════════════════════════════════════
+
+@dataclass
+class Mp3Layout:
+    """ファイル内のフレーム配置"""
+    id3_end: int                          # ID3v2 の直後（最初のフレーム位置）
+    frames: list[tuple[int, int]]         # 音声フレーム (offset, length)。Info フレームは含まない
+    header: FrameHeader                   # 最初の音声フレームのヘッダ
+    info_offset: int | None = None        # Xing/Info フレームの位置
+    info_length: int = 0
+    xing_pos: int | None = None           # "Xing"/"Info" 文字列の位置（ファイル先頭から）
+    lame_pos: int | None = None           # LAMEタグの位置（ファイル先頭から）
+    declared_frames: int | None = None    # Xing/Info に書かれたフレーム数
+    delay: int = 0                        # エンコーダ遅延（サンプル）
+    end_padding: int = 0                  # 末尾パディング（サンプル）
+    trailer_start: int = 0                # 最後のフレームの直後
+    id3v1: bytes = b""                    # 末尾の ID3v1 タグ
+    mixed_format: bool = False            # 途中でサンプルレート等が変わった
+
+    @property
+    def sample_rate(self) -> int:
+        return self.header.sample_rate
+
+    @property
+    def total_samples(self) -> int:
+        return max(len(self.frames) * self.header.samples - self.delay - self.end_padding, 0)
+
+    @property
+    def duration_ms(self) -> int:
+        return self.total_samples * 1000 // self.sample_rate
+
+
+def _parse_info_frame(buf, pos: int, header: FrameHeader, layout: Mp3Layout) -> bool:
+    """pos のフレームが Xing/Info フレームなら layout に記録して True"""
+    xing = pos + 4 + header.side_info_size
+    tag = bytes(buf[xing:xing + 4])
+    if tag not in (b"Xing", b"Info"):
+        return False
+    layout.info_offset = pos
+    layout.info_length = header.length
+    layout.xing_pos = xing
+    flags = int.from_bytes(buf[xing + 4:xing + 8], "big")
+    p = xing + 8
+    if flags & 0x1:
+        layout.declared_frames = int.from_bytes(buf[p:p + 4], "big")
+    for flag, size in ((0x1, 4), (0x2, 4), (0x4, 100), (0x8, 4)):
+        if flags & flag:
+            p += size
+    # LAMEタグ（エンコーダ名 9バイト + …）。全フィールドが揃っているときだけ扱う
+    if flags & 0xF == 0xF and p + 36 <= pos + header.length:
+        layout.lame_pos = p
+        d = buf[p + 21:p + 24]
+        layout.delay = (d[0] << 4) | (d[1] >> 4)
+        layout.end_padding = ((d[1] & 0x0F) << 8) | d[2]
+    return True
+
+
+def read_layout(buf) -> Mp3Layout:
+    """フレームヘッダを辿ってフレーム配置を求める（途中で同期が外れたらそこまで）"""
+    start = id3v2_size(buf)
+    end = len(buf)
+    id3v1 = b""
+    if end - start >= 128 and buf[end - 128:end - 125] == b"TAG":
+        id3v1 = bytes(buf[end - 128:end])
+        end -= 128
+
+    pos = start
+    first = parse_header(buf, pos)
+    if first is None:
+        raise Mp3Error("先頭がMP3フレームではありません")
+
+    layout = Mp3Layout(id3_end=start, frames=[], header=first, id3v1=id3v1)
+    if _parse_info_frame(buf, pos, first, layout):
+        pos += first.length
+
+    while pos < end:
+        h = parse_header(buf, pos)
+        if h is None or pos + h.length > end:
+            break
+        if not layout.frames:
+            layout.header = h
+        elif h.sample_rate != layout.header.sample_rate or h.version != layout.header.version:
+            layout.mixed_format = True
+        layout.frames.append((pos, h.length))
+        pos += h.length
+    layout.trailer_start = pos
+
+    if not layout.frames:
+        raise Mp3Error("音声フレームがありません")
+    return layout
+
+
+def read_layout_file(path: str) -> Mp3Layout:
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return read_layout(buf)
+
+
+# ══════════════════════════════════════════════════════════════════
+# 構造チェック
+# ══════════════════════════════════════════════════════════════════
+
+def parse_output_format(output_format: str) -> tuple[int, int] | None:
+    """"mp3_44100_128" → (44100, 128)。MP3以外の形式なら None"""
+    parts = output_format.split("_")
+    if len(parts) == 3 and parts[0] == "mp3" and parts[1].isdigit() and parts[2].isdigit():
+        return int(parts[1]), int(parts[2])
+    return None
+
+
+def output_format_sample_rate(output_format: str) -> int | None:
+    """"mp3_44100_128" → 44100。MP3以外の形式なら None"""
+    params = parse_output_format(output_format)
+    return params[0] if params else None
+
+
+def _check_structure(buf) -> tuple[Mp3Layout | None, str]:
+    """サンプルレート以外の構造を検査する。(レイアウト, 壊れている理由) を返す"""
+    try:
+        layout = read_layout(buf)
+    except Mp3Error as e:
+        return None, str(e)
+
+    if layout.mixed_format:
+        return layout, "途中でサンプルレート/MPEGバージョンが変わっています"
+    leftover = len(buf) - len(layout.id3v1) - layout.trailer_start
+    if leftover > 0:
+        return layout, f"{len(layout.frames)}フレーム目の後に不正なデータ {leftover}バイト（途切れ/混入）"
+    # ストリーミング出力ではフレーム数が 0 のまま書かれることがあるので、その場合は見ない
+    if layout.declared_frames and layout.declared_frames != len(layout.frames):
+        return layout, f"フレーム数 {len(layout.frames)} がヘッダの宣言 {layout.declared_frames} と一致しません"
+    if len(layout.frames) < MIN_FRAMES:
+        return layout, f"フレームが {len(layout.frames)} 個しかありません"
+    return layout, ""
+
+
+def validate_mp3(buf, expected_sample_rate: int | None = None) -> tuple[bool, str]:
+    """デコードせずにフレーム構造を検査する。(正常か, 理由) を返す
+
+    同期ワード・ビットレート/サンプルレートの値と一貫性・末尾の途切れ・
+    Xing/Info のフレーム数との一致を見る。
+    """
+    layout, reason = _check_structure(buf)
+    if reason:
+        return False, reason
+    if expected_sample_rate and layout.sample_rate != expected_sample_rate:
+        return False, f"サンプルレートが {layout.sample_rate}Hz です（期待値 {expected_sample_rate}Hz）"
+    return True, ""
+
+
+def validate_file(path: str, expected_sample_rate: int | None = None) -> tuple[bool, str]:
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return False, "空のファイルです"
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return validate_mp3(buf, expected_sample_rate)
+    except OSError as e:
+        return False, str(e)
+
+
+def _scan_job(path: str) -> tuple[str, int | None]:
+    """(壊れている理由, サンプルレート)"""
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return "空のファイルです", None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                layout, reason = _check_structure(buf)
+                return reason, layout.sample_rate if layout else None
+    except OSError as e:
+        return str(e), None
+
+
+def scan_folder(voice_dir: str, expected_sample_rate: int | None = None,
+                workers: int | None = None) -> tuple[list[tuple[str, str]], list[tuple[str, int]]]:
+    """フォルダ内の全MP3を並列に検査する
+
+    (壊れているもの [(ファイル名, 理由), ...], サンプルレートが expected_sample_rate と違うもの
+    [(ファイル名, サンプルレート), ...]) を返す。サンプルレート違いは output_format を変えたあとの
+    古いファイルでも起きるので、壊れているものには含めない。
+    """
+    names = sorted(f for f in os.listdir(voice_dir) if f.endswith(".mp3"))
+    paths = [os.path.join(voice_dir, name) for name in names]
+    if len(paths) <= 8 or workers == 1:
+        results = [_scan_job(path) for path in paths]
+    else:
+        # プロセスプールは読み込みが重いので、並列にするときだけ読み込む
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_scan_job, paths, chunksize=32))
+    broken = [(name, reason) for name, (reason, _) in zip(names, results) if reason]
+    mismatched = [(name, rate) for name, (reason, rate) in zip(names, results)
+                  if not reason and expected_sample_rate and rate != expected_sample_rate]
+    return broken, mismatched
+
+
+# ══════════════════════════════════════════════════════════════════
+# 無劣化トリミング
+# ══════════════════════════════════════════════════════════════════
+
+def _toc(info_length: int, frame_lengths: list[int]) -> bytes:
+    """Xing TOC: 再生位置 i% のフレームの終端がストリーム中の何/256 の位置か（LAMEと同じ定義）"""
+    ends = []
+    acc = info_length
+    for length in frame_lengths:
+        acc += length
+        ends.append(acc)
+    toc = bytearray(100)
+    if not ends:
+        return bytes(toc)
+    for i in range(1, 100):
+        toc[i] = min(255, ends[len(ends) * i // 100] * 256 // acc)
+    return bytes(toc)
+
+
+def _rewrite_info_frame(buf, layout: Mp3Layout, kept: list[tuple[int, int]], end_padding: int) -> bytearray:
+    """Info フレームのフレーム数・バイト数・TOC・パディング・CRC を kept に合わせて書き換える"""
+    frame = bytearray(buf[layout.info_offset:layout.info_offset + layout.info_length])
+    x = layout.xing_pos - layout.info_offset
+    music_bytes = sum(length for _, length in kept)
+    stream_bytes = layout.info_length + music_bytes
+
+    flags = int.from_bytes(frame[x + 4:x + 8], "big")
+    p = x + 8
+    if flags & 0x1:
+        frame[p:p + 4] = len(kept).to_bytes(4, "big")
+        p += 4
+    if flags & 0x2:
+        frame[p:p + 4] = stream_bytes.to_bytes(4, "big")
+        p += 4
+    if flags & 0x4:
+        frame[p:p + 100] = _toc(layout.info_length, [length for _, length in kept])
+
+    if layout.lame_pos is not None:
+        lame = layout.lame_pos - layout.info_offset
+        d = (layout.delay << 12) | end_padding
+        frame[lame + 21:lame + 24] = d.to_bytes(3, "big")
+        frame[lame + 28:lame + 32] = stream_bytes.to_bytes(4, "big")
+        music_crc = 0
+        for off, length in kept:
+            music_crc = crc16(buf[off:off + length], music_crc)
+        frame[lame + 32:lame + 34] = music_crc.to_bytes(2, "big")
+        # タグCRCは CRC 欄を 0 にした状態の先頭190バイトで計算
+        frame[lame + 34:lame + 36] = b"\0\0"
+        frame[lame + 34:lame + 36] = crc16(frame[:_TAG_CRC_LENGTH]).to_bytes(2, "big")
+    return frame
+
+
+def trim_mp3(path: str, end_ms: int) -> tuple[int, int] | None:
+    """end_ms 以降をフレーム境界で切り捨てる（再エンコードなし）
+
+    LAMEタグがあれば末尾パディングを設定してサンプル単位の長さにする。
+    切る必要がなければ None、切ったら (元の長さms, 新しい長さms) を返す。
+    """
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        layout = read_layout(buf)
+        h = layout.header
+        old_ms = layout.duration_ms
+        cut_samples = round(end_ms * h.sample_rate / 1000)
+        # 重ね合わせ(MDCT)で次のフレームも必要なので1フレーム余分に残す
+        n_keep = -(-(cut_samples + layout.delay) // h.samples) + 1
+        if n_keep >= len(layout.frames) or cut_samples <= 0:
+            return None
+
+        kept = layout.frames[:n_keep]
+        end_padding = min(max(n_keep * h.samples - layout.delay - cut_samples, 0), 0xFFF)
+
+        tmp_path = path + ".trim.tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(buf[:layout.id3_end])
+            if layout.info_offset is not None:
+                out.write(_rewrite_info_frame(buf, layout, kept, end_padding))
+            first, last = kept[0][0], kept[-1][0] + kept[-1][1]
+            out.write(buf[first:last])
+            out.write(layout.id3v1)
+    finally:
+        buf.close()
+
+    # 音声キャッシュとハードリンクを共有していることがあるので置き換えで書き込む
+    os.replace(tmp_path, path)
+    if layout.lame_pos is not None:
+        new_ms = round(cut_samples * 1000 / h.sample_rate)
+    else:
+        new_ms = n_keep * h.samples * 1000 // h.sample_rate
+    return old_ms, new_ms
+
+
+def _trim_job(args: tuple[str, int]):
+    path, end_ms = args
+    try:
+        return trim_mp3(path, end_ms)
+    except (Mp3Error, OSError) as e:
+        return e
+
+
+def trim_files(jobs: list[tuple[str, int]], workers: int | None = None) -> dict[str, object]:
+    """(パス, 終了位置ms) のリストを並列にトリミングし {パス: 結果} を返す
+
+    結果は trim_mp3 の戻り値、失敗時は例外オブジェクト。
+    """
+    if len(jobs) <= 2 or workers == 1:
+        results = [_trim_job(job) for job in jobs]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_trim_job, jobs, chunksize=8))
+    return {path: result for (path, _), result in zip(jobs, results)}
+
+
+# ══════════════════════════════════════════════════════════════════
+# 無音MP3の生成
+# ══════════════════════════════════════════════════════════════════
+
+def build_header(sample_rate: int, bitrate: int, channels: int = 1) -> bytes:
+    """Layer III のフレームヘッダ（CRCなし・パディングなし）を作る"""
+    version = next((v for v, rates in _SAMPLE_RATES.items() if sample_rate in rates), None)
+    if version is None:
+        raise Mp3Error(f"MP3で使えないサンプルレートです: {sample_rate}")
+    table = _BITRATES[1 if version == 1 else 2]
+    if bitrate not in table[1:15]:
+        raise Mp3Error(f"MPEG{version} で使えないビットレートです: {bitrate}kbps")
+    b1 = 0xE0 | (_VERSION_BITS[version] << 3) | (0b01 << 1) | 1
+    b2 = (table.index(bitrate) << 4) | (_SAMPLE_RATES[version].index(sample_rate) << 2)
+    b3 = (0b11 if channels == 1 else 0b00) << 6
+    return bytes([0xFF, b1, b2, b3])
+
+
+def _tag_frame_header(sample_rate: int, bitrate: int, channels: int, needed: int) -> bytes:
+    """needed バイトのタグが入るフレームのヘッダ（入らなければビットレートを上げる）"""
+    header = build_header(sample_rate, bitrate, channels)
+    h = parse_header(header, 0)
+    if h.length < needed:
+        table = _BITRATES[1 if h.version == 1 else 2]
+        for candidate in table[1:15]:
+            header = build_header(sample_rate, candidate, channels)
+            h = parse_header(header, 0)
+            if h.length >= needed:
+                break
+    return header
+
+
+def _info_frame_template(sample_rate: int, bitrate: int) -> bytes:
+    """LAMEタグ付き Info フレームの雛形（数値欄は _rewrite_info_frame で埋める）"""
+    h = parse_header(build_header(sample_rate, bitrate), 0)
+    header = _tag_frame_header(sample_rate, bitrate, 1, 4 + h.side_info_size + 120 + 36)
+    h = parse_header(header, 0)
+    frame = bytearray(h.length)
+    frame[:4] = header
+    x = 4 + h.side_info_size
+    frame[x:x + 4] = b"Info"
+    frame[x + 4:x + 8] = (0x0F).to_bytes(4, "big")  # フレーム数・バイト数・TOC・品質
+    frame[x + 120:x + 129] = b"LAME3.100"
+    return bytes(frame)
+
+
+def lowest_bitrate(sample_rate: int) -> int:
+    """サンプルレートで使える最低ビットレート（無音フレーム・タグ用）"""
+    return 32 if sample_rate in _SAMPLE_RATES[1] else 8
+
+
+def build_xing_frame(sample_rate: int, channels: int, frame_lengths: list[int]) -> bytes:
+    """frame_lengths の音声フレーム列の先頭に置く Xing フレーム（フレーム数・バイト数・TOC）
+
+    連結したストリームのように LAMEタグの CRC を計算し直せない場合に使う。
+    VBR として扱われるので、ビットレートが混在していても長さとシーク位置が正しくなる。
+    """
+    bitrate = lowest_bitrate(sample_rate)
+    h = parse_header(build_header(sample_rate, bitrate, channels), 0)
+    header = _tag_frame_header(sample_rate, bitrate, channels, 4 + h.side_info_size + 120)
+    h = parse_header(header, 0)
+    frame = bytearray(h.length)
+    frame[:4] = header
+    x = 4 + h.side_info_size
+    frame[x:x + 4] = b"Xing"
+    frame[x + 4:x + 8] = (0x07).to_bytes(4, "big")  # フレーム数・バイト数・TOC
+    frame[x + 8:x + 12] = len(frame_lengths).to_bytes(4, "big")
+    frame[x + 12:x + 16] = (h.length + sum(frame_lengths)).to_bytes(4, "big")
+    frame[x + 16:x + 116] = _toc(h.length, frame_lengths)
+    return bytes(frame)
+
+
+def silent_frames(n_frames: int, sample_rate: int, bitrate: int, channels: int = 1) -> bytes:
+    """無音フレーム（サイド情報が全て0）を n_frames 個並べる"""
+    header = build_header(sample_rate, bitrate, channels)
+    h = parse_header(header, 0)
+    return (header + bytes(h.length - 4)) * n_frames
+
+
+@functools.lru_cache(maxsize=32)
+def silence_mp3(duration_ms: int, sample_rate: int = 44100, bitrate: int = 128) -> bytes:
+    """指定の長さ（ms）の無音MP3を組み立てる
+
+    全フレームが同じ内容なので1フレームを繰り返すだけ。LAMEタグの遅延/パディングで
+    サンプル単位の長さにする。
+    """
+    h = parse_header(build_header(sample_rate, bitrate), 0)
+    target = round(duration_ms * sample_rate / 1000)
+    # 末尾パディングはデコーダ遅延分以上必要。短くても validate_mp3 が通るよう MIN_FRAMES 個は並べる
+    # （増えた分は末尾パディングになるので、再生される長さは変わらない）
+    n_frames = max(MIN_FRAMES, -(-(target + _SILENCE_ENCODER_DELAY + DECODER_DELAY) // h.samples))
+    end_padding = n_frames * h.samples - _SILENCE_ENCODER_DELAY - target
+    audio = silent_frames(n_frames, sample_rate, bitrate)
+
+    buf = _info_frame_template(sample_rate, bitrate) + audio
+    layout = read_layout(buf)
+    layout.delay = _SILENCE_ENCODER_DELAY
+    info = _rewrite_info_frame(buf, layout, layout.frames, end_padding)
+    return bytes(info) + audio
@@ -0,0 +1,200 @@
+"""エピソード全体の試聴用MP3（--render-preview）
+
+連番順のMP3をデコードせずフレーム単位で連結し、セリフの間に gap_seconds 分の無音フレームを
+挟んで1本のMP3にする。YMM4プロジェクトを作らなくても通しで聞ける。
+各セリフの開始時刻はキューシート(.cue)と Audacity のラベル(.txt)に書き出す。
+
+連結したストリームは先頭に Xing フレーム（フレーム数・バイト数・TOC）を付けるので、
+プレイヤーで長さ表示やシークが正しく動く。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from core.mp3 import (
+    DECODER_DELAY, Mp3Error, build_xing_frame, lowest_bitrate, read_layout_file, silent_frames,
+)
+from core.parser import DialogueLine
+
+# キューシートの時刻単位（1秒 = 75フレーム）
+CUE_FRAMES_PER_SECOND = 75
+
+
+@dataclass
+class PreviewTrack:
+    """プレビュー内の1セリフ"""
+    serial: int
+    character: str
+    text: str
+    filename: str
+    start_ms: int
+    duration_ms: int
+
+
+def find_serial_files(voice_dir: str) -> dict[int, str]:
+    """ボイスフォルダの {連番: ファイル名}"""
+    files = {}
+    for name in sorted(os.listdir(voice_dir)):
+        if not name.endswith(".mp3"):
+            continue
+        head = name.split("_", 1)[0]
+        if head.isdigit():
+            files.setdefault(int(head), name)
+    return files
+
+
+def _scan_job(path: str) -> dict:
+    """連結に必要なフレーム情報だけを取り出す（プロセス間で受け渡すため dict で返す）"""
+    try:
+        layout = read_layout_file(path)
+    except (Mp3Error, OSError) as e:
+        return {"error": str(e)}
+    if not layout.frames or layout.mixed_format:
+        return {"error": "フレーム構造が不正です"}
+    h = layout.header
+    return {
+        "format": (h.version, h.sample_rate, h.channels),
+        "start": layout.frames[0][0],
+        "end": layout.frames[-1][0] + layout.frames[-1][1],
+        "lengths": [length for _, length in layout.frames],
+        "delay": layout.delay,
+        "end_padding": layout.end_padding,
+    }
+
+
+def _scan_files(paths: list[str], workers: int | None) -> list[dict]:
+    if len(paths) <= 8 or workers == 1:
+        return [_scan_job(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_scan_job, paths, chunksize=32))
+
+
+def _cue_time(ms: int) -> str:
+    frames = ms * CUE_FRAMES_PER_SECOND // 1000
+    return (f"{frames // (60 * CUE_FRAMES_PER_SECOND):02d}:"
+            f"{frames // CUE_FRAMES_PER_SECOND % 60:02d}:{frames % CUE_FRAMES_PER_SECOND:02d}")
+
+
+def _cue_quote(text: str) -> str:
+    return '"' + text.replace('"', "'").replace("\n", " ") + '"'
+
+
+def write_cue_sheet(cue_path: str, audio_path: str, title: str, tracks: list[PreviewTrack]):
+    """キューシートを書き出す（100トラック以上は TRACK 番号が3桁になる）"""
+    lines = [
+        f"TITLE {_cue_quote(title)}",
+        f"FILE {_cue_quote(os.path.basename(audio_path))} MP3",
+    ]
+    for i, t in enumerate(tracks, 1):
+        lines += [
+            f"  TRACK {i:02d} AUDIO",
+            f"    TITLE {_cue_quote(t.text)}",
+            f"    PERFORMER {_cue_quote(t.character)}",
+            f"    REM SERIAL {t.serial}",
+            f"    INDEX 01 {_cue_time(t.start_ms)}",
+        ]
+    with open(cue_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_labels(labels_path: str, tracks: list[PreviewTrack]):
+    """Audacity のラベル形式（開始秒 TAB 終了秒 TAB ラベル）で書き出す"""
+    with open(labels_path, "w", encoding="utf-8") as f:
+        for t in tracks:
+            start = t.start_ms / 1000
+            end = (t.start_ms + t.duration_ms) / 1000
+            f.write(f"{start:.3f}\t{end:.3f}\t{t.serial} {t.character}: {t.text}\n")
+
+
+def render_preview(
+    dialogues: list[DialogueLine],
+    voice_dir: str,
+    output_path: str,
+    gap_seconds: float = 0.3,
+    workers: int | None = None,
+) -> dict:
+    """セリフ順にMP3を連結して output_path に書き出す
+
+    Returns:
+        {"output", "cue", "labels", "tracks": [PreviewTrack], "missing": [連番],
+         "skipped": [(連番, 理由)], "duration_ms"}
+    """
+    serial_files = find_serial_files(voice_dir)
+    missing = [d.index for d in dialogues if d.index not in serial_files]
+    targets = [d for d in dialogues if d.index in serial_files]
+    paths = [os.path.join(voice_dir, serial_files[d.index]) for d in targets]
+    scans = _scan_files(paths, workers)
+
+    # 最初に読めたファイルの形式（MPEGバージョン・サンプルレート・チャンネル）に揃える
+    fmt = next((s["format"] for s in scans if "error" not in s), None)
+    if fmt is None:
+        raise Mp3Error("連結できるMP3がありません")
+    version, sample_rate, channels = fmt
+    samples_per_frame = 1152 if version == 1 else 576
+    # 無音フレームは最低ビットレートで作る（中身はヘッダとゼロのみ）
+    gap_bitrate = lowest_bitrate(sample_rate)
+    silent_length = len(silent_frames(1, sample_rate, gap_bitrate, channels))
+    gap_samples = round(gap_seconds * sample_rate)
+
+    # 1パス目: タイムライン（サンプル数）とフレーム長の一覧を組み立てる
+    plan = []           # (パス, フレーム情報, 前に挟む無音フレーム数)
+    skipped = []
+    frame_lengths = []
+    tracks = []
+    position = 0        # ストリーム先頭からのサンプル数
+    prev = None
+    for d, path, scan in zip(targets, paths, scans):
+        if "error" in scan:
+            skipped.append((d.index, scan["error"]))
+            continue
+        if scan["format"] != fmt:
+            skipped.append((d.index, f"形式が異なります: {scan['format'][1]}Hz/{scan['format'][2]}ch"))
+            continue
+        n_gap = 0
+        if prev is not None:
+            # 前のセリフの実音の終わりから、このセリフの実音の始まりまでを gap にする
+            n_gap = max(0, round((gap_samples - prev["end_padding"] - scan["delay"]) / samples_per_frame))
+        position += n_gap * samples_per_frame
+        frame_lengths += [silent_length] * n_gap
+        frame_lengths += scan["lengths"]
+
+        n_samples = len(scan["lengths"]) * samples_per_frame
+        content = max(n_samples - scan["delay"] - scan["end_padding"], 0)
+        tracks.append(PreviewTrack(
+            serial=d.index, character=d.character, text=d.text,
+            filename=os.path.basename(path),
+            start_ms=(position + scan["delay"] + DECODER_DELAY) * 1000 // sample_rate,
+            duration_ms=content * 1000 // sample_rate,
+        ))
+        plan.append((path, scan, n_gap))
+        position += n_samples
+        prev = scan
+
+    # 2パス目: Xing フレーム → 各ファイルのフレーム列をそのまま書き出す
+    tmp = output_path + ".tmp"
+    with open(tmp, "wb") as out:
+        out.write(build_xing_frame(sample_rate, channels, frame_lengths))
+        for path, scan, n_gap in plan:
+            if n_gap:
+                out.write(silent_frames(n_gap, sample_rate, gap_bitrate, channels))
+            with open(path, "rb") as src:
+                src.seek(scan["start"])
+                out.write(src.read(scan["end"] - scan["start"]))
+    os.replace(tmp, output_path)
+
+    base = os.path.splitext(output_path)[0]
+    cue_path = base + ".cue"
+    labels_path = base + ".txt"
+    title = os.path.basename(base)
+    write_cue_sheet(cue_path, output_path, title, tracks)
+    write_labels(labels_path, tracks)
+
+    return {
+        "output": output_path,
+        "cue": cue_path,
+        "labels": labels_path,
+        "tracks": tracks,
+        "missing": missing,
+        "skipped": skipped,
+        "duration_ms": position * 1000 // sample_rate,
+    }
@@ -0,0 +1,140 @@
+"""プレビュー音声の保存先（内容アドレス方式 + 容量上限つき LRU）
+
+ボイスデザイン / リミックスの候補と、履歴タブで保存済みボイスを試聴したときの音声を
+(voice_id, サンプルテキスト) をキーに output/.preview_store/ に置く。
+同じボイスをもう一度再生するときは API を呼ばずにファイルを開くだけで済む。
+
+最終利用時刻はファイルの更新時刻で持ち（再生のたびに更新する）、合計サイズが上限を
+超えたら古いものから消す。上限は config.json の "preview_store_max_mb"。
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from core.config import BASE_DIR, load_config
+
+DEFAULT_STORE_DIR = os.path.join(BASE_DIR, "output", ".preview_store")
+DEFAULT_MAX_MB = 500
+
+
+def preview_key(voice_id: str, sample_text: str = "") -> str:
+    """(voice_id, サンプルテキスト) のキー（sha256）。プレビュー候補はサンプルテキストなし"""
+    raw = json.dumps([voice_id, sample_text or ""], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PreviewStore:
+    """キー → MP3 ファイル。put した直後のファイルは消さない"""
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: int | None = None     # 合計サイズ（初回の put で数える）
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.store_dir, key[:2], f"{key}.mp3")
+
+    def get(self, voice_id: str, sample_text: str = "", touch: bool = True) -> str | None:
+        """保存済みならファイルパス
+
+        touch=True なら最終利用時刻を更新する。再生しない問い合わせ（ボタンの有効/無効の判定など）は
+        touch=False にして、消す順番が実際の再生順からずれないようにする。
+        """
+        path = self._path(preview_key(voice_id, sample_text))
+        if not touch:
+            return path if os.path.exists(path) else None
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, voice_id: str, audio: bytes, sample_text: str = "") -> str:
+        """音声を保存してファイルパスを返す。上限を超えたら古いものを消す"""
+        path = self._path(preview_key(voice_id, sample_text))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(audio)
+            os.replace(tmp, path)
+            self._account(len(audio) - old_size, keep=path)
+        return path
+
+    def alias(self, src_voice_id: str, voice_id: str, sample_text: str = "") -> str | None:
+        """src_voice_id の音声を voice_id でも引けるようにする（候補を保存して voice_id が決まったとき）"""
+        src = self.get(src_voice_id, sample_text)
+        if src is None:
+            return None
+        path = self._path(preview_key(voice_id, sample_text))
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            try:
+                os.link(src, path)
+                added = 0      # 同じ実体なので容量は増えない
+            except OSError:
+                shutil.copy2(src, path)
+                added = os.path.getsize(path)
+            os.utime(path)
+            self._account(added, keep=path)
+        return path
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """(最終利用時刻, サイズ, パス)"""
+        entries = []
+        for root, _, files in os.walk(self.store_dir):
+            for name in files:
+                if not name.endswith(".mp3"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                # ハードリンクは2本目以降を数えない（消しても実体は残る）
+                entries.append((st.st_mtime, st.st_size // max(1, st.st_nlink), path))
+        return entries
+
+    def _account(self, added: int, keep: str):
+        """合計サイズを更新し、上限を超えていれば古い順に消す（ロックは呼び出し元で取る）"""
+        if self._total is None:
+            self._total = sum(size for _, size, _ in self._entries())
+        else:
+            self._total += added
+        if self._total <= self.max_bytes:
+            return
+        entries = sorted(self._entries())
+        self._total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._total -= size
+
+    def usage(self) -> tuple[int, int]:
+        """(ファイル数, 合計バイト数)"""
+        entries = self._entries()
+        return len(entries), sum(size for _, size, _ in entries)
+
+
+_default_store: PreviewStore | None = None
+
+
+def get_preview_store() -> PreviewStore:
+    """プロジェクト共通のストア（上限は config.json の preview_store_max_mb）"""
+    global _default_store
+    if _default_store is None:
+        max_mb = load_config().get("preview_store_max_mb", DEFAULT_MAX_MB)
+        _default_store = PreviewStore(max_bytes=int(max_mb * 1024 * 1024))
+    return _default_store
@@ -4,56 +4,35 @@ ElevenLabs 発音辞書管理ツール
 
 辞書の作成・ルール追加・削除・一覧表示を行う。
 config.json に辞書ID/version_IDを自動保存する。
+ルールは pronunciation_mirror.json にミラーし、一覧表示や差分計算はこれを使う。
 
 使い方:
   python pronunciation_dict.py create              # 辞書を新規作成（初期ルール込み）
-  python pronunciation_dict.py list                # 登録ルール一覧
+  python pronunciation_dict.py list                # 登録ルール一覧（ローカルのミラー）
+  python pronunciation_dict.py list --refresh      # APIから取り直して表示
   python pronunciation_dict.py add "流石" "さすが"  # ルール追加
   python pronunciation_dict.py remove "流石"        # ルール削除
   python pronunciation_dict.py sync                # config.jsonのversion_idを最新に更新
+  python pronunciation_dict.py bulk-add            # data/bulk_rules.tsv との差分だけ登録
+  python pronunciation_dict.py coverage <CSV/フォルダ>...  # ルールごとの適用回数を集計
 """
 import argparse
 import json
 import os
 import sys
 
-from dotenv import load_dotenv
-from elevenlabs.client import ElevenLabs
-
 from core.config import load_config, save_config, BASE_DIR
 from core.client import get_client
-
-# 一律置換で安全な初期ルール（文脈依存しないもの）
-INITIAL_RULES = [
-    # 難読漢字 → ひらがな
-    ("構って", "かまって"),
-    ("貴方", "あなた"),
-    ("穿いて", "はいて"),
-    ("窃盗", "せっとう"),
-    ("流石", "さすが"),
-    ("済ませ", "すませ"),
-    ("左手", "ひだりて"),
-    ("間一髪", "かんいっぱつ"),
-    ("微かに", "かすかに"),
-    ("万事解決", "ばんじかいけつ"),
-]
+from core.pronunciation_mirror import DictionaryMirror, apply_delta, fetch_mirror, plan_delta
+from core.pronunciation_rules import BULK_RULES_PATH, INITIAL_RULES, make_alias_rule, read_rules_tsv
+from core.rewriter import get_rewriter
+from core.rule_coverage import collect_coverage, print_coverage
 
 DICT_NAME = "blueaka-pronunciation-fixes"
 DICT_DESCRIPTION = "ブルアカ動画用の読み間違い修正辞書（Alias: 漢字→ひらがな）"
 
 
 
-def make_alias_rule(original: str, replacement: str, word_boundaries: bool = True) -> dict:
-    rule = {
-        "type": "alias",
-        "string_to_replace": original,
-        "alias": replacement,
-    }
-    if not word_boundaries:
-        rule["word_boundaries"] = False
-    return rule
-
-
 def save_dict_to_config(config: dict, dict_id: str, version_id: str):
     """config.json に辞書情報を保存"""
     config["pronunciation_dictionary"] = {
@@ -63,6 +42,43 @@ def save_dict_to_config(config: dict, dict_id: str, version_id: str):
     save_config(config)
 
 
+def load_dict_config(config: dict) -> str | None:
+    """config.json の辞書IDを返す（未作成ならメッセージを出して None）"""
+    dict_id = config.get("pronunciation_dictionary", {}).get("id")
+    if not dict_id:
+        print("辞書が未作成です。`python pronunciation_dict.py create` で作成してください。")
+    return dict_id
+
+
+def load_mirror(client, config: dict, refresh: bool = False) -> DictionaryMirror:
+    """ミラーを返す。config.json の version_id と一致しない（または refresh）ときだけAPIから取り直す"""
+    dict_config = config["pronunciation_dictionary"]
+    mirror = DictionaryMirror.load()
+    if refresh or not mirror.is_current(dict_config["id"], dict_config.get("version_id")):
+        print("辞書のルールを取得中...")
+        mirror = fetch_mirror(client, dict_config["id"])
+        mirror.save()
+        update_version(config, mirror.version_id)
+    return mirror
+
+
+def update_version(config: dict, version_id: str):
+    """config.json の version_id が変わっていれば保存"""
+    dict_config = config["pronunciation_dictionary"]
+    if dict_config.get("version_id") != version_id:
+        print(f"config.json の version_id を更新しました → {version_id}")
+        dict_config["version_id"] = version_id
+        save_config(config)
+
+
+def print_rules(mirror: DictionaryMirror):
+    for original, entry in mirror.rules.items():
+        if "alias" in entry:
+            print(f"  {original} → {entry['alias']}")
+        else:
+            print(f"  {original} (phoneme: {entry.get('phoneme', '?')})")
+
+
 # ══════════════════════════════════════════════════════════════════
 # コマンド
 # ══════════════════════════════════════════════════════════════════
@@ -91,6 +107,9 @@ def cmd_create(args):
     )
 
     save_dict_to_config(config, result.id, result.version_id)
+    mirror = DictionaryMirror(dictionary_id=result.id, name=DICT_NAME)
+    mirror.apply(result.version_id, added=rules)
+    mirror.save()
 
     print(f"\n辞書作成完了:")
     print(f"  ID:         {result.id}")
@@ -105,111 +124,83 @@ def cmd_create(args):
 
 
 def cmd_list(args):
-    """登録ルール一覧を表示"""
-    client = get_client()
+    """登録ルール一覧を表示（ローカルのミラーから。--refresh でAPIから取り直す）"""
     config = load_config()
-
-    dict_config = config.get("pronunciation_dictionary", {})
-    dict_id = dict_config.get("id")
-    if not dict_id:
-        print("辞書が未作成です。`python pronunciation_dict.py create` で作成してください。")
+    if not load_dict_config(config):
         return
 
-    detail = client.pronunciation_dictionaries.get(
-        pronunciation_dictionary_id=dict_id
-    )
-
-    print(f"辞書: {detail.name}")
-    print(f"  ID:         {detail.id}")
-    print(f"  version_id: {detail.latest_version_id}")
-    print(f"  ルール数:   {detail.latest_version_rules_num}")
+    dict_config = config["pronunciation_dictionary"]
+    mirror = DictionaryMirror.load()
+    client = None
+    if args.refresh or not mirror.is_current(dict_config["id"], dict_config.get("version_id")):
+        client = get_client()
+    mirror = load_mirror(client, config, refresh=args.refresh)
+
+    print(f"辞書: {mirror.name}")
+    print(f"  ID:         {mirror.dictionary_id}")
+    print(f"  version_id: {mirror.version_id}")
+    print(f"  ルール数:   {len(mirror.rules)}")
     print()
 
-    if hasattr(detail, "rules") and detail.rules:
+    if mirror.rules:
         print("ルール一覧:")
-        for rule in detail.rules:
-            rule_type = rule.type if hasattr(rule, "type") else "?"
-            original = rule.string_to_replace if hasattr(rule, "string_to_replace") else "?"
-            if rule_type == "alias":
-                replacement = rule.alias if hasattr(rule, "alias") else "?"
-                print(f"  {original} → {replacement}")
-            else:
-                print(f"  {original} (phoneme: {rule.phoneme if hasattr(rule, 'phoneme') else '?'})")
+        print_rules(mirror)
     else:
-        print("(ルール詳細を取得できませんでした)")
-
-    # config.json の version_id が古い場合は更新
-    if dict_config.get("version_id") != detail.latest_version_id:
-        config["pronunciation_dictionary"]["version_id"] = detail.latest_version_id
-        save_config(config)
-        print(f"\nconfig.json の version_id を更新しました → {detail.latest_version_id}")
+        print("(ルールがありません)")
 
 
 def cmd_add(args):
-    """ルールを追加"""
+    """ルールを追加（同じルールが登録済みならAPIを呼ばない）"""
     client = get_client()
     config = load_config()
-
-    dict_config = config.get("pronunciation_dictionary", {})
-    dict_id = dict_config.get("id")
-    if not dict_id:
-        print("辞書が未作成です。`python pronunciation_dict.py create` で作成してください。")
+    if not load_dict_config(config):
         return
 
+    mirror = load_mirror(client, config)
     rule = make_alias_rule(args.original, args.replacement)
-    print(f"ルール追加: {args.original} → {args.replacement}")
-
-    result = client.pronunciation_dictionaries.rules.add(
-        pronunciation_dictionary_id=dict_id,
-        rules=[rule],
-    )
+    to_add, to_remove = plan_delta(mirror, [rule])
+    if not to_add:
+        print(f"登録済みです: {args.original} → {args.replacement}")
+        return
 
-    # version_id を更新
-    config["pronunciation_dictionary"]["version_id"] = result.version_id
-    save_config(config)
+    print(f"ルール追加: {args.original} → {args.replacement}")
+    result = apply_delta(client, mirror, to_add, to_remove)
+    update_version(config, result.version_id)
 
     print(f"  version_id: {result.version_id}")
     print(f"  ルール数:   {result.version_rules_num}")
 
 
 def cmd_remove(args):
-    """ルールを削除"""
+    """ルールを削除（登録されていなければAPIを呼ばない）"""
     client = get_client()
     config = load_config()
+    if not load_dict_config(config):
+        return
 
-    dict_config = config.get("pronunciation_dictionary", {})
-    dict_id = dict_config.get("id")
-    if not dict_id:
-        print("辞書が未作成です。")
+    mirror = load_mirror(client, config)
+    if args.original not in mirror.rules:
+        print(f"登録されていません: {args.original}")
         return
 
     print(f"ルール削除: {args.original}")
-
-    result = client.pronunciation_dictionaries.rules.remove(
-        pronunciation_dictionary_id=dict_id,
-        rule_strings=[args.original],
-    )
-
-    config["pronunciation_dictionary"]["version_id"] = result.version_id
-    save_config(config)
+    result = apply_delta(client, mirror, [], [args.original])
+    update_version(config, result.version_id)
 
     print(f"  version_id: {result.version_id}")
     print(f"  ルール数:   {result.version_rules_num}")
 
 
 def cmd_sync(args):
-    """config.json の version_id を最新に更新"""
+    """config.json の version_id を最新に更新（変わっていればミラーも取り直す）"""
     client = get_client()
     config = load_config()
-
-    dict_config = config.get("pronunciation_dictionary", {})
-    dict_id = dict_config.get("id")
-    if not dict_id:
-        print("辞書が未作成です。")
+    if not load_dict_config(config):
         return
 
+    dict_config = config["pronunciation_dictionary"]
     detail = client.pronunciation_dictionaries.get(
-        pronunciation_dictionary_id=dict_id
+        pronunciation_dictionary_id=dict_config["id"]
     )
 
     old_version = dict_config.get("version_id", "(なし)")
@@ -218,58 +209,65 @@ def cmd_sync(args):
     if old_version == new_version:
         print(f"version_id は最新です: {new_version}")
     else:
-        config["pronunciation_dictionary"]["version_id"] = new_version
+        dict_config["version_id"] = new_version
         save_config(config)
         print(f"version_id を更新: {old_version} → {new_version}")
+    # ミラーが古ければ最新バージョンのルールを取得
+    load_mirror(client, config)
 
 
 def cmd_bulk_add(args):
-    """TSVファイルから一括追加（形式: 原文<TAB>読み）"""
+    """TSVファイルから一括追加（形式: 原文<TAB>読み）。登録済みとの差分だけを送る"""
     client = get_client()
     config = load_config()
-
-    dict_config = config.get("pronunciation_dictionary", {})
-    dict_id = dict_config.get("id")
-    if not dict_id:
-        print("辞書が未作成です。")
+    if not load_dict_config(config):
         return
 
-    rules = []
-    with open(args.file, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            parts = line.split("\t")
-            if len(parts) >= 2:
-                rules.append(make_alias_rule(parts[0], parts[1], word_boundaries=not args.no_word_boundaries))
-
-    if not rules:
+    rules = [make_alias_rule(orig, repl, word_boundaries=not args.no_word_boundaries)
+             for orig, repl in read_rules_tsv(args.file)]
+    if not rules and not args.prune:
         print("追加するルールがありません")
         return
 
-    print(f"{len(rules)}件のルールを追加します:")
-    for r in rules:
-        print(f"  {r['string_to_replace']} → {r['alias']}")
-
-    # APIは1リクエスト100件まで → バッチ分割
-    BATCH_SIZE = 100
-    result = None
-    for i in range(0, len(rules), BATCH_SIZE):
-        batch = rules[i : i + BATCH_SIZE]
-        batch_num = i // BATCH_SIZE + 1
-        total_batches = (len(rules) + BATCH_SIZE - 1) // BATCH_SIZE
-        if total_batches > 1:
-            print(f"\nバッチ {batch_num}/{total_batches} ({len(batch)}件)...")
-        result = client.pronunciation_dictionaries.rules.add(
-            pronunciation_dictionary_id=dict_id,
-            rules=batch,
-        )
-
-    config["pronunciation_dictionary"]["version_id"] = result.version_id
-    save_config(config)
+    mirror = load_mirror(client, config)
+    # --prune でも初期ルールは残す
+    keep = {orig for orig, _ in INITIAL_RULES}
+    to_add, to_remove = plan_delta(mirror, rules, prune=args.prune, keep=keep)
+    if not to_add and not to_remove:
+        print(f"差分なし（{len(rules)}件すべて登録済み）。新しいバージョンは作成しません")
+        return
+
+    if to_remove:
+        print(f"{len(to_remove)}件のルールを削除します:")
+        for s in to_remove:
+            print(f"  {s}")
+    if to_add:
+        print(f"{len(to_add)}件のルールを追加します:")
+        for r in to_add:
+            print(f"  {r['string_to_replace']} → {r['alias']}")
+    if args.dry_run:
+        print("\n(--dry-run: 送信しません)")
+        return
 
-    print(f"\n追加完了: ルール数 {result.version_rules_num}")
+    def on_batch(n, total, kind, size):
+        if total > 1:
+            print(f"\nバッチ {n}/{total} ({'削除' if kind == 'remove' else '追加'} {size}件)...")
+
+    result = apply_delta(client, mirror, to_add, to_remove, on_batch=on_batch)
+    update_version(config, result.version_id)
+
+    print(f"\n同期完了: ルール数 {result.version_rules_num}")
+
+
+def cmd_coverage(args):
+    """台本CSVでのルールの適用回数・隠れ・未使用ルールを集計（APIは使わない）"""
+    rewriter = get_rewriter(args.rules)
+    print(f"ルール: {len(rewriter.rules)}件（初期ルール + {os.path.basename(args.rules)}）\n")
+    result = collect_coverage(rewriter, args.paths)
+    if not result["files"]:
+        print("_elevenlabs.csv が見つかりません")
+        return
+    print_coverage(result, top=args.top)
 
 
 def main():
@@ -280,7 +278,8 @@ def main():
     sub = parser.add_subparsers(dest="command")
 
     sub.add_parser("create", help="辞書を新規作成（初期ルール込み）")
-    sub.add_parser("list", help="登録ルール一覧")
+    p_list = sub.add_parser("list", help="登録ルール一覧（ローカルのミラーから）")
+    p_list.add_argument("--refresh", action="store_true", help="APIからルールを取り直す")
     sub.add_parser("sync", help="config.jsonのversion_idを最新に更新")
 
     p_add = sub.add_parser("add", help="ルール追加")
@@ -290,9 +289,17 @@ def main():
     p_remove = sub.add_parser("remove", help="ルール削除")
     p_remove.add_argument("original", help="削除するルールの置換対象文字列")
 
-    p_bulk = sub.add_parser("bulk-add", help="TSVファイルから一括追加")
-    p_bulk.add_argument("file", help="TSVファイルパス（原文<TAB>読み）")
+    p_bulk = sub.add_parser("bulk-add", help="TSVファイルから一括追加（差分のみ送信）")
+    p_bulk.add_argument("file", nargs="?", default=BULK_RULES_PATH,
+                        help="TSVファイルパス（原文<TAB>読み、省略時 data/bulk_rules.tsv）")
     p_bulk.add_argument("--no-word-boundaries", action="store_true", help="単語境界なしで登録（日本語苗字向け）")
+    p_bulk.add_argument("--prune", action="store_true", help="TSVにないルールを削除（初期ルールは残す）")
+    p_bulk.add_argument("--dry-run", action="store_true", help="差分を表示するだけで送信しない")
+
+    p_cov = sub.add_parser("coverage", help="台本CSVでのルールの使用状況を集計")
+    p_cov.add_argument("paths", nargs="+", help="_elevenlabs.csv またはそれを含むフォルダ（複数可）")
+    p_cov.add_argument("--rules", default=BULK_RULES_PATH, help="ルールTSV（省略時 data/bulk_rules.tsv）")
+    p_cov.add_argument("--top", type=int, default=30, help="表示する上位件数")
 
     args = parser.parse_args()
 
@@ -303,6 +310,7 @@ def main():
         "remove": cmd_remove,
         "sync": cmd_sync,
         "bulk-add": cmd_bulk_add,
+        "coverage": cmd_coverage,
     }
 
     if args.command in commands:
@@ -0,0 +1,171 @@
+"""発音辞書のローカルミラーと差分同期
+
+ElevenLabs 上の発音辞書のルールを pronunciation_mirror.json に写しておき、
+一覧表示はこれを読むだけにする。ルールを追加・削除したら応答の version_id とともに
+ミラーも更新するので、config.json の version_id と一致している限りAPIを呼ばない。
+
+bulk-add はTSVとミラーを比べて、追加・変更・（--prune 時は）削除の差分だけを送る。
+差分がなければ新しい辞書バージョンを作らない（version_id が変わらないので、
+version_id を含む音声キャッシュのキーも変わらない）。
+"""
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import asdict, dataclass, field
+
+from core.config import BASE_DIR
+
+MIRROR_PATH = os.path.join(BASE_DIR, "pronunciation_mirror.json")
+# APIは1リクエスト100件まで
+API_BATCH_SIZE = 100
+_PLS_NS = "{http://www.w3.org/2005/01/pronunciation-lexicon}"
+
+
+@dataclass
+class DictionaryMirror:
+    """辞書1つ分のルールの写し"""
+    dictionary_id: str = ""
+    version_id: str = ""
+    name: str = ""
+    # 原文 → {"alias": 読み, "word_boundaries": bool | None（不明）}
+    rules: dict[str, dict] = field(default_factory=dict)
+    fetched: float = 0.0
+
+    @classmethod
+    def load(cls, path: str = MIRROR_PATH) -> "DictionaryMirror":
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        return cls(**{k: data[k] for k in asdict(cls()) if k in data})
+
+    def save(self, path: str = MIRROR_PATH):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+
+    def is_current(self, dictionary_id: str, version_id: str | None) -> bool:
+        """config.json の辞書・バージョンと同じ内容を持っているか"""
+        return bool(dictionary_id) and self.dictionary_id == dictionary_id \
+            and self.version_id == version_id
+
+    def apply(self, version_id: str, added: list[dict] = (), removed: list[str] = ()):
+        """APIで反映した差分をミラーにも反映する"""
+        for s in removed:
+            self.rules.pop(s, None)
+        for rule in added:
+            self.rules[rule["string_to_replace"]] = _rule_entry(rule)
+        self.version_id = version_id
+
+
+def _rule_entry(rule) -> dict:
+    """make_alias_rule の dict / SDK のルールモデルをミラーの形式にする"""
+    get = rule.get if isinstance(rule, dict) else (lambda k, d=None: getattr(rule, k, d))
+    entry = {"alias": get("alias") or "", "word_boundaries": get("word_boundaries", True)}
+    if get("type", "alias") != "alias":
+        entry = {"phoneme": get("phoneme") or "", "alphabet": get("alphabet") or ""}
+    return entry
+
+
+def _download_pls(client, dictionary_id: str, version_id: str) -> bytes:
+    download = client.pronunciation_dictionaries.download
+    try:
+        data = download(dictionary_id=dictionary_id, version_id=version_id)
+    except TypeError:  # SDKのバージョンで引数名が違う
+        data = download(pronunciation_dictionary_id=dictionary_id, version_id=version_id)
+    return data if isinstance(data, bytes) else b"".join(data)
+
+
+def parse_pls(data: bytes) -> dict[str, dict]:
+    """PLS (XML) から {原文: エントリ}。PLS に単語境界の情報はないので None（不明）にする"""
+    rules = {}
+    root = ET.fromstring(data)
+    for lexeme in root.iter(f"{_PLS_NS}lexeme"):
+        grapheme = lexeme.findtext(f"{_PLS_NS}grapheme")
+        if not grapheme:
+            continue
+        alias = lexeme.findtext(f"{_PLS_NS}alias")
+        if alias is not None:
+            rules[grapheme] = {"alias": alias, "word_boundaries": None}
+        else:
+            rules[grapheme] = {"phoneme": lexeme.findtext(f"{_PLS_NS}phoneme") or "",
+                               "alphabet": root.get("alphabet", "")}
+    return rules
+
+
+def fetch_mirror(client, dictionary_id: str) -> DictionaryMirror:
+    """APIから辞書の最新バージョンのルールを取得してミラーを作る"""
+    detail = client.pronunciation_dictionaries.get(pronunciation_dictionary_id=dictionary_id)
+    mirror = DictionaryMirror(
+        dictionary_id=dictionary_id,
+        version_id=detail.latest_version_id,
+        name=getattr(detail, "name", ""),
+        fetched=time.time(),
+    )
+    if getattr(detail, "rules", None):
+        mirror.rules = {r.string_to_replace: _rule_entry(r) for r in detail.rules}
+    else:
+        mirror.rules = parse_pls(_download_pls(client, dictionary_id, mirror.version_id))
+    return mirror
+
+
+def plan_delta(
+    mirror: DictionaryMirror,
+    desired: list[dict],
+    prune: bool = False,
+    keep: set[str] = frozenset(),
+) -> tuple[list[dict], list[str]]:
+    """ミラーを desired に合わせるための (追加するルール, 削除する原文) を求める
+
+    読みが変わったルールは削除してから追加する。prune=True なら desired にも keep にもない
+    ルールを削除する。
+    """
+    to_add, to_remove = [], []
+    wanted = set()
+    for rule in desired:
+        s = rule["string_to_replace"]
+        wanted.add(s)
+        current = mirror.rules.get(s)
+        if current is None:
+            to_add.append(rule)
+            continue
+        entry = _rule_entry(rule)
+        wb_known = current.get("word_boundaries") is not None
+        if current.get("alias") != entry["alias"] or (
+                wb_known and current["word_boundaries"] != entry["word_boundaries"]):
+            to_remove.append(s)
+            to_add.append(rule)
+    if prune:
+        to_remove += sorted(s for s in mirror.rules if s not in wanted and s not in keep)
+    return to_add, to_remove
+
+
+def apply_delta(client, mirror: DictionaryMirror, to_add: list[dict], to_remove: list[str],
+                on_batch=None, path: str = MIRROR_PATH):
+    """削除 → 追加の順にバッチで送り、1バッチごとにミラーを更新して保存する
+
+    辞書のバージョンは1リクエストごとに直列に増えるので、バッチは順番に送る
+    （途中で失敗してもミラーはそこまでの内容と一致する）。最後の応答を返す。
+    """
+    dictionary_id = mirror.dictionary_id
+    result = None
+    batches = [("remove", to_remove[i:i + API_BATCH_SIZE])
+               for i in range(0, len(to_remove), API_BATCH_SIZE)]
+    batches += [("add", to_add[i:i + API_BATCH_SIZE])
+                for i in range(0, len(to_add), API_BATCH_SIZE)]
+    for n, (kind, batch) in enumerate(batches, 1):
+        if on_batch:
+            on_batch(n, len(batches), kind, len(batch))
+        if kind == "remove":
+            result = client.pronunciation_dictionaries.rules.remove(
+                pronunciation_dictionary_id=dictionary_id, rule_strings=batch)
+            mirror.apply(result.version_id, removed=batch)
+        else:
+            result = client.pronunciation_dictionaries.rules.add(
+                pronunciation_dictionary_id=dictionary_id, rules=batch)
+            mirror.apply(result.version_id, added=batch)
+        mirror.save(path)
+    return result
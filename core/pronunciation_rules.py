@@ -0,0 +1,47 @@
+"""発音ルールの定義と読み込み（初期ルール・一括登録TSV）"""
+import os
+
+from core.config import BASE_DIR
+
+# 一括登録用TSV（原文<TAB>読み）
+BULK_RULES_PATH = os.path.join(BASE_DIR, "data", "bulk_rules.tsv")
+
+# 一律置換で安全な初期ルール（文脈依存しないもの）
+INITIAL_RULES = [
+    # 難読漢字 → ひらがな
+    ("構って", "かまって"),
+    ("貴方", "あなた"),
+    ("穿いて", "はいて"),
+    ("窃盗", "せっとう"),
+    ("流石", "さすが"),
+    ("済ませ", "すませ"),
+    ("左手", "ひだりて"),
+    ("間一髪", "かんいっぱつ"),
+    ("微かに", "かすかに"),
+    ("万事解決", "ばんじかいけつ"),
+]
+
+
+def make_alias_rule(original: str, replacement: str, word_boundaries: bool = True) -> dict:
+    rule = {
+        "type": "alias",
+        "string_to_replace": original,
+        "alias": replacement,
+    }
+    if not word_boundaries:
+        rule["word_boundaries"] = False
+    return rule
+
+
+def read_rules_tsv(path: str = BULK_RULES_PATH) -> list[tuple[str, str]]:
+    """TSV（原文<TAB>読み、# はコメント）を [(原文, 読み)] で返す。同じ原文は後の行が優先"""
+    rules = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split("\t")
+            if len(parts) >= 2 and parts[0]:
+                rules[parts[0]] = parts[1]
+    return list(rules.items())
@@ -0,0 +1,140 @@
+"""発音ルールのローカル適用（Aho-Corasick による一括置換）
+
+config.json の "local_pronunciation": true のとき、INITIAL_RULES と data/bulk_rules.tsv の
+「原文 → 読み」を API に送る前のテキストに適用する。サーバーの発音辞書は使わないので、
+辞書を編集しても version_id が変わらず、書き換え結果が同じセリフの音声キャッシュはそのまま使える。
+
+全ルールを1つのオートマトンにまとめ、1行を1回なめるだけで全ルールの出現位置を求める。
+重なる候補は「左から順に、同じ開始位置なら最長のもの」を採用する。
+日本語は単語の区切りがないので word_boundaries は考慮しない。
+"""
+import os
+from dataclasses import dataclass
+
+from core.pronunciation_rules import BULK_RULES_PATH, INITIAL_RULES, read_rules_tsv
+
+
+@dataclass
+class RuleHit:
+    """適用されたルール1件"""
+    original: str
+    alias: str
+    start: int      # 元のテキストでの開始位置
+
+
+class PronunciationRewriter:
+    """ルール集合をコンパイルしたオートマトン"""
+
+    def __init__(self, rules: list[tuple[str, str]]):
+        # 同じ原文は後のルールが優先（TSV が INITIAL_RULES を上書きできる）
+        self.rules = [(orig, alias) for orig, alias in dict(rules).items() if orig]
+        self._goto: list[dict[str, int]] = [{}]
+        self._rule: list[int] = [-1]     # そのノードで終わるルール番号（なければ -1）
+        self._fail: list[int] = [0]
+        self._out: list[int] = [0]       # 失敗リンクをたどって最初に見つかる終端ノード（なければ 0）
+        for r, (orig, _) in enumerate(self.rules):
+            node = 0
+            for c in orig:
+                nxt = self._goto[node].get(c)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][c] = nxt
+                    self._goto.append({})
+                    self._rule.append(-1)
+                    self._fail.append(0)
+                    self._out.append(0)
+                node = nxt
+            self._rule[node] = r
+        self._build_links()
+
+    def _build_links(self):
+        """幅優先で失敗リンクと出力リンクを張る"""
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for c, child in self._goto[node].items():
+                f = self._fail[node]
+                while f and c not in self._goto[f]:
+                    f = self._fail[f]
+                f = self._goto[f].get(c, 0)
+                self._fail[child] = f
+                self._out[child] = f if self._rule[f] >= 0 else self._out[f]
+                queue.append(child)
+
+    def find_all(self, text: str):
+        """全ルールの全出現を (開始, 終了, ルール番号) で返す（重なりも含む）"""
+        goto, fail, rule, out = self._goto, self._fail, self._rule, self._out
+        node = 0
+        for i, c in enumerate(text):
+            while node and c not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(c, 0)
+            n = node if rule[node] >= 0 else out[node]
+            while n:
+                r = rule[n]
+                yield i + 1 - len(self.rules[r][0]), i + 1, r
+                n = out[n]
+
+    def select(self, text: str) -> list[tuple[int, int, int]]:
+        """置換する出現を選ぶ（左から、同じ開始位置なら最長、重なるものは捨てる）"""
+        longest = {}
+        for start, end, r in self.find_all(text):
+            if end > longest.get(start, (0, -1))[0]:
+                longest[start] = (end, r)
+        chosen = []
+        pos = 0
+        for start in sorted(longest):
+            if start >= pos:
+                end, r = longest[start]
+                chosen.append((start, end, r))
+                pos = end
+        return chosen
+
+    def rewrite(self, text: str) -> tuple[str, list[RuleHit]]:
+        """ルールを適用したテキストと、適用したルールの一覧"""
+        if not self.rules:
+            return text, []
+        parts, hits = [], []
+        pos = 0
+        for start, end, r in self.select(text):
+            orig, alias = self.rules[r]
+            parts.append(text[pos:start])
+            parts.append(alias)
+            hits.append(RuleHit(orig, alias, start))
+            pos = end
+        if not hits:
+            return text, []
+        parts.append(text[pos:])
+        return "".join(parts), hits
+
+
+def load_rules(path: str = BULK_RULES_PATH) -> list[tuple[str, str]]:
+    """INITIAL_RULES + TSV のルール（TSV がなければ INITIAL_RULES のみ）"""
+    rules = list(INITIAL_RULES)
+    if os.path.exists(path):
+        rules += read_rules_tsv(path)
+    return rules
+
+
+_compiled: dict[str, tuple[float | None, PronunciationRewriter]] = {}
+
+
+def get_rewriter(path: str = BULK_RULES_PATH) -> PronunciationRewriter:
+    """コンパイル済みのオートマトン（TSV の更新時刻が変わったら作り直す）"""
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    cached = _compiled.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, PronunciationRewriter(load_rules(path)))
+        _compiled[path] = cached
+    return cached[1]
+
+
+def rewriter_from_config(config: dict) -> PronunciationRewriter | None:
+    """config.json で有効ならオートマトンを返す（"local_pronunciation": true）"""
+    if not config.get("local_pronunciation", False):
+        return None
+    return get_rewriter()
+
+
+def format_hits(hits: list[RuleHit]) -> str:
+    """ログ表示用: 流石→さすが, 貴方→あなた"""
+    return ", ".join(f"{h.original}→{h.alias}" for h in hits)
@@ -0,0 +1,174 @@
+"""発音ルールのカバレッジ集計（どのルールが台本で実際に使われているか）
+
+_elevenlabs.csv を core.rewriter のオートマトンで1回ずつなめ、ルールごとに
+- 適用回数（ローカル適用で実際に置換される回数）
+- 出現したが、重なる別ルールが優先されて適用されなかった回数（隠れ）
+を数え、置換が1つ以上ある行数も集計する。
+
+ファイルごとの集計はファイル内容のハッシュとルール集合のハッシュをキーに
+rule_coverage_index.json に保存するので、過去の台本をまとめて集計し直すときは
+変わったファイルだけ読む。
+"""
+import glob
+import hashlib
+import json
+import os
+from collections import Counter
+
+from core.config import BASE_DIR
+from core.csv_io import read_csv_rows
+from core.rewriter import PronunciationRewriter
+
+INDEX_PATH = os.path.join(BASE_DIR, "rule_coverage_index.json")
+CSV_SUFFIX = "_elevenlabs.csv"
+
+
+def rules_fingerprint(rewriter: PronunciationRewriter) -> str:
+    """ルール集合のハッシュ（ルールが変わったら集計し直す）"""
+    raw = "\n".join(f"{orig}\t{alias}" for orig, alias in rewriter.rules)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def find_csv_files(paths: list[str]) -> list[str]:
+    """ファイルはそのまま、フォルダは配下の *_elevenlabs.csv を再帰的に集める"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "**", f"*{CSV_SUFFIX}"), recursive=True))
+        elif os.path.isfile(path):
+            files.append(path)
+    # 同じファイルを2回数えない
+    return list(dict.fromkeys(os.path.abspath(f) for f in files))
+
+
+def scan_text(rewriter: PronunciationRewriter, text: str) -> tuple[Counter, Counter]:
+    """1行分の (適用回数, 隠れ回数) を原文キーで数える
+
+    隠れ回数のキーは "隠れたルール\\t優先されたルール"
+    """
+    hits, shadowed = Counter(), Counter()
+    chosen = rewriter.select(text)
+    for start, end, r in chosen:
+        hits[rewriter.rules[r][0]] += 1
+    taken = {(start, r) for start, _, r in chosen}
+    for start, end, r in rewriter.find_all(text):
+        if (start, r) in taken:
+            continue
+        # 重なっている採用側のルール
+        for s, e, winner in chosen:
+            if s < end and start < e:
+                shadowed[f"{rewriter.rules[r][0]}\t{rewriter.rules[winner][0]}"] += 1
+                break
+    return hits, shadowed
+
+
+def scan_file(rewriter: PronunciationRewriter, path: str) -> dict:
+    """1ファイル分の集計（インデックスに保存する形）"""
+    hits, shadowed = Counter(), Counter()
+    rows = read_csv_rows(path)
+    touched = 0
+    for row in rows:
+        line_hits, line_shadowed = scan_text(rewriter, row["text"])
+        if line_hits:
+            touched += 1
+        hits.update(line_hits)
+        shadowed.update(line_shadowed)
+    return {"lines": len(rows), "touched": touched, "hits": dict(hits), "shadowed": dict(shadowed)}
+
+
+def load_index(path: str = INDEX_PATH) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(index: dict, path: str = INDEX_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def static_overlaps(rewriter: PronunciationRewriter) -> list[tuple[str, str]]:
+    """他のルールの原文に含まれるルール (短い方, 長い方)。台本によっては長い方に隠れる"""
+    pairs = []
+    for longer, _ in rewriter.rules:
+        for start, end, r in rewriter.find_all(longer):
+            shorter = rewriter.rules[r][0]
+            if shorter != longer:
+                pairs.append((shorter, longer))
+    return sorted(set(pairs))
+
+
+def collect_coverage(rewriter: PronunciationRewriter, paths: list[str],
+                     index_path: str = INDEX_PATH) -> dict:
+    """複数のCSVを集計する（インデックスにあるファイルは読み直さない）
+
+    Returns:
+        {"files": ファイル数, "scanned": 今回読んだファイル数, "lines": 行数, "touched": 置換のある行数,
+         "hits": Counter, "shadowed": Counter, "unused": [一度も適用されないルール],
+         "overlaps": [(短い方, 長い方)]}
+    """
+    fingerprint = rules_fingerprint(rewriter)
+    index = load_index(index_path)
+    entries = index.get(fingerprint, {})
+    files = find_csv_files(paths)
+
+    total = {"files": len(files), "scanned": 0, "lines": 0, "touched": 0,
+             "hits": Counter(), "shadowed": Counter()}
+    for path in files:
+        digest = file_hash(path)
+        entry = entries.get(digest)
+        if entry is None:
+            entry = scan_file(rewriter, path)
+            entries[digest] = entry
+            total["scanned"] += 1
+        total["lines"] += entry["lines"]
+        total["touched"] += entry["touched"]
+        total["hits"].update(entry["hits"])
+        total["shadowed"].update(entry["shadowed"])
+
+    if total["scanned"] or fingerprint not in index:
+        # ルール集合が変わったら古い集計は使わないので捨てる
+        save_index({fingerprint: entries}, index_path)
+
+    total["unused"] = [orig for orig, _ in rewriter.rules if not total["hits"][orig]]
+    total["overlaps"] = static_overlaps(rewriter)
+    return total
+
+
+def print_coverage(result: dict, top: int = 30):
+    """collect_coverage の結果を表示"""
+    lines = result["lines"]
+    ratio = result["touched"] / lines if lines else 0.0
+    print(f"CSV: {result['files']}件（今回読み込み {result['scanned']}件）")
+    print(f"行数: {lines}（置換あり {result['touched']}行, {ratio:.1%}）")
+
+    used = result["hits"].most_common()
+    print(f"\n適用されたルール: {len(used)}件")
+    for orig, count in used[:top]:
+        print(f"  {count:6d}  {orig}")
+    if len(used) > top:
+        print(f"  ...他 {len(used) - top}件")
+
+    if result["shadowed"]:
+        print(f"\n他のルールに隠れた出現:")
+        for key, count in result["shadowed"].most_common(top):
+            loser, winner = key.split("\t")
+            print(f"  {count:6d}  {loser}（{winner} が優先）")
+
+    if result["overlaps"]:
+        print(f"\n重なりのあるルール（短い方が長い方に含まれる）:")
+        for shorter, longer in result["overlaps"]:
+            print(f"  {shorter} ⊂ {longer}")
+
+    print(f"\n一度も適用されないルール: {len(result['unused'])}件")
+    for orig in result["unused"]:
+        print(f"  {orig}")
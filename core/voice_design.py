@@ -0,0 +1,304 @@
+"""ボイスデザイン / リミックスのプレビュー生成（並列）
+
+text_to_voice.create_previews / remix を候補数ぶん同時に呼び、届いた順に
+base64 をデコードしてコールバックに渡す。6種でも待ち時間はほぼ1回分で済み、
+GUIは届いた候補から再生できる。デコードはワーカースレッドで行うのでUIを止めない。
+
+design_batch はプロンプトシート（キャラごとの説明文）の全キャラ分をまとめて生成し、
+候補の音声とメタデータをフォルダに保存する（cli/batch_voice_design.py）。
+"""
+import base64
+import csv
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable
+
+from core.config import BASE_DIR
+
+# 同時リクエスト数の上限（GUIの候補数は最大6）
+MAX_PREVIEW_WORKERS = 6
+# レート制限・一時的なサーバーエラーのときの再試行
+RETRY_STATUS = (429, 500, 502, 503)
+MAX_RETRIES = 3
+RETRY_WAIT = 2.0
+
+VOICE_LOG_PATH = os.path.join(BASE_DIR, "voice_design_log.jsonl")
+BATCH_OUTPUT_DIR = os.path.join(BASE_DIR, "output", "voice_design")
+# プロンプトシートの既定値（GUIの初期値と同じ）
+DEFAULT_GUIDANCE = 2.0
+DEFAULT_COUNT = 3
+# サンプルテキストはこれより短いと API に拒否されるので自動生成に切り替える
+MIN_SAMPLE_TEXT = 100
+
+_log_lock = threading.Lock()
+
+
+@dataclass
+class VoicePreview:
+    """プレビュー候補1件"""
+    index: int                  # 何番目の候補か（0始まり。表示行に対応）
+    generated_voice_id: str
+    audio_bytes: bytes
+    seed: int
+
+
+def random_seed() -> int:
+    return random.randint(0, 2147483647)
+
+
+def append_voice_log(entry: dict, log_path: str = VOICE_LOG_PATH):
+    """ボイスデザイン/リミックスの操作ログをJSONLファイルに追記（スレッドから呼んでよい）"""
+    entry["timestamp"] = datetime.now().isoformat()
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _log_lock:
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def call_with_retry(request: Callable[[int], object], seed: int):
+    """request(seed) を呼ぶ。429・5xx は間隔を倍にしながら再試行する"""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return request(seed)
+        except Exception as e:
+            if getattr(e, "status_code", None) not in RETRY_STATUS or attempt == MAX_RETRIES:
+                raise
+            time.sleep(RETRY_WAIT * 2 ** attempt)
+
+
+def decode_preview(response, index: int, seed: int, fallback_prefix: str = "preview") -> VoicePreview | None:
+    """create_previews / remix の応答から最初の候補を取り出してデコードする"""
+    previews = response.previews if hasattr(response, "previews") else [response]
+    if not previews:
+        return None
+    preview = previews[0]
+    audio_b64 = getattr(preview, "audio_base_64", None)
+    audio_bytes = base64.b64decode(audio_b64) if audio_b64 else b""
+    voice_id = getattr(preview, "generated_voice_id", None) or f"{fallback_prefix}_{index}"
+    return VoicePreview(index, voice_id, audio_bytes, seed)
+
+
+def generate_previews(
+    request: Callable[[int], object],
+    count: int,
+    on_ready: Callable[[VoicePreview], None],
+    on_error: Callable[[int, Exception], None] | None = None,
+    fallback_prefix: str = "preview",
+    max_workers: int = MAX_PREVIEW_WORKERS,
+    executor: Executor | None = None,
+) -> list[VoicePreview]:
+    """request(seed) を count 回同時に呼び、候補が届くたびに on_ready(preview) を呼ぶ
+
+    毎回違う seed を渡すので、確実に全部違う声になる。コールバックはワーカースレッドから
+    呼ばれる（GUIの更新は after で UI スレッドに回すこと）。失敗した候補は on_error(index, 例外)。
+    on_ready が例外を出した候補も on_error に回し、残りの候補はそのまま続ける。
+    executor を渡すとそのプールで実行する（複数キャラで同時実行数の上限を共有する）。
+
+    Returns:
+        成功した候補（index 順）
+    """
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=max(1, min(count, max_workers))) as pool:
+            return generate_previews(request, count, on_ready, on_error, fallback_prefix, executor=pool)
+
+    results = []
+    futures = _submit_previews(request, count, executor, fallback_prefix)
+    for future in as_completed(futures):
+        index = futures[future]
+        preview, error = _preview_result(future)
+        if preview is not None:
+            try:
+                on_ready(preview)
+                results.append(preview)
+                continue
+            except Exception as e:
+                error = e
+        if on_error:
+            on_error(index, error)
+    return sorted(results, key=lambda p: p.index)
+
+
+def _submit_previews(request: Callable[[int], object], count: int, executor: Executor,
+                     fallback_prefix: str = "preview") -> dict[Future, int]:
+    """request(seed) を count 回 executor に投入する。Future → 候補番号"""
+    def job(index: int, seed: int) -> VoicePreview | None:
+        return decode_preview(call_with_retry(request, seed), index, seed, fallback_prefix)
+
+    return {executor.submit(job, i, random_seed()): i for i in range(count)}
+
+
+def _preview_result(future: Future) -> tuple[VoicePreview | None, Exception | None]:
+    """(候補, 失敗の理由)"""
+    try:
+        preview = future.result()
+    except Exception as e:
+        return None, e
+    if preview is None:
+        return None, ValueError("プレビューが返されませんでした")
+    return preview, None
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# プロンプトシートからの一括生成
+# ══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class VoicePrompt:
+    """プロンプトシートの1行（キャラ1人分）"""
+    char_name: str
+    description: str
+    guidance: float = DEFAULT_GUIDANCE
+    sample_text: str | None = None      # None なら API が自動生成
+    count: int = DEFAULT_COUNT
+
+
+def read_prompt_sheet(path: str) -> tuple[list[VoicePrompt], list[str]]:
+    """プロンプトシート（CSV）を読む。
+
+    列: character, description, guidance, sample_text, count
+    （guidance / sample_text / count は省略可。空欄は既定値）
+
+    Returns:
+        (プロンプト, エラーメッセージ)。エラーのある行はプロンプトに含めない
+    """
+    prompts, errors = [], []
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        missing = {"character", "description"} - set(reader.fieldnames or [])
+        if missing:
+            return [], [f"列がありません: {', '.join(sorted(missing))}"]
+        for line_no, row in enumerate(reader, start=2):
+            name = (row.get("character") or "").strip()
+            desc = (row.get("description") or "").strip()
+            if not name and not desc:
+                continue
+            if not name or not desc:
+                errors.append(f"{line_no}行目: character と description は必須です")
+                continue
+            try:
+                guidance = float(row.get("guidance") or DEFAULT_GUIDANCE)
+                count = int(row.get("count") or DEFAULT_COUNT)
+            except ValueError:
+                errors.append(f"{line_no}行目 ({name}): guidance / count が数値ではありません")
+                continue
+            if count < 1:
+                errors.append(f"{line_no}行目 ({name}): count は1以上にしてください")
+                continue
+            sample = (row.get("sample_text") or "").strip() or None
+            if sample and len(sample) < MIN_SAMPLE_TEXT:
+                errors.append(f"{line_no}行目 ({name}): sample_text が{len(sample)}文字のため自動生成に切り替えます"
+                              f"（{MIN_SAMPLE_TEXT}文字以上必要）")
+                sample = None
+            prompts.append(VoicePrompt(name, desc, guidance, sample, count))
+    return prompts, errors
+
+
+def _safe_dirname(name: str) -> str:
+    return "".join("_" if c in '\\/:*?"<>|' else c for c in name).strip() or "_"
+
+
+def design_batch(
+    client,
+    prompts: list[VoicePrompt],
+    out_dir: str,
+    concurrency: int = MAX_PREVIEW_WORKERS,
+    batch_name: str = "",
+    log: Callable[[str], None] = print,
+    log_path: str = VOICE_LOG_PATH,
+) -> list[dict]:
+    """全キャラの候補を同時に生成し、out_dir/<キャラ名>/ に保存する
+
+    API の同時リクエスト数は全キャラ合計で concurrency 以下。候補の音声は
+    <番号>_<generated_voice_id>.mp3、キャラごとのメタデータは candidates.json に書き、
+    候補1件ごとに voice_design_log.jsonl にも記録する（GUIの履歴タブから試聴できる）。
+
+    Returns:
+        キャラごとの結果 [{"char_name", "dir", "candidates": [...], "errors": [...]}]
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    results = [{"char_name": prompt.char_name, "dir": os.path.join(out_dir, _safe_dirname(prompt.char_name)),
+                "candidates": [], "errors": []} for prompt in prompts]
+
+    def make_request(prompt: VoicePrompt):
+        def request(seed):
+            return client.text_to_voice.create_previews(
+                voice_description=prompt.description,
+                text=prompt.sample_text,
+                auto_generate_text=prompt.sample_text is None,
+                guidance_scale=prompt.guidance,
+                seed=seed,
+            )
+        return request
+
+    def on_ready(prompt: VoicePrompt, result: dict, preview: VoicePreview):
+        path = os.path.join(result["dir"], f"{preview.index + 1:02d}_{preview.generated_voice_id}.mp3")
+        with open(path, "wb") as f:
+            f.write(preview.audio_bytes)
+        result["candidates"].append({
+            "index": preview.index,
+            "generated_voice_id": preview.generated_voice_id,
+            "seed": preview.seed,
+            "path": path,
+        })
+        append_voice_log({
+            "type": "preview_design",
+            "char_name": prompt.char_name,
+            "voice_id": preview.generated_voice_id,
+            "generated_voice_id": preview.generated_voice_id,
+            "prompt": prompt.description,
+            "guidance_scale": prompt.guidance,
+            "preview_index": preview.index,
+            "preview_count": prompt.count,
+            "seed": preview.seed,
+            "preview_path": path,
+            "batch": batch_name,
+        }, log_path)
+        log(f"  {prompt.char_name} #{preview.index + 1} 生成完了: {preview.generated_voice_id[:24]}")
+
+    def on_error(prompt: VoicePrompt, result: dict, index: int, e: Exception):
+        result["errors"].append({"index": index, "error": str(e)})
+        log(f"  {prompt.char_name} #{index + 1} 生成失敗: {e}")
+
+    def write_candidates(prompt: VoicePrompt, result: dict):
+        result["candidates"].sort(key=lambda c: c["index"])
+        result["errors"].sort(key=lambda e: e["index"])
+        meta = {
+            "prompt": asdict(prompt),
+            "batch": batch_name,
+            "created": datetime.now().isoformat(),
+            "candidates": [{**c, "path": os.path.basename(c["path"])} for c in result["candidates"]],
+            "errors": result["errors"],
+        }
+        with open(os.path.join(result["dir"], "candidates.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    # 全キャラの候補を1つのプールに投入し、届いた順にこのスレッドで保存する
+    # （キャラごとの待ち合わせスレッドは作らない）
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {}
+        for i, prompt in enumerate(prompts):
+            os.makedirs(results[i]["dir"], exist_ok=True)
+            for future, index in _submit_previews(make_request(prompt), prompt.count, pool).items():
+                futures[future] = (i, index)
+        remaining = [prompt.count for prompt in prompts]
+        for future in as_completed(futures):
+            i, index = futures[future]
+            preview, error = _preview_result(future)
+            if preview is not None:
+                try:
+                    on_ready(prompts[i], results[i], preview)
+                except Exception as e:    # 保存に失敗しても他の候補は続ける
+                    error = e
+                    preview = None
+            if preview is None:
+                on_error(prompts[i], results[i], index, error)
+            remaining[i] -= 1
+            if remaining[i] == 0:
+                write_candidates(prompts[i], results[i])
+    return results
@@ -0,0 +1,167 @@
+"""ボイスデザイン履歴の索引（voice_design_log.jsonl → SQLite）
+
+ログ本体は今までどおり JSONL に追記し、この索引は読み込んだ位置（バイトオフセット）から
+後ろだけを取り込む。履歴タブの更新のたびにログ全体を読み直さず、
+ページ単位の取得と検索（プロンプト・キャラ名・voice_id）が数ミリ秒で済む。
+
+検索は FTS5 の trigram トークナイザ（日本語も部分一致できる）を使い、2文字以下の語や
+FTS5 が使えない SQLite では LIKE で探す。ログが切り詰められたり置き換えられたりしたら作り直す。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+
+from core.voice_design import VOICE_LOG_PATH
+
+PAGE_SIZE = 100
+# ログの先頭をこのバイト数だけハッシュして、置き換えを検出する
+HEAD_BYTES = 4096
+# trigram は3文字未満の語を検索できない
+MIN_FTS_TERM = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT,
+    type TEXT,
+    char_name TEXT,
+    voice_id TEXT,
+    prompt TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_type ON entries(type);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def default_db_path(log_path: str) -> str:
+    """ログの隣に置く（voice_design_log.jsonl → voice_design_log.sqlite）"""
+    return os.path.splitext(log_path)[0] + ".sqlite"
+
+
+def _head_hash(f, length: int) -> str:
+    f.seek(0)
+    return hashlib.sha1(f.read(length)).hexdigest()
+
+
+class VoiceHistory:
+    """履歴の索引。作成したスレッドからだけ使う"""
+
+    def __init__(self, log_path: str = VOICE_LOG_PATH, db_path: str | None = None):
+        self.log_path = log_path
+        self.db_path = db_path or default_db_path(log_path)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executescript(_SCHEMA)
+        try:
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts "
+                "USING fts5(prompt, char_name, voice_id, tokenize='trigram')")
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # FTS5 / trigram のない SQLite（3.34 未満など）
+            self.has_fts = False
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def _meta(self, key: str, default: str = "") -> str:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _clear(self):
+        self.conn.execute("DELETE FROM entries")
+        if self.has_fts:
+            self.conn.execute("DELETE FROM entries_fts")
+
+    def ingest(self) -> int:
+        """ログの未取り込み部分を取り込む。取り込んだ件数を返す"""
+        if not os.path.exists(self.log_path):
+            if self._meta("offset", "0") != "0":
+                self._clear()
+                self._set_meta("offset", "0")
+                self.conn.commit()
+            return 0
+
+        offset = int(self._meta("offset", "0"))
+        with open(self.log_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            head_len = min(offset, HEAD_BYTES)
+            if size < offset or (offset and _head_hash(f, head_len) != self._meta("head")):
+                # 切り詰め・置き換え → 最初から取り込み直す
+                self._clear()
+                offset = 0
+            f.seek(offset)
+            data = f.read()
+            # 書き込み途中の最終行は次回に回す
+            end = data.rfind(b"\n") + 1
+            data = data[:end]
+            new_offset = offset + end
+            head = _head_hash(f, min(new_offset, HEAD_BYTES))
+
+        rows = []
+        for line in data.decode("utf-8", "replace").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(entry, dict):
+                continue
+            rows.append((
+                str(entry.get("timestamp", "")), str(entry.get("type", "")),
+                str(entry.get("char_name", "")), str(entry.get("voice_id", "")),
+                str(entry.get("prompt", "")), line,
+            ))
+
+        with self.conn:
+            for row in rows:
+                cur = self.conn.execute(
+                    "INSERT INTO entries (timestamp, type, char_name, voice_id, prompt, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", row)
+                if self.has_fts:
+                    self.conn.execute(
+                        "INSERT INTO entries_fts (rowid, prompt, char_name, voice_id) VALUES (?, ?, ?, ?)",
+                        (cur.lastrowid, row[4], row[2], row[3]))
+            self._set_meta("offset", str(new_offset))
+            self._set_meta("head", head)
+        return len(rows)
+
+    def _where(self, search: str, types: list[str] | None) -> tuple[str, list]:
+        clauses, params = [], []
+        if types:
+            clauses.append(f"type IN ({', '.join('?' * len(types))})")
+            params += types
+        fts_terms = []
+        for term in search.split():
+            if self.has_fts and len(term) >= MIN_FTS_TERM:
+                fts_terms.append('"' + term.replace('"', '""') + '"')
+            else:
+                like = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                clauses.append("(prompt LIKE ? ESCAPE '\\' OR char_name LIKE ? ESCAPE '\\' "
+                               "OR voice_id LIKE ? ESCAPE '\\')")
+                params += [like, like, like]
+        if fts_terms:
+            clauses.append("id IN (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?)")
+            params.append(" AND ".join(fts_terms))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, search: str = "", types: list[str] | None = None,
+              limit: int = PAGE_SIZE, offset: int = 0) -> tuple[list[dict], int]:
+        """新しい順に1ページ分の履歴と、条件に合う総件数を返す
+
+        search: 空白区切りの語をすべて含むもの（プロンプト・キャラ名・voice_id の部分一致）
+        types: 種別で絞り込む（"design", "remix", "preview_design", "preview_remix"）
+        """
+        where, params = self._where(search, types)
+        total = self.conn.execute(f"SELECT COUNT(*) FROM entries{where}", params).fetchone()[0]
+        rows = self.conn.execute(
+            f"SELECT data FROM entries{where} ORDER BY id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]).fetchall()
+        return [json.loads(data) for (data,) in rows], total
@@ -0,0 +1,158 @@
+"""CSV保存の監視と差分検出（pipeline.py --watch 用）
+
+watchdog がインストールされていればOSの変更通知（Linux: inotify / Windows: ReadDirectoryChangesW）
+で即座に反応し、なければ更新時刻のポーリングで監視する。
+差分はマニフェスト (_manifest.json) に記録したセリフのハッシュと比べて連番単位で求める。
+"""
+import glob
+import os
+import threading
+import time
+
+from core.alignment import discard_alignment
+from core.generator import dialogue_filename
+from core.manifest import RunManifest, text_hash
+from core.parser import DialogueLine
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    HAS_WATCHDOG = True
+except ImportError:
+    HAS_WATCHDOG = False
+
+# 保存が落ち着いたとみなすまでの待ち時間（秒）。エディタ/Excelは一時ファイル経由で複数回書く
+DEFAULT_DEBOUNCE = 0.5
+# ポーリング間隔（秒）
+POLL_INTERVAL = 0.5
+# 通知モードでも取りこぼし対策に確認する間隔（秒）
+NOTIFY_FALLBACK_INTERVAL = 5.0
+
+
+def _stamp(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class FileWatcher:
+    """指定ファイルの変更を待つ"""
+
+    def __init__(self, paths: list[str], debounce: float = DEFAULT_DEBOUNCE,
+                 poll_interval: float = POLL_INTERVAL):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._stamps = {p: _stamp(p) for p in self.paths}
+        self._event = threading.Event()
+        self._observer = None
+        if HAS_WATCHDOG:
+            self._start_observer()
+
+    @property
+    def mode(self) -> str:
+        return "変更通知" if self._observer else "ポーリング"
+
+    def _start_observer(self):
+        watched = {os.path.normcase(p) for p in self.paths}
+        event = self._event
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, e):
+                for path in (e.src_path, getattr(e, "dest_path", "")):
+                    if path and os.path.normcase(os.path.abspath(path)) in watched:
+                        event.set()
+
+        observer = Observer()
+        for d in sorted({os.path.dirname(p) for p in self.paths}):
+            observer.schedule(Handler(), d, recursive=False)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+
+    def _snapshot(self) -> dict:
+        return {p: _stamp(p) for p in self.paths}
+
+    def wait(self, timeout: float | None = None) -> list[str]:
+        """変更があるまで待ち、保存が落ち着いてから変更されたファイルを返す（タイムアウト時は空）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = NOTIFY_FALLBACK_INTERVAL if self._observer else self.poll_interval
+        snapshot = self._snapshot()
+        while snapshot == self._stamps:
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            self._event.wait(interval)
+            self._event.clear()
+            snapshot = self._snapshot()
+
+        # デバウンス: debounce 秒間変化がなくなるまで待つ
+        while True:
+            time.sleep(self.debounce)
+            latest = self._snapshot()
+            if latest == snapshot:
+                break
+            snapshot = latest
+        self._event.clear()
+
+        changed = [p for p in self.paths if snapshot[p] != self._stamps[p]]
+        self._stamps = snapshot
+        return changed
+
+    def close(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+            self._observer = None
+
+
+# ══════════════════════════════════════════════════════════════════
+# 差分検出
+# ══════════════════════════════════════════════════════════════════
+
+def diff_dialogues(
+    dialogues: list[DialogueLine],
+    manifest: RunManifest,
+    voice_dir: str,
+) -> tuple[list[DialogueLine], list[int]]:
+    """再生成が必要なセリフと、台本から消えた連番を返す
+
+    マニフェストにない連番でも、同じセリフのファイル名のMP3が既にあれば
+    生成済みとみなしてマニフェストに取り込む（--watch 導入前に生成したフォルダ向け）。
+    """
+    changed = []
+    for d in dialogues:
+        h = text_hash(d.character, d.text)
+        entry = manifest.entries.get(str(d.index))
+        if entry is None:
+            filename = dialogue_filename(d)
+            if os.path.exists(os.path.join(voice_dir, filename)):
+                manifest.entries[str(d.index)] = {
+                    "character": d.character, "status": "success",
+                    "updated": time.time(), "text_hash": h, "filename": filename,
+                }
+                continue
+            changed.append(d)
+            continue
+        if (entry.get("status") != "success"
+                or entry.get("text_hash") != h
+                or not os.path.exists(os.path.join(voice_dir, entry.get("filename", "")))):
+            changed.append(d)
+
+    current = {str(d.index) for d in dialogues}
+    removed = sorted(int(s) for s in manifest.entries if s not in current)
+    return changed, removed
+
+
+def remove_serial_files(voice_dir: str, serial: int) -> list[str]:
+    """連番のMP3（旧セリフのファイル名のもの含む）を削除し、削除したファイル名を返す
+
+    アライメントファイル（.alignment.json）も一緒に消す。
+    """
+    removed = []
+    for path in glob.glob(os.path.join(glob.escape(voice_dir), f"{serial}_*.mp3")):
+        os.remove(path)
+        discard_alignment(path)
+        removed.append(os.path.basename(path))
+    return removed
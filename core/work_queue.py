@@ -0,0 +1,179 @@
+"""共有フォルダ上の作業キュー（SQLite）による複数マシン分散生成
+
+コーディネーターが連番ごとのタスクを登録し、各ワーカーはリース付きで
+タスクを取得して生成する。ワーカーが落ちてもリース期限切れで他が再取得する。
+
+populate() はタスクと一緒に実行ID（run_id）を書いて実行を「開始」にし、コーディネーターが
+終わると close_run() で「終了」にする。ワーカーは開始中の実行が現れるまで待つので、
+コーディネーターより先に起動しても、前回の実行が残ったキューでもすぐには終了しない。
+
+ネットワークドライブ上の SQLite はWALが使えないため journal_mode=DELETE で開き、
+書き込みは BEGIN IMMEDIATE で直列化する。
+"""
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from dataclasses import asdict
+
+from core.parser import DialogueLine
+
+QUEUE_NAME = "_queue.sqlite"
+# リース期限（秒）。この間に完了報告がなければ他ワーカーが再取得できる
+DEFAULT_LEASE_SECONDS = 300
+# 1タスクの最大試行回数（超えたら failed のまま）
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """連番単位のタスクキュー"""
+
+    def __init__(self, db_path: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                serial      INTEGER PRIMARY KEY,
+                payload     TEXT NOT NULL,
+                status      TEXT NOT NULL DEFAULT 'pending',
+                worker      TEXT,
+                lease_until REAL,
+                attempts    INTEGER NOT NULL DEFAULT 0,
+                result      TEXT
+            )
+        """)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def close(self):
+        self._conn.close()
+
+    def _write(self, sql: str, params=()) -> sqlite3.Cursor:
+        """BEGIN IMMEDIATE で書き込みロックを取ってから実行"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = self._conn.execute(sql, params)
+            self._conn.execute("COMMIT")
+            return cur
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def populate(self, dialogues: list[DialogueLine], reset: bool = False) -> int:
+        """タスクを登録する。登録（再登録）件数を返す。
+
+        既存タスクはセリフが変わったもの・失敗したものだけ未着手に戻し、dialogues にない連番
+        （前回の実行の行・台本から消えた行）は消す。reset=True なら全タスクを作り直す。
+        登録と同時に新しい実行を開始する。
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if reset:
+                self._conn.execute("DELETE FROM tasks")
+            else:
+                self._conn.execute("DELETE FROM tasks WHERE serial NOT IN (SELECT value FROM json_each(?))",
+                                   (json.dumps([d.index for d in dialogues]),))
+            before = self._conn.total_changes
+            self._conn.executemany(
+                """INSERT INTO tasks (serial, payload) VALUES (?, ?)
+                   ON CONFLICT (serial) DO UPDATE SET
+                       payload = excluded.payload, status = 'pending', worker = NULL,
+                       lease_until = NULL, attempts = 0, result = NULL
+                   WHERE tasks.payload != excluded.payload OR tasks.status = 'failed'""",
+                [(d.index, json.dumps(asdict(d), ensure_ascii=False)) for d in dialogues],
+            )
+            added = self._conn.total_changes - before
+            self._conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                   [("run_id", uuid.uuid4().hex), ("run_state", "open")])
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def current_run(self) -> str | None:
+        """開始中の実行の run_id（登録前・終了後は None）"""
+        meta = dict(self._conn.execute(
+            "SELECT key, value FROM meta WHERE key IN ('run_id', 'run_state')").fetchall())
+        return meta.get("run_id") if meta.get("run_state") == "open" else None
+
+    def close_run(self):
+        """実行を終了にする（コーディネーターが結果を集めたあと）"""
+        self._write("INSERT OR REPLACE INTO meta (key, value) VALUES ('run_state', 'closed')")
+
+    def claim(self, worker_id: str, batch: int = 1) -> list[DialogueLine]:
+        """未着手またはリース切れのタスクを batch 件まで取得する"""
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._conn.execute(
+                """SELECT serial, payload FROM tasks
+                   WHERE (status = 'pending' OR (status = 'claimed' AND lease_until < ?))
+                     AND attempts < ?
+                   ORDER BY serial LIMIT ?""",
+                (now, self.max_attempts, batch),
+            ).fetchall()
+            self._conn.executemany(
+                """UPDATE tasks SET status = 'claimed', worker = ?, lease_until = ?,
+                   attempts = attempts + 1 WHERE serial = ?""",
+                [(worker_id, now + self.lease_seconds, serial) for serial, _ in rows],
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return [DialogueLine(**json.loads(payload)) for _, payload in rows]
+
+    def renew(self, worker_id: str, serials: list[int]):
+        """処理中タスクのリースを延長"""
+        until = time.time() + self.lease_seconds
+        for serial in serials:
+            self._write("UPDATE tasks SET lease_until = ? WHERE serial = ? AND worker = ? AND status = 'claimed'",
+                        (until, serial, worker_id))
+
+    def complete(self, worker_id: str, result: dict):
+        """結果を報告。エラーは試行回数が残っていれば pending に戻す"""
+        serial = result["index"]
+        if result["status"] == "error":
+            status_sql = "CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END"
+            params = (self.max_attempts,)
+        else:
+            status_sql = "'done'"
+            params = ()
+        self._write(
+            f"""UPDATE tasks SET status = {status_sql}, result = ?, lease_until = NULL
+                WHERE serial = ? AND worker = ?""",
+            params + (json.dumps(result, ensure_ascii=False), serial, worker_id),
+        )
+
+    def counts(self) -> dict[str, int]:
+        rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return dict(rows)
+
+    def is_finished(self) -> bool:
+        """全タスクが done / failed（または試行上限に達した）なら True"""
+        row = self._conn.execute(
+            """SELECT COUNT(*) FROM tasks
+               WHERE status NOT IN ('done', 'failed') AND attempts < ?""",
+            (self.max_attempts,),
+        ).fetchone()
+        claimed_alive = self._conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status = 'claimed' AND lease_until >= ?",
+            (time.time(),),
+        ).fetchone()
+        return row[0] == 0 and claimed_alive[0] == 0
+
+    def results(self) -> list[dict]:
+        rows = self._conn.execute(
+            "SELECT result FROM tasks WHERE result IS NOT NULL ORDER BY serial").fetchall()
+        return [json.loads(r[0]) for r in rows]
@@ -0,0 +1,228 @@
+"""YMM4 プロジェクト (.ymmp) の読み込みと索引
+
+ymmp は数MBの JSON なので、パイプラインの各ステップ（立ち絵パスチェック・キャラ存在チェック・
+テロップ検証・最終ボイス検証）で何度も json.load しないよう、パス+サイズ+更新時刻が
+変わるまで読み込んだ結果を使い回す。キャラ名・VoiceItem（フレーム位置・連番）の索引は
+読み込み時に1回だけ作る。
+
+update_voices() は台本の一部だけ直したとき用で、作り直した連番の VoiceItem だけを
+索引で探して音声パス・長さを差し替え、後ろのアイテムを長さの差だけずらす（手作業の編集は残る）。
+"""
+import bisect
+import json
+import math
+import ntpath
+import os
+import re
+from dataclasses import dataclass, field
+
+from core.csv_io import file_key
+from core.mp3 import read_layout_file
+
+VOICE_ITEM_TYPE = "YukkuriMovieMaker.Project.Items.VoiceItem"
+
+# ボイスファイル名の先頭の連番（1_ヒナ_セリフ内容.mp3）
+_SERIAL_RE = re.compile(r"^(\d+)_")
+# VoiceLength（.NET の TimeSpan: 00:00:03.4560000）
+_TIMESPAN_RE = re.compile(r"^(?:(\d+)\.)?(\d+):(\d+):(\d+(?:\.\d+)?)$")
+DEFAULT_FPS = 60
+
+
+def voice_serial(path: str) -> int | None:
+    """ボイスファイルのパスから連番を取り出す（Windows パスにも対応）"""
+    m = _SERIAL_RE.match(ntpath.basename(path or ""))
+    return int(m.group(1)) if m else None
+
+
+def is_voice_item(item: dict) -> bool:
+    return item.get("$type", "").startswith(VOICE_ITEM_TYPE)
+
+
+@dataclass
+class YmmpDocument:
+    """読み込んだ ymmp と索引。data を書き換えたら reindex() を呼ぶこと"""
+    path: str
+    data: dict
+    characters: dict[str, dict] = field(default_factory=dict)      # キャラ名 → Characters の要素
+    voice_items: list[dict] = field(default_factory=list)          # タイムライン0の VoiceItem（Frame 順）
+    voice_by_frame: dict[int, dict] = field(default_factory=dict)
+    voice_by_serial: dict[int, dict] = field(default_factory=dict)  # Hatsuon のファイル名の連番 → VoiceItem
+
+    def __post_init__(self):
+        self.reindex()
+
+    def reindex(self):
+        self.characters = {c.get("Name", ""): c for c in self.data.get("Characters", [])}
+        self.voice_items = sorted((i for i in self.items if is_voice_item(i)),
+                                  key=lambda i: i.get("Frame", 0))
+        self.voice_by_frame = {i.get("Frame", 0): i for i in self.voice_items}
+        self.voice_by_serial = {}
+        for item in self.voice_items:
+            serial = voice_serial(item.get("Hatsuon", ""))
+            if serial is not None:
+                self.voice_by_serial[serial] = item
+
+    @property
+    def timeline(self) -> dict:
+        timelines = self.data.get("Timelines") or [{}]
+        return timelines[0]
+
+    @property
+    def items(self) -> list[dict]:
+        return self.timeline.get("Items", [])
+
+    @property
+    def fps(self) -> int:
+        return int((self.timeline.get("VideoInfo") or {}).get("FPS") or DEFAULT_FPS)
+
+    def tachie_issues(self) -> list[tuple[str, str, str]]:
+        """存在しない立ち絵パス [(キャラ名, フィールド名, パス), ...]"""
+        issues = []
+        for name, c in self.characters.items():
+            char_param = c.get("TachieCharacterParameter") or {}
+            item_param = c.get("TachieDefaultItemParameter") or {}
+            directory = char_param.get("Directory", "")
+            default_face = item_param.get("DefaultFace", "")
+            if directory and not os.path.exists(directory):
+                issues.append((name, "Directory", directory))
+            if default_face and not os.path.exists(default_face):
+                issues.append((name, "DefaultFace", default_face))
+        return issues
+
+    def characters_with_tachie_dir(self) -> set[str]:
+        """立ち絵の Directory が有効なフォルダに設定されているキャラ"""
+        names = set()
+        for name, c in self.characters.items():
+            directory = (c.get("TachieCharacterParameter") or {}).get("Directory", "")
+            if directory and os.path.isdir(directory):
+                names.add(name)
+        return names
+
+
+# file_key → YmmpDocument（直近に読んだファイルだけ持つ）
+_documents: dict[tuple, YmmpDocument] = {}
+MAX_CACHED = 4
+
+
+def load_ymmp(path: str) -> YmmpDocument:
+    """ymmp を読み込む。ファイルが変わっていなければ前回の YmmpDocument をそのまま返す
+
+    返した YmmpDocument は共有なので、書き換える場合は呼び出し元で読み直すか保存すること。
+    """
+    key = file_key(path)
+    doc = _documents.get(key)
+    if doc is None:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            doc = YmmpDocument(path, json.load(f))
+        for old in [k for k in _documents if k[0] == key[0]]:
+            del _documents[old]
+        if len(_documents) >= MAX_CACHED:
+            del _documents[next(iter(_documents))]
+        _documents[key] = doc
+    return doc
+
+
+def _cache(doc: YmmpDocument):
+    key = file_key(doc.path)
+    for old in [k for k in _documents if k[0] == key[0]]:
+        del _documents[old]
+    _documents[key] = doc
+
+
+def save_ymmp(doc: YmmpDocument, path: str | None = None):
+    """ymmp を書き出す（一時ファイルに書いてから置き換えるので、途中で落ちても壊れない）"""
+    doc.path = path or doc.path
+    tmp = f"{doc.path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8-sig") as f:
+            json.dump(doc.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, doc.path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    # 書いた内容は手元にあるので、次の load_ymmp で読み直さない
+    _cache(doc)
+
+
+def parse_timespan(value: str) -> float | None:
+    """TimeSpan 文字列 → 秒"""
+    m = _TIMESPAN_RE.match(value or "")
+    if not m:
+        return None
+    days, hours, minutes, seconds = m.groups()
+    return int(days or 0) * 86400 + int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def format_timespan(seconds: float) -> str:
+    ticks = round(seconds * 10_000_000)
+    seconds, frac = divmod(ticks, 10_000_000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{frac:07d}"
+
+
+def seconds_to_frames(seconds: float, fps: int) -> int:
+    return max(1, math.ceil(round(seconds * fps, 6)))
+
+
+def update_voices(doc: YmmpDocument, files: dict[int, str],
+                  serifs: dict[int, str] | None = None) -> dict[int, int]:
+    """作り直したボイスの VoiceItem を差し替え、後ろのアイテムをずらす。連番 → 長さの差（フレーム）を返す
+
+    files: 連番 → 新しい MP3（ローカルパス）。Hatsuon はフォルダをそのまま、ファイル名だけ差し替える。
+    serifs: 連番 → セリフ（指定したものだけ Serif を書き換える）
+
+    VoiceItem の終わり（旧）より後ろに始まるアイテムは長さの差だけ後ろ/前にずらし、
+    終わりをまたぐ・終わりで揃っているアイテム（テロップ・立ち絵・BGMなど）は長さを伸び縮みさせる。
+    アイテム同士の間隔（gap_seconds で空けたもの・手で詰めたもの）はそのまま残る。
+    ymmp にない連番があれば何も変えずに ValueError（行の追加は全体の生成し直しが必要）。
+    保存はしないので、続けて save_ymmp() を呼ぶこと。
+    """
+    missing = sorted(serial for serial in files if serial not in doc.voice_by_serial)
+    if missing:
+        raise ValueError(f"ymmp にない連番: {', '.join(map(str, missing))}")
+
+    # 先に全部の長さを読む（読めないファイルがあれば何も変えずに Mp3Error）
+    fps = doc.fps
+    durations = {serial: read_layout_file(path).duration_ms / 1000 for serial, path in files.items()}
+
+    points = []     # (旧VoiceItemの終わり, 長さの差)
+    deltas = {}
+    for serial, path in files.items():
+        item = doc.voice_by_serial[serial]
+        seconds = durations[serial]
+        old_length = item.get("Length", 0)
+        old_voice = parse_timespan(item.get("VoiceLength", ""))
+        if old_voice is not None:
+            # 音声の長さとアイテムの長さの差（余白）は保つ
+            delta = seconds_to_frames(seconds, fps) - seconds_to_frames(old_voice, fps)
+            item["VoiceLength"] = format_timespan(seconds)
+        else:
+            delta = seconds_to_frames(seconds, fps) - old_length
+        # セリフが変わるとファイル名も変わる（12_ヒナ_新しいセリフ.mp3）
+        item["Hatsuon"] = ntpath.join(ntpath.dirname(item.get("Hatsuon", "")), os.path.basename(path))
+        if serifs and serial in serifs:
+            item["Serif"] = serifs[serial]
+        deltas[serial] = delta
+        if delta:
+            points.append((item.get("Frame", 0) + old_length, delta))
+
+    if points:
+        points.sort()
+        ends = [p for p, _ in points]
+        shifts = [0]
+        for _, delta in points:
+            shifts.append(shifts[-1] + delta)
+        for item in doc.items:
+            frame = item.get("Frame", 0)
+            end = frame + item.get("Length", 0)
+            # frame / end 以前にある変更点の差の合計
+            start_shift = shifts[bisect.bisect_right(ends, frame)]
+            end_shift = shifts[bisect.bisect_right(ends, end)]
+            if start_shift:
+                item["Frame"] = frame + start_shift
+            if end_shift != start_shift:
+                item["Length"] = max(1, end - frame + end_shift - start_shift)
+
+    doc.reindex()
+    return deltas
@@ -5,12 +5,11 @@ ElevenLabs TTS ボイス生成ツール - GUI版
 """
 
 import csv
-import json
 import os
 import sys
 import threading
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
+from tkinter import ttk, filedialog, messagebox
 try:
     from tkinterdnd2 import TkinterDnD, DND_FILES
     _DND_AVAILABLE = True
@@ -24,60 +23,15 @@ os.chdir(BASE_DIR)
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
-from utils import load_config, read_csv_rows, check_csv_alignment
+from utils import load_config, set_character_voices
+from core.background import BackgroundJob
+from core.csv_io import check_csv_alignment_cached
+from core.csv_splitter import split_cached
+from gui.log_view import LogView
 
-# csv_split_tool の除外キャラリスト
-EXCLUDE_NAMES = ['霊夢', '魔理沙', 'ブルアカ霊夢', 'ブルアカ魔理沙', '場面転換', 'アイキャッチ']
-
-
-
-
-def split_csv(input_path: str) -> tuple[list[list], int, int]:
-    """CSV分割ツールと同じロジックでCSVを分割する。
-
-    Returns:
-        (rows, split_count, exclude_count)
-        rows[0] はヘッダー行（連番列を先頭に追加済み）
-    """
-    rows = []
-    split_count = 0
-    exclude_count = 0
-    serial_number = 1
-
-    with open(input_path, 'r', encoding='utf-8-sig') as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        rows.append(['連番'] + header)
-
-        for row in reader:
-            if not row or not row[0].strip():
-                continue
-
-            char_name = row[0].strip()
-
-            if '\n' in char_name:
-                characters = [c.strip() for c in char_name.split('\n') if c.strip()]
-                if len(characters) > 1:
-                    serif = row[1] if len(row) > 1 else ''
-                    rest = row[2:] if len(row) > 2 else []
-                    for char in characters:
-                        if char in EXCLUDE_NAMES:
-                            exclude_count += 1
-                            continue
-                        rows.append([str(serial_number), char, serif] + rest)
-                        serial_number += 1
-                    split_count += 1
-                    continue
-
-            if char_name in EXCLUDE_NAMES:
-                exclude_count += 1
-                continue
-
-            new_row = [char_name] + row[1:]
-            rows.append([str(serial_number)] + new_row)
-            serial_number += 1
-
-    return rows, split_count, exclude_count
+# バックグラウンド処理のイベントを取りに行く間隔（ミリ秒）と、1回に取り出すイベント数
+POLL_MS = 50
+LOG_CHUNK = 200
 
 
 class ElevenLabsGUI:
@@ -93,6 +47,7 @@ class ElevenLabsGUI:
             'voice_base_dir_win', os.path.join(BASE_DIR, 'output')
         )
         self.split_csv_path = ''  # STEP 1 で生成した _split.csv のパス
+        self._async_loop = None  # 並列生成用のイベントループスレッド（初回生成時に起動）
 
         self.setup_ui()
 
@@ -115,7 +70,8 @@ class ElevenLabsGUI:
         ttk.Button(src_row, text="参照", command=self.browse_src, width=6).pack(side=tk.LEFT)
         self._register_drop(src_entry, self.src_var, is_file=True)
 
-        ttk.Button(step1_frame, text="分割して保存", command=self.split_and_save, width=16).pack(pady=(8, 0))
+        self.split_btn = ttk.Button(step1_frame, text="分割して保存", command=self.split_and_save, width=16)
+        self.split_btn.pack(pady=(8, 0))
 
         # ── STEP 1.5: Claudeで変換 ──────────────────────────────
         step15_frame = ttk.LabelFrame(main_frame, text="STEP 1.5: Claudeで台本変換（任意）", padding="8")
@@ -168,8 +124,8 @@ class ElevenLabsGUI:
         # ── ログ ────────────────────────────────────────────────
         status_frame = ttk.LabelFrame(main_frame, text="ステータス", padding="5")
         status_frame.pack(fill=tk.BOTH, expand=True)
-        self.log_text = scrolledtext.ScrolledText(status_frame, height=8, state=tk.DISABLED)
-        self.log_text.pack(fill=tk.BOTH, expand=True)
+        self.log_view = LogView(status_frame, height=8)
+        self.log_view.pack(fill=tk.BOTH, expand=True)
 
     # ── ブラウズ ─────────────────────────────────────────────────
 
@@ -237,36 +193,38 @@ class ElevenLabsGUI:
         voice_dir    = os.path.join(project_dir, 'ボイス')
         split_path   = os.path.join(script_dir, f"{stem}_split.csv")
 
-        os.makedirs(script_dir, exist_ok=True)
-        os.makedirs(voice_dir, exist_ok=True)
-
-        try:
-            rows, split_count, exclude_count = split_csv(src_path)
-        except Exception as e:
-            messagebox.showerror("エラー", f"CSV分割に失敗しました:\n{e}")
-            return
+        def work(emit):
+            # 別スレッド: 分割して書き出す（同じ原本CSVなら前回の分割結果を使う）
+            os.makedirs(script_dir, exist_ok=True)
+            os.makedirs(voice_dir, exist_ok=True)
+            rows, split_count, exclude_count, _ = split_cached(
+                src_path,
+                log=lambda m: emit("log", m),
+                progress=lambda n: emit("progress", f"分割中... {n}行"),
+            )
+            with open(split_path, 'w', encoding='utf-8-sig', newline='') as f:
+                csv.writer(f).writerows(rows)
+            return len(rows) - 1, split_count, exclude_count
+
+        def done(result):
+            data_rows, split_count, exclude_count = result
+            self.log(f"分割完了: {data_rows}行  (分割:{split_count}行, 除外:{exclude_count}行)")
+            self.log(f"保存先: {split_path}")
+
+            # STEP 2 を自動入力
+            self.split_csv_path = split_path
+            self.script_var.set(split_path)
+            self.output_var.set(voice_dir)
+
+            messagebox.showinfo("完了",
+                f"CSV分割完了!\n\n"
+                f"出力行数: {data_rows}\n"
+                f"分割: {split_count}行  除外: {exclude_count}行\n\n"
+                f"台本CSV:\n{split_path}\n\n"
+                f"出力フォルダ:\n{voice_dir}"
+            )
 
-        with open(split_path, 'w', encoding='utf-8-sig', newline='') as f:
-            writer = csv.writer(f)
-            for row in rows:
-                writer.writerow(row)
-
-        data_rows = len(rows) - 1
-        self.log(f"分割完了: {data_rows}行  (分割:{split_count}行, 除外:{exclude_count}行)")
-        self.log(f"保存先: {split_path}")
-
-        # STEP 2 を自動入力
-        self.split_csv_path = split_path
-        self.script_var.set(split_path)
-        self.output_var.set(voice_dir)
-
-        messagebox.showinfo("完了",
-            f"CSV分割完了!\n\n"
-            f"出力行数: {data_rows}\n"
-            f"分割: {split_count}行  除外: {exclude_count}行\n\n"
-            f"台本CSV:\n{split_path}\n\n"
-            f"出力フォルダ:\n{voice_dir}"
-        )
+        self._run_background(work, done, self.split_btn, "CSV分割に失敗しました")
 
     # ── ボイス生成 ───────────────────────────────────────────────
 
@@ -285,9 +243,7 @@ class ElevenLabsGUI:
             return
 
         self.generate_btn.config(state=tk.DISABLED)
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.delete(1.0, tk.END)
-        self.log_text.config(state=tk.DISABLED)
+        self.log_view.clear()
 
         thread = threading.Thread(
             target=self._generate_thread, args=(script_path, output_dir), daemon=True
@@ -296,25 +252,16 @@ class ElevenLabsGUI:
 
     def _generate_thread(self, script_path: str, output_dir: str):
         try:
-            from dotenv import load_dotenv
-            from elevenlabs.client import ElevenLabs
             from generate import (
                 process_dialogues, fetch_available_voices,
                 check_missing_voices,
             )
+            from core.client import get_client
             from parser import parse_from_file
 
-            load_dotenv(os.path.join(BASE_DIR, '.env'))
-
-            api_key = os.getenv("ELEVENLABS_API_KEY")
-            if not api_key:
-                self._thread_safe_log("エラー: ELEVENLABS_API_KEY が .env に設定されていません")
-                self.root.after(0, lambda: messagebox.showerror(
-                    "エラー", ".env に ELEVENLABS_API_KEY を設定してください"))
-                return
-
             config = load_config(os.path.join(BASE_DIR, 'config.json'))
-            client = ElevenLabs(api_key=api_key)
+            # SDK クライアントは必要になったときだけ作る（ジョブサーバー経由なら API キーも SDK も要らない）
+            client = None
 
             self._thread_safe_log(f"台本: {script_path}")
             self._thread_safe_log(f"出力先: {output_dir}")
@@ -329,9 +276,13 @@ class ElevenLabsGUI:
 
             self._thread_safe_log(f"{len(dialogues)} 件のセリフを検出しました")
 
-            # 未設定キャラのチェック
+            # 未設定キャラのチェック（全員設定済みならボイス一覧は取得しない）
             self._thread_safe_log("ボイス設定を確認中...")
-            available_voices = fetch_available_voices(client)
+            character_voices = config.get("character_voices", {})
+            available_voices = {}
+            if any(d.character not in character_voices for d in dialogues):
+                client = get_client()
+                available_voices = fetch_available_voices(client)
             missing = check_missing_voices(dialogues, config, available_voices)
 
             if missing:
@@ -339,10 +290,9 @@ class ElevenLabsGUI:
                 not_addable = [m for m in missing if not m["suggested_voice_id"]]
 
                 if addable:
-                    for m in addable:
-                        config["character_voices"][m["character"]] = m["suggested_voice_id"]
-                    with open(os.path.join(BASE_DIR, 'config.json'), 'w', encoding='utf-8') as f:
-                        json.dump(config, f, ensure_ascii=False, indent=4)
+                    voices = {m["character"]: m["suggested_voice_id"] for m in addable}
+                    config.setdefault("character_voices", {}).update(voices)
+                    set_character_voices(voices, os.path.join(BASE_DIR, 'config.json'))
                     names = ", ".join(m["character"] for m in addable)
                     self._thread_safe_log(f"config.json に自動追加: {names}")
 
@@ -367,7 +317,19 @@ class ElevenLabsGUI:
 
             builtins.print = gui_print
             try:
-                results = process_dialogues(dialogues, config, client, output_dir)
+                from core.job_server import run_via_server
+                concurrency = config.get("concurrency", 1)
+                # ジョブサーバーが起動していれば投入して進捗を購読するだけ
+                results = run_via_server(dialogues, config, output_dir)
+                if results is None:
+                    if concurrency > 1:
+                        # 専用ループスレッドで asyncio 版エンジンを実行し、完了を待つ
+                        from core.async_generator import generate_with_new_client
+                        future = self._get_async_loop().submit(generate_with_new_client(
+                            dialogues, config, output_dir, concurrency=concurrency))
+                        results = future.result()
+                    else:
+                        results = process_dialogues(dialogues, config, client or get_client(), output_dir)
             finally:
                 builtins.print = original_print
 
@@ -392,15 +354,18 @@ class ElevenLabsGUI:
         finally:
             self.root.after(0, lambda: self.generate_btn.config(state=tk.NORMAL))
 
+    def _get_async_loop(self):
+        if self._async_loop is None:
+            from core.async_generator import AsyncLoopThread
+            self._async_loop = AsyncLoopThread()
+        return self._async_loop
+
     def log(self, message: str):
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.log_text.config(state=tk.DISABLED)
-        self.root.update_idletasks()
+        self.log_view.append(message)
 
     def _thread_safe_log(self, message: str):
-        self.root.after(0, lambda m=message: self.log(m))
+        # LogView.append はどのスレッドからでも呼べる（画面の更新は UI スレッドでまとめて行う）
+        self.log_view.append(message)
 
     def _register_drop(self, widget, var: tk.StringVar, is_file: bool = True):
         if not _DND_AVAILABLE:
@@ -493,21 +458,64 @@ class ElevenLabsGUI:
                 "Claude変換後のCSVをSTEP 2に設定してからチェックしてください。")
             return
 
-        _ok, results = check_csv_alignment(split_path, elevenlabs_path)
-
-        self.log("\n--- 整合性チェック ---")
-        self.log(f"比較元: {os.path.basename(split_path)}")
-        self.log(f"比較先: {os.path.basename(elevenlabs_path)}")
-        for msg in results:
-            self.log(msg)
-
-        # 結果をダイアログでも表示
-        summary = "\n".join(results)
-        has_warning = any("⚠" in m for m in results)
-        if has_warning:
-            messagebox.showwarning("整合性チェック", summary)
-        else:
-            messagebox.showinfo("整合性チェック", summary)
+        def work(emit):
+            return check_csv_alignment_cached(split_path, elevenlabs_path)
+
+        def done(result):
+            _ok, results = result
+            self.log("\n--- 整合性チェック ---")
+            self.log(f"比較元: {os.path.basename(split_path)}")
+            self.log(f"比較先: {os.path.basename(elevenlabs_path)}")
+            self.log_view.extend(results)
+
+            # 結果をダイアログでも表示
+            summary = "\n".join(results)
+            has_warning = any("⚠" in m for m in results)
+            if has_warning:
+                messagebox.showwarning("整合性チェック", summary)
+            else:
+                messagebox.showinfo("整合性チェック", summary)
+
+        self._run_background(work, done, self.check_btn, "整合性チェックに失敗しました")
+
+    # ── バックグラウンド処理 ───────────────────────────────────────
+
+    def _run_background(self, work, on_done, button: ttk.Button, error_title: str):
+        """work(emit) を別スレッドで実行し、終わったら UI スレッドで on_done(戻り値) を呼ぶ
+
+        実行中は button を無効にして進捗を表示する。イベントは1回に LOG_CHUNK 件ずつ取り出し、
+        数千行のログがあっても画面が止まらないようにする。
+        """
+        label = button.cget("text")
+        button.config(state=tk.DISABLED, text="処理中...")
+        job = BackgroundJob(work).start()
+
+        def finish():
+            button.config(state=tk.NORMAL, text=label)
+
+        def poll():
+            lines = []
+            for kind, payload in job.poll(LOG_CHUNK):
+                if kind == "log":
+                    lines.append(payload)
+                elif kind == "progress":
+                    button.config(text=payload)
+                elif kind == "result":
+                    self.log_view.extend(lines)
+                    lines = []
+                    finish()
+                    on_done(payload)
+                elif kind == "error":
+                    self.log_view.extend(lines)
+                    lines = []
+                    finish()
+                    self.log(f"エラー: {payload}")
+                    messagebox.showerror("エラー", f"{error_title}:\n{payload}")
+            self.log_view.extend(lines)
+            if not job.finished:
+                self.root.after(POLL_MS, poll)
+
+        self.root.after(POLL_MS, poll)
 
     def _on_src_changed(self, path: str):
         """原本CSVがセットされたとき台本CSV・出力フォルダを自動補完"""
@@ -529,6 +537,9 @@ class ElevenLabsGUI:
 def main():
     root = TkinterDnD.Tk() if _DND_AVAILABLE else tk.Tk()
     app = ElevenLabsGUI(root)
+    if os.environ.get("STARTUP_BENCH"):
+        # 起動時間の計測用（cli/bench_startup.py）: 画面を作り終えたら閉じる
+        root.after(1, root.destroy)
     root.mainloop()
 
 
@@ -3,27 +3,35 @@
 ElevenLabs TTS 音声生成ツール
 キャラ名とセリフをコピペ → 自動でキャラごとのvoice_idに紐づけ → 音声生成
 """
-import json
 import os
 import re
-import shutil
 import sys
 import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from dotenv import load_dotenv
-from elevenlabs.client import ElevenLabs
-from elevenlabs.types import PronunciationDictionaryVersionLocator
-
+from core.alignment import discard_alignment, parse_timestamps_response, save_alignment
+from core.audio_cache import AudioCache
+from core.config import load_config, set_character_voices
+from core.mp3 import output_format_sample_rate, parse_output_format, silence_mp3, validate_mp3
 from core.parser import parse_dialogue, DialogueLine
-from core.config import load_config
+from core.rewriter import format_hits, rewriter_from_config
+
+# elevenlabs SDK は読み込みが重いので、型注釈用にだけ読み、実行時は使う関数の中で読み込む
+if TYPE_CHECKING:
+    from elevenlabs.client import ElevenLabs
+    from elevenlabs.types import PronunciationDictionaryVersionLocator
+
+# 無音指定: （無音） または （無音:1.5秒）
+SILENCE_PATTERN = re.compile(r"[（(]無音(?:[:：]\s*(\d+(?:\.\d+)?)\s*秒?)?[）)]")
+# 長さ指定のない（無音）の秒数（config.json の "silence_seconds" で上書き）
+DEFAULT_SILENCE_SECONDS = 2.0
+# 壊れたMP3を受信したときの再生成回数
+BROKEN_AUDIO_RETRIES = 2
 
-# 無音ファイルのパス（スクリプトと同じディレクトリに配置）
-SILENCE_FILE = os.path.join(os.path.dirname(__file__), "silence_2sec.mp3")
-# 無音判定用のキーワード
-SILENCE_KEYWORDS = ["（無音）"]
-# 壊れたファイルと判定するサイズ閾値（バイト）
-MIN_VALID_FILE_SIZE = 1024
+
+class BrokenAudioError(Exception):
+    """再生成しても壊れたMP3しか返ってこなかった"""
 
 
 def sanitize_filename(text: str, max_length: int = 200) -> str:
@@ -43,7 +51,7 @@ def get_voice_id(character: str, config: dict) -> str | None:
     return config.get("character_voices", {}).get(character)
 
 
-def fetch_available_voices(client: ElevenLabs) -> dict:
+def fetch_available_voices(client: "ElevenLabs") -> dict:
     """ElevenLabs APIから利用可能なボイス一覧を取得"""
     try:
         response = client.voices.get_all()
@@ -75,7 +83,7 @@ def check_missing_voices(dialogues: list, config: dict, available_voices: dict)
     return missing
 
 
-def prompt_add_missing_voices(missing: list, config: dict, config_path: str = "config.json") -> bool:
+def prompt_add_missing_voices(missing: list, config: dict, config_path: str | None = None) -> bool:
     """不足しているキャラのvoice_idを追加するか確認"""
     if not missing:
         return True
@@ -102,12 +110,10 @@ def prompt_add_missing_voices(missing: list, config: dict, config_path: str = "c
         print("\n自動追加可能なキャラをconfig.jsonに追加しますか？ [Y/n]: ", end="")
         confirm = input().strip().lower()
         if confirm != 'n':
-            # config.jsonに追加
-            for m in addable:
-                config["character_voices"][m["character"]] = m["suggested_voice_id"]
-            
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=4)
+            # config.jsonに追加（他のツールが同時に追加したキャラも残る）
+            voices = {m["character"]: m["suggested_voice_id"] for m in addable}
+            config.setdefault("character_voices", {}).update(voices)
+            set_character_voices(voices, config_path)
             
             print(f"\nconfig.jsonに{len(addable)}件のキャラを追加しました")
             return True
@@ -120,12 +126,14 @@ def prompt_add_missing_voices(missing: list, config: dict, config_path: str = "c
     return True
 
 
-def load_pronunciation_dict(config: dict) -> list[PronunciationDictionaryVersionLocator] | None:
+def load_pronunciation_dict(config: dict) -> list["PronunciationDictionaryVersionLocator"] | None:
     """config.json から発音辞書ロケータを読み込む"""
     pd = config.get("pronunciation_dictionary", {})
     dict_id = pd.get("id")
     version_id = pd.get("version_id")
     if dict_id and version_id:
+        from elevenlabs.types import PronunciationDictionaryVersionLocator
+
         return [
             PronunciationDictionaryVersionLocator(
                 pronunciation_dictionary_id=dict_id,
@@ -135,8 +143,37 @@ def load_pronunciation_dict(config: dict) -> list[PronunciationDictionaryVersion
     return None
 
 
-def generate_audio(
-    client: ElevenLabs,
+def dialogue_filename(dialogue: DialogueLine) -> str:
+    """出力ファイル名: 連番_キャラ名_セリフ内容.mp3"""
+    return f"{dialogue.index}_{dialogue.character}_{sanitize_filename(dialogue.text)}.mp3"
+
+
+def build_context(
+    dialogues: list[DialogueLine],
+    i: int,
+    model_id: str,
+    use_context: bool = True,
+) -> tuple[str | None, str | None]:
+    """前後のセリフから previous_text / next_text を組み立てる
+
+    注意: eleven_v3モデルはprevious_text/next_textに非対応
+    """
+    previous_text = None
+    next_text = None
+    if not use_context or model_id == "eleven_v3":
+        return previous_text, next_text
+
+    dialogue = dialogues[i]
+    if i > 0:
+        prev = dialogues[i - 1]
+        previous_text = f"{prev.character}「{prev.text}」" if prev.character != dialogue.character else prev.text
+    if i < len(dialogues) - 1:
+        nxt = dialogues[i + 1]
+        next_text = f"{nxt.character}「{nxt.text}」" if nxt.character != dialogue.character else nxt.text
+    return previous_text, next_text
+
+
+def build_tts_kwargs(
     text: str,
     voice_id: str,
     model_id: str = "eleven_v3",
@@ -144,9 +181,9 @@ def generate_audio(
     language_code: str = "ja",
     previous_text: str | None = None,
     next_text: str | None = None,
-    pronunciation_dictionary_locators: list[PronunciationDictionaryVersionLocator] | None = None,
-) -> bytes:
-    """ElevenLabs APIで音声を生成"""
+    pronunciation_dictionary_locators: list["PronunciationDictionaryVersionLocator"] | None = None,
+) -> dict:
+    """text_to_speech.convert に渡す引数を組み立てる（同期/非同期共通）"""
     kwargs = {
         "text": text,
         "voice_id": voice_id,
@@ -164,17 +201,70 @@ def generate_audio(
         kwargs["next_text"] = next_text
     if pronunciation_dictionary_locators:
         kwargs["pronunciation_dictionary_locators"] = pronunciation_dictionary_locators
+    return kwargs
 
-    audio = client.text_to_speech.convert(**kwargs)
 
-    # ストリームをバイトに変換
-    audio_bytes = b""
-    for chunk in audio:
-        audio_bytes += chunk
+def _request_valid_audio(request, output_format: str):
+    """request() → (MP3バイト列, 付帯情報) を呼び、壊れていれば BROKEN_AUDIO_RETRIES 回まで再生成する"""
+    sample_rate = output_format_sample_rate(output_format)
+    for attempt in range(BROKEN_AUDIO_RETRIES + 1):
+        audio_bytes, extra = request()
+        if sample_rate is None:
+            return audio_bytes, extra
+        ok, reason = validate_mp3(audio_bytes, sample_rate)
+        if ok:
+            return audio_bytes, extra
+        if attempt < BROKEN_AUDIO_RETRIES:
+            print(f"    警告: 壊れたMP3を受信しました（{reason}）。再生成します")
+    raise BrokenAudioError(f"MP3破損: {reason}")
+
 
+def generate_audio(
+    client: "ElevenLabs",
+    text: str,
+    voice_id: str,
+    model_id: str = "eleven_v3",
+    output_format: str = "mp3_44100_128",
+    language_code: str = "ja",
+    previous_text: str | None = None,
+    next_text: str | None = None,
+    pronunciation_dictionary_locators: list["PronunciationDictionaryVersionLocator"] | None = None,
+) -> bytes:
+    """ElevenLabs APIで音声を生成
+
+    受信したMP3はフレーム構造を検査し、壊れていれば BROKEN_AUDIO_RETRIES 回まで再生成する。
+    """
+    kwargs = build_tts_kwargs(
+        text, voice_id, model_id, output_format, language_code,
+        previous_text, next_text, pronunciation_dictionary_locators,
+    )
+    # ストリームをバイトに変換
+    audio_bytes, _ = _request_valid_audio(
+        lambda: (b"".join(client.text_to_speech.convert(**kwargs)), None), output_format)
     return audio_bytes
 
 
+def generate_audio_with_timestamps(
+    client: "ElevenLabs",
+    text: str,
+    voice_id: str,
+    model_id: str = "eleven_v3",
+    output_format: str = "mp3_44100_128",
+    language_code: str = "ja",
+    previous_text: str | None = None,
+    next_text: str | None = None,
+    pronunciation_dictionary_locators: list["PronunciationDictionaryVersionLocator"] | None = None,
+) -> tuple[bytes, dict | None]:
+    """音声と文字単位のタイムスタンプを生成（convert_with_timestamps）"""
+    kwargs = build_tts_kwargs(
+        text, voice_id, model_id, output_format, language_code,
+        previous_text, next_text, pronunciation_dictionary_locators,
+    )
+    return _request_valid_audio(
+        lambda: parse_timestamps_response(client.text_to_speech.convert_with_timestamps(**kwargs)),
+        output_format)
+
+
 def save_audio(audio_bytes: bytes, filepath: str) -> None:
     """音声ファイルを保存"""
     with open(filepath, 'wb') as f:
@@ -183,43 +273,47 @@ def save_audio(audio_bytes: bytes, filepath: str) -> None:
 
 def is_silence_text(text: str) -> bool:
     """セリフが無音として扱うべきかを判定"""
-    for keyword in SILENCE_KEYWORDS:
-        if keyword in text:
-            return True
-    return False
+    return SILENCE_PATTERN.search(text) is not None
 
 
-def copy_silence_file(output_filepath: str) -> bool:
-    """無音ファイルを指定パスにコピー"""
-    if not os.path.exists(SILENCE_FILE):
-        print(f"    警告: 無音ファイルが見つかりません: {SILENCE_FILE}")
-        return False
-    
-    shutil.copy2(SILENCE_FILE, output_filepath)
-    return True
+def silence_seconds(text: str, config: dict) -> float:
+    """（無音:1.5秒）の秒数。指定がなければ config の silence_seconds"""
+    m = SILENCE_PATTERN.search(text)
+    if m and m.group(1):
+        return float(m.group(1))
+    return float(config.get("silence_seconds", DEFAULT_SILENCE_SECONDS))
 
 
-def check_and_fix_broken_file(filepath: str, dialogue_index: int) -> bool:
-    """生成されたファイルが壊れていないかチェックし、壊れていれば無音ファイルで置換"""
-    if not os.path.exists(filepath):
+def write_silence_file(output_filepath: str, seconds: float, config: dict) -> bool:
+    """出力形式に合わせた無音MP3を配置（長さごとにキャッシュしてハードリンク）"""
+    sample_rate, bitrate = parse_output_format(
+        config.get("default_output_format", "mp3_44100_128")) or (44100, 128)
+    duration_ms = round(seconds * 1000)
+    discard_alignment(output_filepath)
+    try:
+        data = silence_mp3(duration_ms, sample_rate, bitrate)
+    except ValueError as e:
+        print(f"    警告: 無音MP3を作れません: {e}")
         return False
-    
-    file_size = os.path.getsize(filepath)
-    if file_size < MIN_VALID_FILE_SIZE:
-        print(f"    警告: #{dialogue_index} が{file_size}バイトです。無音ファイルで置換します")
-        if os.path.exists(SILENCE_FILE):
-            shutil.copy2(SILENCE_FILE, filepath)
+
+    # v2: 短い無音も MIN_FRAMES 個のフレームを持つ（以前の短すぎるキャッシュは使わない）
+    key = f"silence-v2-{sample_rate}-{bitrate}-{duration_ms}"
+    try:
+        cache = AudioCache()
+        cache.store_bytes(key, data)
+        if cache.fetch_to(key, output_filepath):
             return True
-        else:
-            print(f"    エラー: 無音ファイルが見つかりません: {SILENCE_FILE}")
-            return False
+    except OSError:
+        pass
+    with open(output_filepath, "wb") as f:
+        f.write(data)
     return True
 
 
 def process_dialogues(
     dialogues: list[DialogueLine],
     config: dict,
-    client: ElevenLabs,
+    client: "ElevenLabs",
     output_dir: str,
     use_context: bool = True,
     delay: float = 0.5,
@@ -232,22 +326,27 @@ def process_dialogues(
     model_id = config.get("default_model", "eleven_v3")
     output_format = config.get("default_output_format", "mp3_44100_128")
     language_code = config.get("language_code", "ja")
-
-    # 発音辞書
-    pd_locators = load_pronunciation_dict(config)
-    if pd_locators:
+    # 文字単位のタイムスタンプも取得して MP3 の隣に保存するか
+    with_alignment = config.get("save_alignment", False)
+
+    # 発音ルール（ローカル適用が有効ならサーバーの発音辞書は使わない）
+    rewriter = rewriter_from_config(config)
+    pd_locators = None if rewriter else load_pronunciation_dict(config)
+    if rewriter:
+        print(f"発音ルールをローカルで適用します（{len(rewriter.rules)}件）")
+    elif pd_locators:
         print("発音辞書を適用します")
     
     for i, dialogue in enumerate(dialogues):
         # ファイル名: 1_キャラ名_セリフ内容.mp3
-        text_content = sanitize_filename(dialogue.text)
-        filename = f"{dialogue.index}_{dialogue.character}_{text_content}.mp3"
+        filename = dialogue_filename(dialogue)
         filepath = output_path / filename
         
         # 無音判定：APIを叩く前にチェック
         if is_silence_text(dialogue.text):
-            print(f"[{dialogue.index:03d}] {dialogue.character} → 無音ファイル配置")
-            if copy_silence_file(str(filepath)):
+            seconds = silence_seconds(dialogue.text, config)
+            print(f"[{dialogue.index:03d}] {dialogue.character} → 無音 {seconds:g}秒")
+            if write_silence_file(str(filepath), seconds, config):
                 print(f"    -> Saved: {filename}")
                 results.append({
                     "index": dialogue.index,
@@ -261,7 +360,7 @@ def process_dialogues(
                     "index": dialogue.index,
                     "character": dialogue.character,
                     "status": "error",
-                    "reason": "無音ファイルのコピーに失敗",
+                    "reason": "無音ファイルの作成に失敗",
                 })
             continue
         
@@ -278,24 +377,17 @@ def process_dialogues(
             continue
         
         # 前後のコンテキスト
-        # 注意: eleven_v3モデルはprevious_text/next_textに非対応
-        previous_text = None
-        next_text = None
-
-        if use_context and model_id != "eleven_v3":
-            if i > 0:
-                prev = dialogues[i - 1]
-                previous_text = f"{prev.character}「{prev.text}」" if prev.character != dialogue.character else prev.text
-            if i < len(dialogues) - 1:
-                nxt = dialogues[i + 1]
-                next_text = f"{nxt.character}「{nxt.text}」" if nxt.character != dialogue.character else nxt.text
+        previous_text, next_text = build_context(dialogues, i, model_id, use_context)
         
         try:
             print(f"[{dialogue.index:03d}] Generating: {dialogue.character} ({dialogue.char_count}字)...")
+            text, hits = rewriter.rewrite(dialogue.text) if rewriter else (dialogue.text, [])
+            if hits:
+                print(f"    読み置換: {format_hits(hits)}")
             
-            audio_bytes = generate_audio(
+            tts_args = dict(
                 client=client,
-                text=dialogue.text,
+                text=text,
                 voice_id=voice_id,
                 model_id=model_id,
                 output_format=output_format,
@@ -304,20 +396,29 @@ def process_dialogues(
                 next_text=next_text,
                 pronunciation_dictionary_locators=pd_locators,
             )
+            alignment = None
+            if with_alignment:
+                audio_bytes, alignment = generate_audio_with_timestamps(**tts_args)
+            else:
+                audio_bytes = generate_audio(**tts_args)
             
             save_audio(audio_bytes, str(filepath))
-            
-            # 生成後チェック：ファイルサイズが小さすぎる場合は無音ファイルで置換
-            check_and_fix_broken_file(str(filepath), dialogue.index)
+            if alignment:
+                save_alignment(str(filepath), text, alignment, script=dialogue.text)
+            else:
+                discard_alignment(str(filepath))
             
             print(f"    -> Saved: {filename}")
             
-            results.append({
+            result = {
                 "index": dialogue.index,
                 "character": dialogue.character,
                 "status": "success",
                 "filepath": str(filepath),
-            })
+            }
+            if hits:
+                result["rewrites"] = [h.original for h in hits]
+            results.append(result)
             
             # レート制限対策
             if i < len(dialogues) - 1:
@@ -335,18 +436,48 @@ def process_dialogues(
     return results
 
 
+def _local_client() -> "ElevenLabs":
+    """このプロセスで API を呼ぶときのクライアント。APIキーがなければ終了する"""
+    from core.client import get_client
+
+    try:
+        return get_client()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+def _voices_for_missing_check(dialogues: list[DialogueLine], config: dict) -> tuple["ElevenLabs | None", dict]:
+    """voice_id 未設定のキャラがいるときだけクライアントを作ってボイス一覧を取る → (client, ボイス一覧)"""
+    character_voices = config.get("character_voices", {})
+    if all(d.character in character_voices for d in dialogues):
+        return None, {}
+    client = _local_client()
+    return client, fetch_available_voices(client)
+
+
+def generate_dialogues(
+    dialogues: list[DialogueLine],
+    config: dict,
+    client: "ElevenLabs | None",
+    output_dir: str,
+) -> list[dict]:
+    """ジョブサーバーが起動していればそこで、なければこのプロセスで音声生成
+
+    サーバーを先に試し、client が None ならこのプロセスで生成するときに初めて作る
+    （サーバー経由なら SDK の読み込みも API キーも要らない）。
+    """
+    from core.job_server import run_via_server
+
+    results = run_via_server(dialogues, config, output_dir)
+    if results is None:
+        results = process_dialogues(dialogues, config, client or _local_client(), output_dir)
+    return results
+
+
 def main(auto_confirm: bool = False):
     """メイン処理"""
-    load_dotenv()
-    
-    api_key = os.getenv("ELEVENLABS_API_KEY")
-    if not api_key:
-        print("Error: ELEVENLABS_API_KEY not found in environment variables")
-        print("Please create a .env file with your API key")
-        sys.exit(1)
-    
     config = load_config()
-    client = ElevenLabs(api_key=api_key)
     
     print("=" * 60)
     print("ElevenLabs TTS Generator")
@@ -386,7 +517,7 @@ def main(auto_confirm: bool = False):
     
     # 不足キャラのチェック
     print("ボイス設定を確認中...")
-    available_voices = fetch_available_voices(client)
+    client, available_voices = _voices_for_missing_check(dialogues, config)
     missing = check_missing_voices(dialogues, config, available_voices)
     
     if missing:
@@ -416,7 +547,7 @@ def main(auto_confirm: bool = False):
     print("-" * 60 + "\n")
     
     output_dir = config.get("output_directory", "./output/")
-    results = process_dialogues(dialogues, config, client, output_dir)
+    results = generate_dialogues(dialogues, config, client, output_dir)
     
     # サマリー
     print("\n" + "=" * 60)
@@ -447,6 +578,9 @@ def main(auto_confirm: bool = False):
 
 def list_voices():
     """登録済みボイス一覧を表示"""
+    from dotenv import load_dotenv
+    from elevenlabs.client import ElevenLabs
+
     load_dotenv()
     
     api_key = os.getenv("ELEVENLABS_API_KEY")
@@ -472,15 +606,7 @@ def main_from_file(filepath: str, auto_confirm: bool = False, output_name: str =
         auto_confirm: 確認をスキップするか
         output_name: 出力フォルダ名（台本タイトル）。指定するとoutput/{output_name}/に出力
     """
-    load_dotenv()
-    
-    api_key = os.getenv("ELEVENLABS_API_KEY")
-    if not api_key:
-        print("Error: ELEVENLABS_API_KEY not found in environment variables")
-        sys.exit(1)
-    
     config = load_config()
-    client = ElevenLabs(api_key=api_key)
     
     print("=" * 60)
     print("ElevenLabs TTS Generator")
@@ -499,7 +625,7 @@ def main_from_file(filepath: str, auto_confirm: bool = False, output_name: str =
     
     # 不足キャラのチェック
     print("ボイス設定を確認中...")
-    available_voices = fetch_available_voices(client)
+    client, available_voices = _voices_for_missing_check(dialogues, config)
     missing = check_missing_voices(dialogues, config, available_voices)
     
     if missing and not auto_confirm:
@@ -512,10 +638,9 @@ def main_from_file(filepath: str, auto_confirm: bool = False, output_name: str =
         # 自動確認モードでも追加可能なものは追加
         addable = [m for m in missing if m["suggested_voice_id"]]
         if addable:
-            for m in addable:
-                config["character_voices"][m["character"]] = m["suggested_voice_id"]
-            with open("config.json", 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=4)
+            voices = {m["character"]: m["suggested_voice_id"] for m in addable}
+            config.setdefault("character_voices", {}).update(voices)
+            set_character_voices(voices)
             print(f"\nconfig.jsonに{len(addable)}件のキャラを自動追加しました")
     
     print(f"\n{len(dialogues)} 件のセリフを検出しました:\n")
@@ -544,7 +669,7 @@ def main_from_file(filepath: str, auto_confirm: bool = False, output_name: str =
     print("音声生成を開始します...")
     print("-" * 60 + "\n")
     
-    results = process_dialogues(dialogues, config, client, output_dir)
+    results = generate_dialogues(dialogues, config, client, output_dir)
     
     print("\n" + "=" * 60)
     print("完了サマリー")
@@ -0,0 +1,181 @@
+"""ログ表示ウィジェット（リングバッファ + 見えている行だけ描画）
+
+ScrolledText に1行ずつ insert するとログが数千行を超えたあたりから1行ごとに遅くなり、
+メモリも増え続ける。LogView は
+- 行をリングバッファ（最大 MAX_LINES 行）に積み、古い行は捨てる
+- 追加はバッファに積むだけで、画面の更新は FLUSH_MS ごとにまとめて1回
+- Text には画面に見えている行数ぶんだけを書き、スクロールはバッファ上の位置で管理する
+ので、何万行流しても1行あたりの手間は変わらない。
+「エラーのみ」でエラー・警告の行だけを表示し、「保存」でバッファの内容をファイルに書き出せる。
+append はどのスレッドから呼んでもよい。
+"""
+import itertools
+import threading
+import tkinter as tk
+from collections import deque
+from datetime import datetime
+from tkinter import ttk, filedialog, messagebox
+
+MAX_LINES = 20000
+FLUSH_MS = 50
+# この文字列を含む行をエラーとして扱う（「エラーのみ」で表示する）
+ERROR_MARKERS = ("エラー", "失敗", "⚠", "✗", "Error", "error", "Traceback")
+
+
+def is_error_line(message: str) -> bool:
+    return any(marker in message for marker in ERROR_MARKERS)
+
+
+class LogView(ttk.Frame):
+    def __init__(self, parent, height: int = 8, max_lines: int = MAX_LINES):
+        super().__init__(parent)
+        self._lines: deque[str] = deque(maxlen=max_lines)
+        self._errors: deque[str] = deque(maxlen=max_lines)
+        self._pending: list[str] = []
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
+        self._top = 0              # 表示中の先頭行（表示対象の中での位置）
+        self._follow = True        # 末尾に追従するか（一番下までスクロールしているとき）
+
+        bar = ttk.Frame(self)
+        bar.pack(fill=tk.X, pady=(0, 3))
+        self.errors_only = tk.BooleanVar(value=False)
+        ttk.Checkbutton(bar, text="エラーのみ", variable=self.errors_only,
+                        command=self._on_filter).pack(side=tk.LEFT)
+        ttk.Button(bar, text="保存", command=self.export, width=6).pack(side=tk.RIGHT)
+        ttk.Button(bar, text="クリア", command=self.clear, width=6).pack(side=tk.RIGHT, padx=(0, 4))
+        self.count_label = ttk.Label(bar, text="", foreground="gray")
+        self.count_label.pack(side=tk.RIGHT, padx=6)
+
+        body = ttk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True)
+        # 折り返すと表示行数が数えられないので、長い行は横スクロールで見る
+        self.text = tk.Text(body, height=height, wrap=tk.NONE, state=tk.DISABLED)
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scrollbar)
+        xscroll = ttk.Scrollbar(body, orient=tk.HORIZONTAL, command=self.text.xview)
+        self.text.configure(xscrollcommand=xscroll.set)
+        self.text.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        xscroll.grid(row=1, column=0, sticky="ew")
+        body.rowconfigure(0, weight=1)
+        body.columnconfigure(0, weight=1)
+        self.text.tag_configure("error", foreground="#c00000")
+
+        self.text.bind("<Configure>", lambda e: self._render())
+        self.text.bind("<MouseWheel>", self._on_wheel)                          # Windows / macOS
+        self.text.bind("<Button-4>", lambda e: self._scroll_lines(-3))          # X11
+        self.text.bind("<Button-5>", lambda e: self._scroll_lines(3))
+
+    # ── 追加 ────────────────────────────────────────────────
+
+    def append(self, message: str):
+        """1行（改行を含むなら複数行）を追加する。画面への反映は次のフラッシュ"""
+        with self._pending_lock:
+            self._pending.extend(message.split("\n"))
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self.after(FLUSH_MS, self._flush)
+
+    def extend(self, messages: list[str]):
+        for message in messages:
+            self.append(message)
+
+    def _flush(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+            self._flush_scheduled = False
+        for line in pending:
+            self._lines.append(line)
+            if is_error_line(line):
+                self._errors.append(line)
+        self._render()
+
+    def clear(self):
+        with self._pending_lock:
+            self._pending.clear()
+        self._lines.clear()
+        self._errors.clear()
+        self._top = 0
+        self._follow = True
+        self._render()
+
+    # ── 描画 ────────────────────────────────────────────────
+
+    def _source(self) -> deque:
+        return self._errors if self.errors_only.get() else self._lines
+
+    def _visible_rows(self) -> int:
+        linespace = self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace")
+        return max(1, self.text.winfo_height() // max(1, int(linespace)))
+
+    def _render(self):
+        source = self._source()
+        rows = self._visible_rows()
+        total = len(source)
+        max_top = max(0, total - rows)
+        if self._follow:
+            self._top = max_top
+            # 末尾だけを取り出す（バッファの長さによらない）
+            window = list(itertools.islice(reversed(source), rows))[::-1]
+        else:
+            self._top = min(self._top, max_top)
+            window = list(itertools.islice(source, self._top, self._top + rows))
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        for i, line in enumerate(window):
+            self.text.insert(tk.END, line + ("\n" if i < len(window) - 1 else ""),
+                             ("error",) if is_error_line(line) else ())
+        self.text.config(state=tk.DISABLED)
+
+        if total:
+            self.scrollbar.set(self._top / total, min(1.0, (self._top + rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        shown = f"{len(self._errors)}件のエラー" if self.errors_only.get() else f"{len(self._lines)}行"
+        self.count_label.config(text=shown)
+
+    # ── スクロール ───────────────────────────────────────────
+
+    def _scroll_to(self, top: int):
+        total, rows = len(self._source()), self._visible_rows()
+        self._top = max(0, min(top, total - rows))
+        self._follow = self._top >= total - rows
+        self._render()
+
+    def _scroll_lines(self, delta: int):
+        self._scroll_to(self._top + delta)
+        return "break"
+
+    def _on_wheel(self, event):
+        return self._scroll_lines(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, action: str, *args):
+        rows = self._visible_rows()
+        if action == "moveto":
+            self._scroll_to(int(float(args[0]) * len(self._source())))
+        elif action == "scroll":
+            amount, unit = int(args[0]), args[1]
+            self._scroll_lines(amount * (rows if unit == "pages" else 1))
+
+    def _on_filter(self):
+        self._follow = True
+        self._render()
+
+    # ── 書き出し ─────────────────────────────────────────────
+
+    def export(self):
+        """表示対象の行（「エラーのみ」ならエラー行だけ）をテキストファイルに保存"""
+        self._flush()
+        default = f"log_{datetime.now():%Y%m%d_%H%M%S}.txt"
+        path = filedialog.asksaveasfilename(
+            title="ログを保存", defaultextension=".txt", initialfile=default,
+            filetypes=[("テキスト", "*.txt"), ("すべて", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(self._source()) + "\n")
+        except OSError as e:
+            messagebox.showerror("エラー", f"ログを保存できませんでした:\n{e}")
@@ -3,14 +3,10 @@
 ElevenLabs ボイスデザイン & ボイスリミックスツール - GUI版
 """
 
-import json
 import os
-import random
 import sys
-import tempfile
 import threading
 import tkinter as tk
-from datetime import datetime
 from tkinter import ttk, messagebox, scrolledtext, filedialog
 
 if getattr(sys, 'frozen', False):
@@ -22,19 +18,14 @@ os.chdir(BASE_DIR)
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
-from core.config import load_config, save_config
+from core.config import load_config, set_character_voices
 from core.client import get_client as get_elevenlabs_client
+from core.preview_store import get_preview_store
+from core.voice_design import append_voice_log, generate_previews
 
 VOICE_LOG_PATH = os.path.join(BASE_DIR, "voice_design_log.jsonl")
 
 
-def append_voice_log(entry: dict):
-    """ボイスデザイン/リミックスの操作ログをJSONLファイルに追記"""
-    entry["timestamp"] = datetime.now().isoformat()
-    with open(VOICE_LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-
-
 def make_scrollable_frame(parent) -> tuple[tk.Canvas, ttk.Frame]:
     """親フレーム内にスクロール可能なフレームを作成して返す"""
     canvas = tk.Canvas(parent, highlightthickness=0)
@@ -61,7 +52,7 @@ def make_scrollable_frame(parent) -> tuple[tk.Canvas, ttk.Frame]:
 class VoiceDesignTab:
     def __init__(self, notebook, log_func):
         self.log = log_func
-        self.previews: list[dict] = []
+        self.previews: list[dict | None] = []
         self.selected_idx: int | None = None
 
         frame = ttk.Frame(notebook)
@@ -175,7 +166,7 @@ class VoiceDesignTab:
             self.preview_rows[i]['label'].config(text="生成中...")
             self.preview_rows[i]['play'].config(state=tk.DISABLED)
             self.preview_rows[i]['select'].config(state=tk.DISABLED)
-        self.previews.clear()
+        self.previews = [None] * gen_count
         self.selected_idx = None
         self.selected_label.config(text="選択中: なし")
         self.save_btn.config(state=tk.DISABLED)
@@ -183,7 +174,6 @@ class VoiceDesignTab:
 
     def _generate_thread(self, desc: str, gen_count: int):
         try:
-            import base64
             client = get_elevenlabs_client()
             sample = self.sample_text.get('1.0', tk.END).strip() or None
             if sample and len(sample) < 100:
@@ -191,55 +181,45 @@ class VoiceDesignTab:
                 sample = None
             auto_gen = sample is None
 
-            # 6種: 各回で説明文にユニークIDを付けて1つずつ取る（確実に全部違う声）
-            self.log(f"プレビュー生成中...（{gen_count}種 / API {gen_count}回）")
+            # 候補ごとに別の seed で同時にリクエストする（確実に全部違う声）
+            self.log(f"プレビュー生成中...（{gen_count}種 / API {gen_count}回を並列）")
             self.log(f"説明: {desc[:60]}{'...' if len(desc)>60 else ''}")
 
             guidance = self.guidance_var.get()
-            all_previews = []
-            for call_idx in range(gen_count):
-                if call_idx > 0:
-                    self.log(f"生成中...（{call_idx+1}/{gen_count}）")
-                # 毎回異なるseedで確実に違う声を生成
-                seed = random.randint(0, 2147483647)
-                resp = client.text_to_voice.create_previews(
+            toplevel = self.preview_rows[0]['label'].winfo_toplevel()
+
+            def request(seed):
+                return client.text_to_voice.create_previews(
                     voice_description=desc,
                     text=sample if not auto_gen else None,
                     auto_generate_text=auto_gen,
                     guidance_scale=guidance,
                     seed=seed,
                 )
-                previews_data = resp.previews if hasattr(resp, 'previews') else [resp]
-                if previews_data:
-                    all_previews.append(previews_data[0])
-
-            self.previews.clear()
-            for i, preview in enumerate(all_previews[:gen_count]):
-                audio_bytes = b""
-                if hasattr(preview, 'audio_base_64') and preview.audio_base_64:
-                    try:
-                        audio_bytes = base64.b64decode(preview.audio_base_64)
-                    except Exception as e:
-                        self.log(f"  base64デコード失敗: {e}")
-
-                tmp = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False,
-                                                  prefix=f'voice_preview_{i}_')
-                tmp.write(audio_bytes)
-                tmp.close()
-
-                vid = getattr(preview, 'generated_voice_id', f'preview_{i}')
-                self.previews.append({'generated_voice_id': vid,
-                                      'audio_bytes': audio_bytes,
-                                      'temp_path': tmp.name})
+
+            def on_ready(preview):
+                # ワーカースレッドから届いた順に呼ばれる（届いた候補から再生できる）
+                i, vid = preview.index, preview.generated_voice_id
+                preview_path = get_preview_store().put(vid, preview.audio_bytes)
+
+                self.previews[i] = {'generated_voice_id': vid,
+                                    'audio_bytes': preview.audio_bytes,
+                                    'path': preview_path}
 
                 def update_row(idx=i, voice_id=vid):
                     self.preview_rows[idx]['label'].config(text=f"#{idx+1} {voice_id[:24]}...")
                     self.preview_rows[idx]['play'].config(state=tk.NORMAL)
                     self.preview_rows[idx]['select'].config(state=tk.NORMAL)
-                self.preview_rows[i]['label'].winfo_toplevel().after(0, update_row)
+                toplevel.after(0, update_row)
                 self.log(f"  #{i+1} 生成完了: {vid[:24]}...")
 
-            self.log(f"{len(self.previews)}件のプレビューを生成しました")
+            def on_error(i, e):
+                self.log(f"  #{i+1} 生成失敗: {e}")
+                toplevel.after(0, lambda idx=i: self.preview_rows[idx]['label'].config(
+                    text=f"#{idx+1} 生成失敗"))
+
+            done = generate_previews(request, gen_count, on_ready, on_error, fallback_prefix='preview')
+            self.log(f"{len(done)}件のプレビューを生成しました")
         except Exception as e:
             self.log(f"エラー: {e}")
             messagebox.showerror("エラー", str(e))
@@ -248,16 +228,17 @@ class VoiceDesignTab:
                 0, lambda: self.preview_btn.config(state=tk.NORMAL))
 
     def play_preview(self, idx: int):
-        if idx >= len(self.previews):
-            return
-        path = self.previews[idx]['temp_path']
-        if not os.path.exists(path):
-            messagebox.showerror("エラー", "音声ファイルが見つかりません")
+        if idx >= len(self.previews) or self.previews[idx] is None:
             return
+        preview = self.previews[idx]
+        path = get_preview_store().get(preview['generated_voice_id'])
+        if path is None:
+            # 容量上限で消えていたら手元の音声から置き直す
+            path = get_preview_store().put(preview['generated_voice_id'], preview['audio_bytes'])
         os.startfile(path)
 
     def select_preview(self, idx: int):
-        if idx >= len(self.previews):
+        if idx >= len(self.previews) or self.previews[idx] is None:
             return
         self.selected_idx = idx
         vid = self.previews[idx]['generated_voice_id']
@@ -299,6 +280,8 @@ class VoiceDesignTab:
             )
             voice_id = voice.voice_id
             self.log(f"保存完了: voice_id = {voice_id}")
+            # 履歴タブから API を呼ばずに試聴できるよう、候補の音声を voice_id でも引けるようにする
+            get_preview_store().alias(generated_voice_id, voice_id)
             # 旧ボイスをElevenLabsから削除
             if old_voice_id and old_voice_id != voice_id:
                 try:
@@ -306,9 +289,7 @@ class VoiceDesignTab:
                     self.log(f"旧ボイス削除: {old_voice_id}")
                 except Exception as del_e:
                     self.log(f"旧ボイス削除失敗（無視）: {del_e}")
-            config = load_config()
-            config['character_voices'][char_name] = voice_id
-            save_config(config)
+            set_character_voices({char_name: voice_id})
             self.log(f'config.json に登録: "{char_name}" → {voice_id}')
             append_voice_log({
                 "type": "design",
@@ -318,7 +299,7 @@ class VoiceDesignTab:
                 "prompt": desc,
                 "guidance_scale": self.guidance_var.get(),
                 "old_voice_id_deleted": old_voice_id,
-            })
+            }, VOICE_LOG_PATH)
             messagebox.showinfo("登録完了", f'"{char_name}" を登録しました\n\nvoice_id: {voice_id}')
             self.char_name_var.set('')
         except Exception as e:
@@ -341,7 +322,7 @@ class VoiceRemixTab:
     """
     def __init__(self, notebook, log_func):
         self.log = log_func
-        self.previews: list[dict] = []
+        self.previews: list[dict | None] = []
         self.selected_idx: int | None = None
 
         frame = ttk.Frame(notebook)
@@ -530,7 +511,7 @@ class VoiceRemixTab:
             self.preview_rows[i]['label'].config(text="生成中...")
             self.preview_rows[i]['play'].config(state=tk.DISABLED)
             self.preview_rows[i]['select'].config(state=tk.DISABLED)
-        self.previews.clear()
+        self.previews = [None] * gen_count
         self.selected_idx = None
         self.selected_label.config(text="選択中: なし")
         self.save_btn.config(state=tk.DISABLED)
@@ -539,7 +520,6 @@ class VoiceRemixTab:
 
     def _remix_thread(self, voice_id: str, desc: str, gen_count: int):
         try:
-            import base64
             client = get_elevenlabs_client()
             sample = self.sample_text.get('1.0', tk.END).strip() or None
             if sample and len(sample) < 100:
@@ -547,18 +527,16 @@ class VoiceRemixTab:
                 sample = None
             auto_gen = sample is None
 
-            # 各回で説明文にユニークIDを付けて1つずつ取る（確実に全部違う声）
-            self.log(f"リミックス生成中...（{gen_count}種 / API {gen_count}回）")
+            # 候補ごとに別の seed で同時にリクエストする（確実に全部違う声）
+            self.log(f"リミックス生成中...（{gen_count}種 / API {gen_count}回を並列）")
             self.log(f"ベース: {self.voice_var.get()} / 説明: {desc[:50]}...")
 
             guidance = self.guidance_var.get()
             prompt_strength = self.prompt_strength_var.get()
-            all_previews = []
-            for call_idx in range(gen_count):
-                if call_idx > 0:
-                    self.log(f"生成中...（{call_idx+1}/{gen_count}）")
-                seed = random.randint(0, 2147483647)
-                resp = client.text_to_voice.remix(
+            toplevel = self.preview_rows[0]['label'].winfo_toplevel()
+
+            def request(seed):
+                return client.text_to_voice.remix(
                     voice_id=voice_id,
                     voice_description=desc,
                     text=sample if not auto_gen else None,
@@ -567,37 +545,30 @@ class VoiceRemixTab:
                     prompt_strength=prompt_strength,
                     seed=seed,
                 )
-                previews_data = resp.previews if hasattr(resp, 'previews') else [resp]
-                if previews_data:
-                    all_previews.append(previews_data[0])
-
-            self.previews.clear()
-            for i, preview in enumerate(all_previews[:gen_count]):
-                audio_bytes = b""
-                if hasattr(preview, 'audio_base_64') and preview.audio_base_64:
-                    try:
-                        audio_bytes = base64.b64decode(preview.audio_base_64)
-                    except Exception as e:
-                        self.log(f"  base64デコード失敗: {e}")
-
-                tmp = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False,
-                                                  prefix=f'voice_remix_{i}_')
-                tmp.write(audio_bytes)
-                tmp.close()
-
-                vid = getattr(preview, 'generated_voice_id', f'remix_{i}')
-                self.previews.append({'generated_voice_id': vid,
-                                      'audio_bytes': audio_bytes,
-                                      'temp_path': tmp.name})
+
+            def on_ready(preview):
+                # ワーカースレッドから届いた順に呼ばれる（届いた候補から再生できる）
+                i, vid = preview.index, preview.generated_voice_id
+                preview_path = get_preview_store().put(vid, preview.audio_bytes)
+
+                self.previews[i] = {'generated_voice_id': vid,
+                                    'audio_bytes': preview.audio_bytes,
+                                    'path': preview_path}
 
                 def update_row(idx=i, voice_id=vid):
                     self.preview_rows[idx]['label'].config(text=f"#{idx+1} {voice_id[:24]}...")
                     self.preview_rows[idx]['play'].config(state=tk.NORMAL)
                     self.preview_rows[idx]['select'].config(state=tk.NORMAL)
-                self.preview_rows[i]['label'].winfo_toplevel().after(0, update_row)
+                toplevel.after(0, update_row)
                 self.log(f"  #{i+1} 生成完了: {vid[:24]}...")
 
-            self.log(f"{len(self.previews)}件のリミックスを生成しました")
+            def on_error(i, e):
+                self.log(f"  #{i+1} 生成失敗: {e}")
+                toplevel.after(0, lambda idx=i: self.preview_rows[idx]['label'].config(
+                    text=f"#{idx+1} 生成失敗"))
+
+            done = generate_previews(request, gen_count, on_ready, on_error, fallback_prefix='remix')
+            self.log(f"{len(done)}件のリミックスを生成しました")
         except Exception as e:
             self.log(f"エラー: {e}")
             messagebox.showerror("エラー", str(e))
@@ -606,16 +577,17 @@ class VoiceRemixTab:
                 0, lambda: self.remix_btn.config(state=tk.NORMAL))
 
     def play_preview(self, idx: int):
-        if idx >= len(self.previews):
-            return
-        path = self.previews[idx]['temp_path']
-        if not os.path.exists(path):
-            messagebox.showerror("エラー", "音声ファイルが見つかりません")
+        if idx >= len(self.previews) or self.previews[idx] is None:
             return
+        preview = self.previews[idx]
+        path = get_preview_store().get(preview['generated_voice_id'])
+        if path is None:
+            # 容量上限で消えていたら手元の音声から置き直す
+            path = get_preview_store().put(preview['generated_voice_id'], preview['audio_bytes'])
         os.startfile(path)
 
     def select_preview(self, idx: int):
-        if idx >= len(self.previews):
+        if idx >= len(self.previews) or self.previews[idx] is None:
             return
         self.selected_idx = idx
         vid = self.previews[idx]['generated_voice_id']
@@ -657,6 +629,8 @@ class VoiceRemixTab:
             )
             voice_id = voice.voice_id
             self.log(f"保存完了: voice_id = {voice_id}")
+            # 履歴タブから API を呼ばずに試聴できるよう、候補の音声を voice_id でも引けるようにする
+            get_preview_store().alias(generated_voice_id, voice_id)
             # 旧ボイスをElevenLabsから削除
             if old_voice_id and old_voice_id != voice_id:
                 try:
@@ -664,9 +638,7 @@ class VoiceRemixTab:
                     self.log(f"旧ボイス削除: {old_voice_id}")
                 except Exception as del_e:
                     self.log(f"旧ボイス削除失敗（無視）: {del_e}")
-            config = load_config()
-            config['character_voices'][char_name] = voice_id
-            save_config(config)
+            set_character_voices({char_name: voice_id})
             self.log(f'config.json に登録: "{char_name}" → {voice_id}')
             append_voice_log({
                 "type": "remix",
@@ -679,7 +651,7 @@ class VoiceRemixTab:
                 "guidance_scale": self.guidance_var.get(),
                 "prompt_strength": self.prompt_strength_var.get(),
                 "old_voice_id_deleted": old_voice_id,
-            })
+            }, VOICE_LOG_PATH)
             messagebox.showinfo("登録完了", f'"{char_name}" を登録しました\n\nvoice_id: {voice_id}')
             self.char_name_var.set('')
         except Exception as e:
@@ -736,6 +708,9 @@ class MainApp:
 def main():
     root = tk.Tk()
     app = MainApp(root)
+    if os.environ.get("STARTUP_BENCH"):
+        # 起動時間の計測用（cli/bench_startup.py）: 画面を作り終えたら閉じる
+        root.after(1, root.destroy)
     root.mainloop()
 
 
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+ローカル ジョブサーバー
+
+常駐させておくと、GUI (elevenlabs_gui.py) / CLI (generate.py, pipeline.py) の
+ボイス生成がこのサーバー経由になり、同時実行枠・音声キャッシュを共有する。
+起動していなければ各ツールは従来どおり単独で生成する。
+
+使い方:
+  python job_server.py                    # 127.0.0.1:8765 で起動
+  python job_server.py --port 8800 -j 6   # ポート・同時生成数を指定
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.config import load_config
+from core.job_server import JobServer, server_address
+
+
+def main():
+    config = load_config()
+    host, port = server_address(config)
+
+    parser = argparse.ArgumentParser(description="ElevenLabs ローカル ジョブサーバー")
+    parser.add_argument("--host", default=host, help=f"待ち受けアドレス（既定: {host}）")
+    parser.add_argument("--port", type=int, default=port, help=f"ポート（既定: {port}）")
+    parser.add_argument("--concurrency", "-j", type=int,
+                        default=config.get("job_server", {}).get("concurrency"),
+                        help="全ジョブ合計の同時生成数")
+    parser.add_argument("--cache-dir", default=None, help="音声キャッシュの保存先")
+    args = parser.parse_args()
+
+    server = JobServer(args.host, args.port, concurrency=args.concurrency, cache_dir=args.cache_dir)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n停止しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,37 +8,51 @@ Claude Code から呼び出して使う:
 """
 import argparse
 import csv
-import json
 import os
 import sys
 import time
 from pathlib import Path
-
-from dotenv import load_dotenv
-from elevenlabs.client import ElevenLabs
+from typing import TYPE_CHECKING
 
 # プロジェクトルートをパスに追加
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from core.config import load_config
+from core.config import load_config, set_character_voices
 from core.csv_io import read_csv_rows, check_csv_alignment
 from core.client import get_client
 from core.generator import (
     get_voice_id,
     generate_audio,
+    generate_audio_with_timestamps,
     save_audio,
     sanitize_filename,
     is_silence_text,
-    copy_silence_file,
-    check_and_fix_broken_file,
+    silence_seconds,
+    write_silence_file,
     fetch_available_voices,
     load_pronunciation_dict,
 )
+from core.alignment import discard_alignment, save_alignment
+from core.manifest import RunManifest
+from core.mp3 import Mp3Error, output_format_sample_rate, scan_folder
 from core.parser import DialogueLine
+from core.rewriter import format_hits, rewriter_from_config
+from core.ymmp import load_ymmp, save_ymmp, update_voices
 
-# ymm4-tools のモジュールをインポート
+# ymm4-tools の場所
 YMMP4_TOOLS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'ymm4-tools')
-sys.path.insert(0, YMMP4_TOOLS_DIR)
-from ymm4_generate import generate_ymmp, verify_telop_vs_csv, print_telop_verification
+
+# elevenlabs SDK と ymm4_generate は読み込みが重いので、使うステップで初めて読み込む
+# （--help や --skip-ymm4 では読み込まない）
+if TYPE_CHECKING:
+    from elevenlabs.client import ElevenLabs
+
+
+def _ymm4_generate():
+    """ymm4-tools の ymm4_generate モジュール（初回呼び出し時に読み込む）"""
+    if YMMP4_TOOLS_DIR not in sys.path:
+        sys.path.insert(0, YMMP4_TOOLS_DIR)
+    import ymm4_generate
+    return ymm4_generate
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -78,7 +92,7 @@ def parse_elevenlabs_csv(filepath: str) -> list[DialogueLine]:
 def generate_voices(
     dialogues: list[DialogueLine],
     config: dict,
-    client: ElevenLabs,
+    client: "ElevenLabs",
     output_dir: str,
     delay: float = 0.5,
 ) -> list[dict]:
@@ -90,10 +104,14 @@ def generate_voices(
     model_id = config.get("default_model", "eleven_v3")
     output_format = config.get("default_output_format", "mp3_44100_128")
     language_code = config.get("language_code", "ja")
-
-    # 発音辞書
-    pd_locators = load_pronunciation_dict(config)
-    if pd_locators:
+    with_alignment = config.get("save_alignment", False)
+
+    # 発音ルール（ローカル適用が有効ならサーバーの発音辞書は使わない）
+    rewriter = rewriter_from_config(config)
+    pd_locators = None if rewriter else load_pronunciation_dict(config)
+    if rewriter:
+        print(f"  発音ルールをローカルで適用します（{len(rewriter.rules)}件）")
+    elif pd_locators:
         print("  発音辞書を適用します")
 
     for i, d in enumerate(dialogues):
@@ -103,13 +121,14 @@ def generate_voices(
 
         # 無音判定
         if is_silence_text(d.text):
-            print(f"[{d.index:03d}] {d.character} → 無音ファイル配置")
-            if copy_silence_file(str(filepath)):
+            seconds = silence_seconds(d.text, config)
+            print(f"[{d.index:03d}] {d.character} → 無音 {seconds:g}秒")
+            if write_silence_file(str(filepath), seconds, config):
                 results.append({"index": d.index, "character": d.character,
                                 "status": "success", "filepath": str(filepath), "silence": True})
             else:
                 results.append({"index": d.index, "character": d.character,
-                                "status": "error", "reason": "無音ファイルのコピーに失敗"})
+                                "status": "error", "reason": "無音ファイルの作成に失敗"})
             continue
 
         voice_id = get_voice_id(d.character, config)
@@ -121,17 +140,28 @@ def generate_voices(
 
         try:
             print(f"[{d.index:03d}] {d.character} ({d.char_count}字)...")
-            audio_bytes = generate_audio(
+            text, hits = rewriter.rewrite(d.text) if rewriter else (d.text, [])
+            if hits:
+                print(f"    読み置換: {format_hits(hits)}")
+            tts_args = dict(
                 client=client,
-                text=d.text,
+                text=text,
                 voice_id=voice_id,
                 model_id=model_id,
                 output_format=output_format,
                 language_code=language_code,
                 pronunciation_dictionary_locators=pd_locators,
             )
+            alignment = None
+            if with_alignment:
+                audio_bytes, alignment = generate_audio_with_timestamps(**tts_args)
+            else:
+                audio_bytes = generate_audio(**tts_args)
             save_audio(audio_bytes, str(filepath))
-            check_and_fix_broken_file(str(filepath), d.index)
+            if alignment:
+                save_alignment(str(filepath), text, alignment, script=d.text)
+            else:
+                discard_alignment(str(filepath))
             print(f"    -> {filename}")
             results.append({"index": d.index, "character": d.character,
                             "status": "success", "filepath": str(filepath)})
@@ -203,6 +233,57 @@ def check_mp3_alignment(elevenlabs_path: str, output_dir: str) -> tuple[bool, li
     return ok, messages
 
 
+# 壊れたMP3の退避先（ボイスフォルダ内）
+BROKEN_DIR = "_broken"
+
+
+def quarantine_broken_mp3(output_dir: str, config: dict, regenerate: bool = True) -> list[int]:
+    """フォルダ内のMP3のフレーム構造を並列に検査し、壊れたものの連番のリストを返す
+
+    regenerate=True なら壊れたファイルを _broken/ に移してマニフェストの該当連番を error にする
+    （呼び出し元がすぐ再生成する）。--skip-voice など再生成しないときは報告だけで何も変えない。
+    サンプルレートが default_output_format と違うだけのファイルは警告にとどめる
+    （output_format を変えたあとの既存ファイルを消さないため）。
+    """
+    if not os.path.isdir(output_dir):
+        return []
+    sample_rate = output_format_sample_rate(config.get("default_output_format", "mp3_44100_128"))
+    broken, mismatched = scan_folder(output_dir, sample_rate)
+    if mismatched:
+        print(f"  ⚠ サンプルレートが設定（{sample_rate}Hz）と違うMP3: {len(mismatched)}件"
+              f"（作り直すには削除して再実行）")
+        for fname, rate in mismatched[:10]:
+            print(f"    - {fname[:60]}: {rate}Hz")
+        if len(mismatched) > 10:
+            print(f"    ... 他{len(mismatched) - 10}件")
+    if not broken:
+        print("  ✓ MP3構造チェックOK")
+        return []
+
+    print(f"  ⚠ 壊れたMP3: {len(broken)}件")
+    serials = []
+    for fname, reason in broken:
+        print(f"    ✗ {fname[:60]}: {reason}")
+        serial = fname.split('_', 1)[0]
+        if serial.isdigit():
+            serials.append(int(serial))
+    if not regenerate:
+        return serials
+
+    quarantine = os.path.join(output_dir, BROKEN_DIR)
+    os.makedirs(quarantine, exist_ok=True)
+    manifest = RunManifest.load(output_dir)
+    for fname, reason in broken:
+        os.replace(os.path.join(output_dir, fname), os.path.join(quarantine, fname))
+        serial = fname.split('_', 1)[0]
+        if serial.isdigit():
+            entry = manifest.entries.setdefault(serial, {"character": ""})
+            entry.update({"status": "error", "reason": f"MP3破損: {reason}", "updated": time.time()})
+    manifest.save()
+    print(f"  → {BROKEN_DIR}/ に移しました")
+    return serials
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # 4. YMM4生成
 # ══════════════════════════════════════════════════════════════════════════════
@@ -252,7 +333,7 @@ def generate_ymm4(
     project_dir = str(Path(audio_dir).parent)
     output_path = os.path.join(project_dir, f"{project_name}.ymmp")
 
-    result = generate_ymmp(
+    result = _ymm4_generate().generate_ymmp(
         template_path=template_path,
         audio_dir=audio_dir,
         output_path=output_path,
@@ -272,6 +353,30 @@ def generate_ymm4(
     return output_path
 
 
+def update_ymm4(ymmp_path: str, files: dict[int, str], serifs: dict[int, str] | None = None) -> bool:
+    """作り直したボイス（連番 → MP3パス）だけ既存の ymmp に反映する
+
+    手作業の編集は残したまま、該当 VoiceItem の音声パス・長さを差し替えて後ろをずらす。
+    serifs（連番 → セリフ）はテキストが変わった行だけ渡す（Serif の手直しを上書きしないため）。
+    反映できないとき（ymmp にない連番・読めない MP3）は ymmp を変えずに False を返す。
+    """
+    if not files:
+        print("  作り直したボイスなし: ymmp はそのまま使います")
+        return True
+    started = time.monotonic()
+    try:
+        doc = load_ymmp(ymmp_path)
+        deltas = update_voices(doc, files, serifs)
+        save_ymmp(doc)
+    except (ValueError, OSError) as e:
+        print(f"  差分更新できません: {e}")
+        return False
+    resized = sum(1 for delta in deltas.values() if delta)
+    print(f"  ✓ 差分更新: {len(files)}件（長さ変更 {resized}件, "
+          f"{(time.monotonic() - started) * 1000:.0f}ms）")
+    return True
+
+
 def check_tachie_paths(ymmp_path: str, check_type: str = "テンプレート") -> list:
     """ymmpファイル内の立ち絵パスが実際に存在するかチェック
 
@@ -282,24 +387,8 @@ def check_tachie_paths(ymmp_path: str, check_type: str = "テンプレート") -
     Returns:
         不正パスのリスト [(キャラ名, フィールド名, パス), ...]
     """
-    with open(ymmp_path, 'r', encoding='utf-8-sig') as f:
-        data = json.load(f)
-
-    issues = []
-    for c in data.get('Characters', []):
-        name = c.get('Name', '')
-        char_param = c.get('TachieCharacterParameter') or {}
-        item_param = c.get('TachieDefaultItemParameter') or {}
-
-        directory = char_param.get('Directory', '')
-        default_face = item_param.get('DefaultFace', '')
-
-        if directory and not os.path.exists(directory):
-            issues.append((name, 'Directory', directory))
-        if default_face and not os.path.exists(default_face):
-            issues.append((name, 'DefaultFace', default_face))
-
-    return issues
+    # 同じファイルは他のステップで読み込んだ結果を使い回す
+    return load_ymmp(ymmp_path).tachie_issues()
 
 
 def print_tachie_check(issues: list, check_type: str = "テンプレート"):
@@ -359,30 +448,16 @@ def check_characters_exist(
     if os.path.isdir(tachie_dir):
         tachie_folders = {d for d in os.listdir(tachie_dir) if os.path.isdir(os.path.join(tachie_dir, d))}
 
-    # テンプレートymmpの登録キャラ一覧
-    template_chars = set()
-    if template_path and os.path.exists(template_path):
-        try:
-            with open(template_path, 'r', encoding='utf-8-sig') as f:
-                data = json.load(f)
-            for c in data.get('Characters', []):
-                template_chars.add(c.get('Name', ''))
-        except Exception:
-            pass
-
-    # テンプレートに登録されているキャラのDirectoryも確認
+    # テンプレートymmpの登録キャラ一覧と、Directoryが有効なキャラ
     # テンプレートにキャラがあり、Directoryが有効なら口パク立ち絵チェックはパス
+    # （テンプレートは STEP 3.5 の立ち絵パスチェックと同じ読み込み結果を使う）
+    template_chars = set()
     chars_with_valid_dir = set()
     if template_path and os.path.exists(template_path):
         try:
-            with open(template_path, 'r', encoding='utf-8-sig') as f:
-                tpl_data = json.load(f)
-            for c in tpl_data.get('Characters', []):
-                name = c.get('Name', '')
-                char_param = c.get('TachieCharacterParameter') or {}
-                directory = char_param.get('Directory', '')
-                if directory and os.path.isdir(directory):
-                    chars_with_valid_dir.add(name)
+            template = load_ymmp(template_path)
+            template_chars = set(template.characters)
+            chars_with_valid_dir = template.characters_with_tachie_dir()
         except Exception:
             pass
 
@@ -399,27 +474,8 @@ def check_characters_exist(
 # メイン パイプライン
 # ══════════════════════════════════════════════════════════════════════════════
 
-def run_pipeline(
-    split_csv: str,
-    elevenlabs_csv: str,
-    force: bool = False,
-    skip_voice: bool = False,
-    skip_ymm4: bool = False,
-):
-    """パイプライン全体を実行"""
-
-    # ── 準備 ──
-    base_dir = os.path.dirname(__file__)
-
-    if not skip_voice:
-        try:
-            client = get_client()
-        except RuntimeError as e:
-            print(f"ERROR: {e}")
-            sys.exit(1)
-
-    config = load_config(os.path.join(base_dir, 'config.json'))
-
+def resolve_project_paths(split_csv: str, config: dict, base_dir: str) -> tuple[str, str, str]:
+    """_split.csv からプロジェクト名・プロジェクトフォルダ・ボイス出力フォルダを決める"""
     # プロジェクト名を _split.csv のファイル名から推定
     stem = Path(split_csv).stem
     project_name = stem.removesuffix('_split')
@@ -432,6 +488,116 @@ def run_pipeline(
         'voice_base_dir_win', os.path.join(base_dir, 'output'))
     project_dir = os.path.join(voice_base_dir, project_name)
     voice_output_dir = os.path.join(project_dir, 'ボイス')
+    return project_name, project_dir, voice_output_dir
+
+
+def require_client() -> "ElevenLabs":
+    """このプロセスで API を呼ぶときのクライアント。APIキーがなければ終了する"""
+    try:
+        return get_client()
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+
+def run_generation(
+    dialogues: list[DialogueLine],
+    config: dict,
+    client: "ElevenLabs | None",
+    voice_output_dir: str,
+    concurrency: int | None = None,
+    use_server: bool = True,
+) -> list[dict]:
+    """ジョブサーバー → asyncio版 → 逐次版 の順で使えるものでボイスを生成
+
+    client が None なら、ジョブサーバーが使えなかったときに初めて作る
+    （サーバー経由なら SDK の読み込みも API キーも要らない）。
+    """
+    from core.job_server import run_via_server
+
+    if concurrency is None:
+        concurrency = config.get("concurrency", 1)
+    results = None
+    if use_server:
+        results = run_via_server(dialogues, config, voice_output_dir, use_context=False)
+    if results is None:
+        # ここからはこのプロセスで API を呼ぶ（APIキーの確認を兼ねる）
+        client = client or require_client()
+        if concurrency > 1:
+            import asyncio
+            from core.async_generator import generate_with_new_client
+
+            results = asyncio.run(generate_with_new_client(
+                dialogues, config, voice_output_dir,
+                use_context=False, concurrency=concurrency,
+            ))
+        else:
+            results = generate_voices(dialogues, config, client, voice_output_dir)
+    return results
+
+
+def run_distributed_worker(split_csv: str, worker_id: str | None = None):
+    """分散生成のワーカーとして起動（他マシンのコーディネーターが登録したタスクを処理）"""
+    from core.distributed import run_worker
+    from core.work_queue import QUEUE_NAME, WorkQueue, default_worker_id
+
+    base_dir = os.path.dirname(__file__)
+    config = load_config(os.path.join(base_dir, 'config.json'))
+    _, project_dir, voice_output_dir = resolve_project_paths(split_csv, config, base_dir)
+    queue_path = os.path.join(project_dir, QUEUE_NAME)
+    worker_id = worker_id or default_worker_id()
+
+    print(f"ワーカー起動: {worker_id}")
+    print(f"  キュー: {queue_path}")
+    # コーディネーターがキューを作るまで待つ
+    while not os.path.exists(queue_path):
+        time.sleep(2)
+
+    try:
+        client = get_client()
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    queue = WorkQueue(queue_path)
+    try:
+        run_worker(queue, config, client, voice_output_dir, worker_id)
+    finally:
+        queue.close()
+
+
+def run_pipeline(
+    split_csv: str,
+    elevenlabs_csv: str,
+    force: bool = False,
+    skip_voice: bool = False,
+    skip_ymm4: bool = False,
+    concurrency: int | None = None,
+    use_server: bool = True,
+    distributed: bool = False,
+    incremental: bool = False,
+):
+    """パイプライン全体を実行
+
+    distributed=True なら共有フォルダ上の作業キューに連番を登録し、
+    --worker で起動した他マシンのワーカーと分担して生成する（自分も処理する）。
+
+    ジョブサーバー (job_server.py) が起動していればそこへ生成を投げる（use_server=False で無効）。
+    concurrency が2以上（または config.json の concurrency が2以上）なら
+    asyncio 版エンジンで並列生成する。
+
+    incremental=True で既存の ymmp があれば、マニフェストと比べてセリフが変わった行（と STEP 3 で
+    壊れていた行）だけを生成し、その VoiceItem だけを差し替える（ymmp がなければ通常どおり全件）。
+    """
+
+    # ── 準備 ──
+    base_dir = os.path.dirname(__file__)
+    # SDK クライアントは API を直接呼ぶときだけ作る（ジョブサーバー経由なら不要）
+    client = None
+
+    config = load_config(os.path.join(base_dir, 'config.json'))
+    project_name, project_dir, voice_output_dir = resolve_project_paths(split_csv, config, base_dir)
+    ymmp_path = os.path.join(project_dir, f"{project_name}.ymmp")
+    incremental = incremental and not skip_ymm4 and os.path.exists(ymmp_path)
 
     print("=" * 60)
     print(f"パイプライン実行: {project_name}")
@@ -474,6 +640,12 @@ def run_pipeline(
         print("  → YMM4上でキャラ登録してからパイプラインを再実行してください")
     print()
 
+    # 今回作り直したボイス（連番 → MP3パス）と、そのうちセリフが変わったもの。--incremental で ymmp に反映する
+    regenerated = {}
+    serifs = {}
+    # 台本から消えた連番。あれば ymmp は差分更新せず作り直す（VoiceItem を消す手段がないため）
+    removed = []
+
     if skip_voice:
         print("(--skip-voice: ボイス生成をスキップ)")
     else:
@@ -493,21 +665,52 @@ def run_pipeline(
         if missing_voices:
             print(f"\n  ⚠ voice_id 未設定: {', '.join(sorted(missing_voices))}")
             # ElevenLabsに同名ボイスがあれば自動追加
+            client = client or require_client()
             available = fetch_available_voices(client)
-            added = []
-            for char in missing_voices:
-                vid = available.get(char)
-                if vid:
-                    config["character_voices"][char] = vid
-                    added.append(char)
+            voices = {char: available[char] for char in sorted(missing_voices) if available.get(char)}
+            added = list(voices)
             if added:
-                config_path = os.path.join(base_dir, 'config.json')
-                with open(config_path, 'w', encoding='utf-8') as f:
-                    json.dump(config, f, ensure_ascii=False, indent=4)
+                config.setdefault("character_voices", {}).update(voices)
+                set_character_voices(voices, os.path.join(base_dir, 'config.json'))
                 print(f"  → {len(added)}件を自動追加: {', '.join(added)}")
 
+        targets = dialogues
+        if incremental:
+            # 既存 ymmp に反映するので、変わっていない行は作り直さない（--watch と同じ判定）
+            from core.watch import diff_dialogues, remove_serial_files
+
+            manifest = RunManifest.load(voice_output_dir)
+            targets, removed = diff_dialogues(dialogues, manifest, voice_output_dir)
+            for serial in removed:
+                for name in remove_serial_files(voice_output_dir, serial):
+                    print(f"  削除: {name}")
+                manifest.entries.pop(str(serial), None)
+            manifest.save()
+            for d in targets:
+                remove_serial_files(voice_output_dir, d.index)
+            serifs = {d.index: d.text for d in targets}
+            print(f"  --incremental: セリフが変わった {len(targets)}件だけ生成します"
+                  + (f"（削除された行 {len(removed)}件）" if removed else ""))
+
         print()
-        results = generate_voices(dialogues, config, client, voice_output_dir)
+        if distributed:
+            from core.distributed import run_coordinator
+            from core.work_queue import QUEUE_NAME, WorkQueue, default_worker_id
+
+            queue = WorkQueue(os.path.join(project_dir, QUEUE_NAME))
+            try:
+                results = run_coordinator(queue, targets, config, client or require_client(),
+                                          voice_output_dir, worker_id=default_worker_id())
+            finally:
+                queue.close()
+        else:
+            results = run_generation(targets, config, client, voice_output_dir,
+                                     concurrency=concurrency, use_server=use_server)
+
+        manifest = RunManifest.load(voice_output_dir)
+        manifest.record_results(results, dialogues)
+        manifest.save()
+        regenerated.update((r["index"], r["filepath"]) for r in results if r["status"] == "success")
 
         success = sum(1 for r in results if r["status"] == "success")
         skipped = sum(1 for r in results if r["status"] == "skipped")
@@ -529,14 +732,26 @@ def run_pipeline(
     try:
         from verify_voice import trim_trailing_silence
         trimmed = trim_trailing_silence(voice_output_dir, verbose=True)
-    except ImportError:
-        print("  verify_voice.py が見つかりません。スキップ。")
+    except ImportError as e:
+        print(f"  トリミングをスキップ: {e}")
     print()
 
     # ── STEP 3: MP3整合性チェック ──
     print("─" * 40)
     print("STEP 3: MP3整合性チェック")
     print("─" * 40)
+    broken_serials = quarantine_broken_mp3(voice_output_dir, config, regenerate=not skip_voice)
+    if broken_serials and not skip_voice:
+        redo = [d for d in dialogues if d.index in set(broken_serials)]
+        print(f"  → {len(redo)}件を再生成します")
+        redo_results = run_generation(redo, config, client, voice_output_dir,
+                                      concurrency=concurrency, use_server=use_server)
+        manifest = RunManifest.load(voice_output_dir)
+        manifest.record_results(redo_results, redo)
+        manifest.save()
+        regenerated.update((r["index"], r["filepath"]) for r in redo_results if r["status"] == "success")
+    elif broken_serials:
+        print("  → --skip-voice のためそのまま残しています。--skip-voice なしで再実行すると再生成されます")
     ok, messages = check_mp3_alignment(elevenlabs_csv, voice_output_dir)
     for msg in messages:
         print(f"  {msg}")
@@ -569,100 +784,122 @@ def run_pipeline(
         else:
             print("  元台本CSV: なし（ElevenLabsのみモード）")
 
-        try:
-            ymmp_path = generate_ymm4(
-                audio_dir=voice_output_dir,
-                split_csv_path=split_csv,
-                project_name=project_name,
-                config=config,
-                original_csv_path=original_csv,
-                elevenlabs_csv_path=elevenlabs_csv,
-            )
-            print(f"\n  ✓ 生成完了: {ymmp_path}")
-        except Exception as e:
-            print(f"\n  ERROR: {e}")
-            sys.exit(1)
+        updated = False
+        if incremental and removed:
+            print(f"  台本から削除された行が {len(removed)}件あるため、既存ymmpは差分更新せず"
+                  "テンプレートから生成し直します")
+        elif incremental:
+            print(f"  既存ymmpを差分更新: {os.path.basename(ymmp_path)}")
+            updated = update_ymm4(ymmp_path, regenerated, serifs)
+            if not updated:
+                print("  → テンプレートから生成し直します")
+        if not updated:
+            try:
+                ymmp_path = generate_ymm4(
+                    audio_dir=voice_output_dir,
+                    split_csv_path=split_csv,
+                    project_name=project_name,
+                    config=config,
+                    original_csv_path=original_csv,
+                    elevenlabs_csv_path=elevenlabs_csv,
+                )
+                print(f"\n  ✓ 生成完了: {ymmp_path}")
+            except Exception as e:
+                print(f"\n  ERROR: {e}")
+                sys.exit(1)
 
         # ── STEP 5: テロップ検証 ──
         print("─" * 40)
         print("STEP 5: テロップ検証（ymmp vs CSV）")
         print("─" * 40)
-        mismatches = verify_telop_vs_csv(ymmp_path, split_csv)
-        # VoiceItem数を取得
-        with open(ymmp_path, 'r', encoding='utf-8-sig') as f:
-            ymmp_data = json.load(f)
-        voice_count = sum(
-            1 for item in ymmp_data['Timelines'][0]['Items']
-            if item.get('$type', '').startswith('YukkuriMovieMaker.Project.Items.VoiceItem')
-        )
-        print_telop_verification(mismatches, voice_count)
+        mismatches = _ymm4_generate().verify_telop_vs_csv(ymmp_path, split_csv)
+        # 生成したymmpは1回だけ読み込み、STEP 5.5 / 7 でも使う
+        ymmp_doc = load_ymmp(ymmp_path)
+        _ymm4_generate().print_telop_verification(mismatches, len(ymmp_doc.voice_items))
         print()
 
         # ── STEP 5.5: 生成ymmp立ち絵パスチェック ──
-        ymmp_issues = check_tachie_paths(ymmp_path, "生成ymmp")
+        ymmp_issues = ymmp_doc.tachie_issues()
         print_tachie_check(ymmp_issues, "生成ymmp")
         print()
 
-    # ── STEP 6: 音声長チェック ──
+    # ── STEP 6: 音声長・音量・話者チェック ──
     print("─" * 40)
-    print("STEP 6: 音声長チェック")
+    print("STEP 6: 音声長・音量・話者チェック")
     print("─" * 40)
     try:
-        from verify_voice import check_durations
+        from verify_voice import check_durations, check_levels
+        from verify.speaker_check import check_speakers
         anomalies = check_durations(elevenlabs_csv, voice_output_dir, verbose=True)
         if anomalies:
             print(f"\n  ⚠ {len(anomalies)}件の異常な長さのファイルがあります。確認してください。")
-    except ImportError:
-        print("  verify_voice.py が見つかりません。スキップ。")
+        level_anomalies = check_levels(voice_output_dir, verbose=True)
+        if level_anomalies:
+            print(f"\n  ⚠ {len(level_anomalies)}件の音量が揃っていないファイルがあります。確認してください。")
+        speaker_anomalies = check_speakers(voice_output_dir, verbose=True)
+        if speaker_anomalies:
+            print(f"\n  ⚠ {len(speaker_anomalies)}件の声がキャラの他のセリフと違います。voice_id を確認してください。")
+    except ImportError as e:
+        print(f"  音声チェックをスキップ: {e}")
     print()
 
-    # ── STEP 7: 最終ボイス文字起こし検証 ──
+    # ── STEP 7: 最終ボイス検証（アライメント or 文字起こし） ──
     if not skip_ymm4:
         print("─" * 40)
-        print("STEP 7: 最終ボイス文字起こし検証")
+        print("STEP 7: 最終ボイス検証")
         print("─" * 40)
-        try:
-            import speech_recognition as sr_mod
-            from pydub import AudioSegment as AS
-            import tempfile, re as re_mod
-
-            with open(ymmp_path, 'r', encoding='utf-8-sig') as f:
-                ymmp_data_verify = json.load(f)
-            v_items = [i for i in ymmp_data_verify['Timelines'][0]['Items']
-                       if 'VoiceItem' in i.get('$type', '') and i.get('Hatsuon', '')]
-            if v_items:
-                last_v = max(v_items, key=lambda x: x.get('Frame', 0))
-                last_serif = last_v.get('Serif', '')
-                last_hatsuon = last_v.get('Hatsuon', '')
-                last_char = last_v.get('CharacterName', '')
-
-                recognizer = sr_mod.Recognizer()
-                tmp_wav = os.path.join(tempfile.gettempdir(), 'pipeline_verify_last.wav')
-                audio_seg = AS.from_mp3(last_hatsuon)
-                audio_seg.export(tmp_wav, format="wav")
-                with sr_mod.AudioFile(tmp_wav) as source:
-                    audio_data = recognizer.record(source)
-                try:
-                    transcript = recognizer.recognize_google(audio_data, language="ja-JP")
-                except Exception:
-                    transcript = "(認識不能)"
-
-                clean_serif = re_mod.sub(r'\[.*?\]', '', last_serif).strip()
-                match_chars = sum(1 for c in clean_serif if c in transcript)
-                ratio = match_chars / max(len(clean_serif), 1)
-                mark = "✓" if ratio > 0.3 else "✗ ズレの可能性あり"
-
-                print(f"  最終ボイス: [{last_char}] {clean_serif[:40]}")
-                print(f"  文字起こし: {transcript[:40]}")
-                print(f"  一致率: {ratio:.0%} {mark}")
-                if os.path.exists(tmp_wav):
-                    os.remove(tmp_wav)
-            else:
-                print("  ボイスアイテムなし")
-        except ImportError:
-            print("  SpeechRecognition/pydub 未インストール。スキップ。")
-        except Exception as e:
-            print(f"  検証エラー: {e}")
+        from verify.alignment_check import check_folder, has_alignments, print_alignment_report
+
+        if has_alignments(voice_output_dir):
+            # タイムスタンプ付きで生成していれば、音声認識なしで全件をオフライン照合
+            script = {r['serial']: r['text'] for r in read_csv_rows(elevenlabs_csv)}
+            alignment_result = check_folder(voice_output_dir, script)
+            print_alignment_report(alignment_result)
+            if alignment_result['no_alignment']:
+                print(f"  アライメントなしの {len(alignment_result['no_alignment'])}件は未検証")
+        else:
+            try:
+                import speech_recognition as sr_mod
+                from pydub import AudioSegment as AS
+                import tempfile, re as re_mod
+                from verify.similarity import score_pair
+
+                v_items = [i for i in ymmp_doc.voice_items if i.get('Hatsuon', '')]
+                if v_items:
+                    last_v = v_items[-1]
+                    last_serif = last_v.get('Serif', '')
+                    last_hatsuon = last_v.get('Hatsuon', '')
+                    last_char = last_v.get('CharacterName', '')
+
+                    recognizer = sr_mod.Recognizer()
+                    tmp_wav = os.path.join(tempfile.gettempdir(), 'pipeline_verify_last.wav')
+                    audio_seg = AS.from_mp3(last_hatsuon)
+                    audio_seg.export(tmp_wav, format="wav")
+                    with sr_mod.AudioFile(tmp_wav) as source:
+                        audio_data = recognizer.record(source)
+                    try:
+                        transcript = recognizer.recognize_google(audio_data, language="ja-JP")
+                    except Exception:
+                        transcript = "(認識不能)"
+
+                    clean_serif = re_mod.sub(r'\[.*?\]', '', last_serif).strip()
+                    score = score_pair(clean_serif, transcript)
+                    ratio = score.similarity
+                    mark = "✓" if ratio > 0.3 else "✗ ズレの可能性あり"
+
+                    print(f"  最終ボイス: [{last_char}] {clean_serif[:40]}")
+                    print(f"  文字起こし: {transcript[:40]}")
+                    print(f"  一致率: {ratio:.0%} {mark}")
+                    if score.diff:
+                        print(f"  差分: {score.diff[:80]}")
+                    if os.path.exists(tmp_wav):
+                        os.remove(tmp_wav)
+                else:
+                    print("  ボイスアイテムなし")
+            except ImportError:
+                print("  SpeechRecognition/pydub 未インストール。スキップ。")
+            except Exception as e:
+                print(f"  検証エラー: {e}")
         print()
 
     # ── 完了 ──
@@ -676,6 +913,168 @@ def run_pipeline(
         print(f"  ymmp:         {ymmp_path}")
 
 
+# ══════════════════════════════════════════════════════════════════════════════
+# 監視モード (--watch)
+# ══════════════════════════════════════════════════════════════════════════════
+
+def update_changed_voices(
+    split_csv: str,
+    elevenlabs_csv: str,
+    config: dict,
+    client: "ElevenLabs | None",
+    voice_output_dir: str,
+    concurrency: int | None = None,
+    use_server: bool = True,
+    ymmp_path: str | None = None,
+):
+    """マニフェストと比べて変わったセリフだけ再生成し、そのファイルだけ検証する
+
+    ymmp_path を渡すと、その ymmp の該当 VoiceItem も差し替える（--watch --incremental）。
+    """
+    from core.watch import diff_dialogues, remove_serial_files
+
+    started = time.monotonic()
+    ok, messages = check_csv_alignment(split_csv, elevenlabs_csv)
+    if not ok:
+        # 編集途中で行数がずれている間は生成しない
+        for msg in messages:
+            print(f"  {msg}")
+        print("  ⚠ 整合性チェックNGのため待機します（保存し直すと再チェック）")
+        return
+
+    dialogues = parse_elevenlabs_csv(elevenlabs_csv)
+    manifest = RunManifest.load(voice_output_dir)
+    changed, removed = diff_dialogues(dialogues, manifest, voice_output_dir)
+    if not changed and not removed:
+        manifest.save()
+        print("  変更なし")
+        return
+
+    for serial in removed:
+        for name in remove_serial_files(voice_output_dir, serial):
+            print(f"  削除: {name}")
+        manifest.entries.pop(str(serial), None)
+    for d in changed:
+        remove_serial_files(voice_output_dir, d.index)
+
+    results = []
+    if changed:
+        print(f"  再生成: {len(changed)}件 ({', '.join(str(d.index) for d in changed[:20])}"
+              f"{' ...' if len(changed) > 20 else ''})")
+        results = run_generation(changed, config, client, voice_output_dir,
+                                 concurrency=concurrency, use_server=use_server)
+        manifest.record_results(results, changed)
+    manifest.save()
+
+    files = [os.path.basename(r["filepath"]) for r in results if r["status"] == "success"]
+    try:
+        from verify_voice import trim_trailing_silence
+        trim_trailing_silence(voice_output_dir, verbose=False, files=files)
+    except ImportError:
+        pass
+
+    ok, messages = check_mp3_alignment(elevenlabs_csv, voice_output_dir)
+    if not ok:
+        for msg in messages:
+            print(f"  {msg}")
+    try:
+        from verify_voice import check_durations, check_levels
+        anomalies = check_durations(elevenlabs_csv, voice_output_dir, verbose=False, files=files)
+        for serial, char, dur, tlen, text, fname in anomalies:
+            print(f"  ★ 音声長異常 #{serial} [{char}] {dur:.1f}秒 (文字数{tlen}) {text}")
+        for serial, fname, loud, delta, peak in check_levels(voice_output_dir, files=files, verbose=False):
+            print(f"  ★ 音量異常 #{serial} {loud:.1f}LUFS ({delta:+.1f}dB) ピーク{peak:.1f}dBFS")
+    except ImportError:
+        pass
+
+    if ymmp_path and os.path.exists(ymmp_path):
+        if removed:
+            # 行が減るとアイテムの削除・詰めが要るので差分更新しない
+            print("  ⚠ 削除された行があるため ymmp は更新しません（--incremental なしで生成し直してください）")
+        else:
+            update_ymm4(ymmp_path, {r["index"]: r["filepath"] for r in results if r["status"] == "success"},
+                        {d.index: d.text for d in changed})
+
+    errors = sum(1 for r in results if r["status"] == "error")
+    print(f"  更新完了: 再生成 {len(files)}件 / 削除 {len(removed)}件 / エラー {errors}件"
+          f"（{time.monotonic() - started:.1f}秒）")
+
+
+def watch_pipeline(
+    split_csv: str,
+    elevenlabs_csv: str,
+    concurrency: int | None = None,
+    use_server: bool = True,
+    incremental: bool = False,
+):
+    """CSVの保存を監視し、変更されたセリフだけ再生成し続ける（Ctrl+C で終了）
+
+    incremental=True なら既存の ymmp にも変更を反映する。
+    """
+    base_dir = os.path.dirname(__file__)
+    config = load_config(os.path.join(base_dir, 'config.json'))
+    project_name, project_dir, voice_output_dir = resolve_project_paths(split_csv, config, base_dir)
+    ymmp_path = os.path.join(project_dir, f"{project_name}.ymmp") if incremental else None
+
+    from core.watch import FileWatcher
+
+    watcher = FileWatcher([split_csv, elevenlabs_csv])
+    print("=" * 60)
+    print(f"監視モード（{watcher.mode}）: Ctrl+C で終了")
+    print("=" * 60)
+    print(f"  split CSV:      {split_csv}")
+    print(f"  elevenlabs CSV: {elevenlabs_csv}")
+    print(f"  出力先:         {voice_output_dir}")
+    try:
+        while True:
+            print(f"\n[{time.strftime('%H:%M:%S')}] 差分チェック")
+            update_changed_voices(split_csv, elevenlabs_csv, config, None, voice_output_dir,
+                                  concurrency=concurrency, use_server=use_server, ymmp_path=ymmp_path)
+            changed = watcher.wait()
+            print(f"\n保存を検知: {', '.join(os.path.basename(p) for p in changed)}")
+    except KeyboardInterrupt:
+        print("\n監視を終了しました")
+    finally:
+        watcher.close()
+
+
+def render_preview_pipeline(split_csv: str, elevenlabs_csv: str) -> str | None:
+    """生成済みMP3を連番順に連結して試聴用MP3とキューシートを作る（YMM4不要）"""
+    base_dir = os.path.dirname(__file__)
+    config = load_config(os.path.join(base_dir, 'config.json'))
+    project_name, project_dir, voice_output_dir = resolve_project_paths(split_csv, config, base_dir)
+    if not os.path.isdir(voice_output_dir):
+        print(f"ERROR: ボイスフォルダがありません: {voice_output_dir}")
+        return None
+
+    dialogues = parse_elevenlabs_csv(elevenlabs_csv)
+    gap_seconds = config.get('ymm4', {}).get('gap_seconds', 0.3)
+    output_path = os.path.join(project_dir, f"{project_name}_preview.mp3")
+
+    from core.preview_render import render_preview
+
+    start = time.time()
+    try:
+        result = render_preview(dialogues, voice_output_dir, output_path, gap_seconds=gap_seconds)
+    except Mp3Error as e:
+        print(f"ERROR: {e}")
+        return None
+
+    total = result['duration_ms'] // 1000
+    print(f"✓ プレビュー: {output_path}")
+    print(f"  {len(result['tracks'])}セリフ / {total // 60}分{total % 60:02d}秒"
+          f"（間隔 {gap_seconds}秒, {time.time() - start:.1f}秒で作成）")
+    print(f"  キューシート: {result['cue']}")
+    print(f"  ラベル（Audacity）: {result['labels']}")
+    if result['missing']:
+        shown = ', '.join(str(s) for s in result['missing'][:10])
+        more = f" ...他 {len(result['missing']) - 10}件" if len(result['missing']) > 10 else ""
+        print(f"⚠ MP3なし（{len(result['missing'])}件）: 連番 {shown}{more}")
+    for serial, reason in result['skipped']:
+        print(f"⚠ 連番{serial}: スキップ — {reason}")
+    return output_path
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='ボイス生成パイプライン: 整合性チェック → ボイス生成 → MP3チェック → YMM4生成',
@@ -685,26 +1084,77 @@ def main():
   python pipeline.py --split 台本_split.csv --elevenlabs 台本_elevenlabs.csv
   python pipeline.py --split 台本_split.csv --elevenlabs 台本_elevenlabs.csv --skip-voice
   python pipeline.py --split 台本_split.csv --elevenlabs 台本_elevenlabs.csv --force
+  python pipeline.py --split 台本_split.csv --elevenlabs 台本_elevenlabs.csv -j 4
+
+台本編集中の自動再生成（保存のたびに変更行だけ作り直す）:
+  python pipeline.py --split 台本_split.csv --elevenlabs 台本_elevenlabs.csv --watch
+  python pipeline.py --split 台本_split.csv --elevenlabs 台本_elevenlabs.csv --watch --incremental
+
+手直ししたセリフだけ既存のymmpに反映（テンプレートから作り直さない）:
+  python pipeline.py --split 台本_split.csv --elevenlabs 台本_elevenlabs.csv --incremental
+
+全セリフを連結した試聴用MP3とキューシートを作る（YMM4不要）:
+  python pipeline.py --split 台本_split.csv --elevenlabs 台本_elevenlabs.csv --render-preview
+
+分散生成（共有フォルダ上のキューを複数マシンで分担）:
+  python pipeline.py --split 台本_split.csv --elevenlabs 台本_elevenlabs.csv --distributed
+  python pipeline.py --split 台本_split.csv --worker     # 他のマシンで
         """
     )
     parser.add_argument('--split', '-s', required=True,
                         help='_split.csv のパス')
-    parser.add_argument('--elevenlabs', '-e', required=True,
-                        help='_elevenlabs.csv のパス')
+    parser.add_argument('--elevenlabs', '-e',
+                        help='_elevenlabs.csv のパス（--worker 以外では必須）')
     parser.add_argument('--force', '-f', action='store_true',
                         help='整合性チェック失敗時も続行')
     parser.add_argument('--skip-voice', action='store_true',
                         help='ボイス生成をスキップ（既にMP3がある場合）')
     parser.add_argument('--skip-ymm4', action='store_true',
                         help='YMM4生成をスキップ')
+    parser.add_argument('--concurrency', '-j', type=int, default=None,
+                        help='同時生成数（2以上で asyncio 並列生成。省略時は config.json の concurrency）')
+    parser.add_argument('--no-server', action='store_true',
+                        help='ジョブサーバーが起動していても使わず単独で生成')
+    parser.add_argument('--watch', action='store_true',
+                        help='CSVの保存を監視し、変更されたセリフだけ再生成し続ける')
+    parser.add_argument('--incremental', action='store_true',
+                        help='既存のymmpを作り直さず、再生成したセリフのVoiceItemだけ差し替える')
+    parser.add_argument('--render-preview', action='store_true',
+                        help='生成済みMP3を連結した試聴用MP3とキューシートを作る（生成は行わない）')
+    parser.add_argument('--distributed', action='store_true',
+                        help='共有フォルダの作業キューで複数マシン分散生成（コーディネーター）')
+    parser.add_argument('--worker', action='store_true',
+                        help='分散生成のワーカーとして起動（生成のみ行う）')
+    parser.add_argument('--worker-id', default=None,
+                        help='ワーカー名（省略時: ホスト名-PID）')
     args = parser.parse_args()
 
+    if args.worker:
+        run_distributed_worker(args.split, args.worker_id)
+        return
+    if not args.elevenlabs:
+        parser.error('--elevenlabs は必須です')
+
+    if args.render_preview:
+        if not render_preview_pipeline(args.split, args.elevenlabs):
+            sys.exit(1)
+        return
+
+    if args.watch:
+        watch_pipeline(args.split, args.elevenlabs, concurrency=args.concurrency,
+                       use_server=not args.no_server, incremental=args.incremental)
+        return
+
     run_pipeline(
         split_csv=args.split,
         elevenlabs_csv=args.elevenlabs,
         force=args.force,
         skip_voice=args.skip_voice,
         skip_ymm4=args.skip_ymm4,
+        concurrency=args.concurrency,
+        use_server=not args.no_server,
+        distributed=args.distributed,
+        incremental=args.incremental,
     )
 
 
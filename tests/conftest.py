@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 実APIを呼ぶ手動の比較スクリプト（python tests/test_context.py で実行する）
+collect_ignore = ["test_context.py"]
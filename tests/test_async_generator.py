@@ -0,0 +1,30 @@
+"""core.async_generator: レート制限の枠がキャンセルで失われない"""
+import asyncio
+import time
+
+from core.async_generator import AsyncRateLimiter
+
+
+def test_cancel_while_waiting_for_interval_returns_permit():
+    async def scenario():
+        limiter = AsyncRateLimiter(concurrency=1, min_interval=10.0)
+        limiter._last_start = time.monotonic()
+
+        async def enter():
+            async with limiter:
+                pass
+
+        # 開始間隔の待ち（asyncio.sleep）の最中にキャンセルする
+        task = asyncio.create_task(enter())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+        limiter.min_interval = 0.0
+        await asyncio.wait_for(limiter.__aenter__(), timeout=1.0)
+        await limiter.__aexit__(None, None, None)
+
+    asyncio.run(scenario())
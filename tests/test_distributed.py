@@ -0,0 +1,131 @@
+"""core.distributed: 複数プロセスのワーカーで作業キューを分担する"""
+import collections
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import core.distributed as distributed
+from core.parser import DialogueLine
+from core.work_queue import WorkQueue
+
+POLL = 0.05
+
+
+def _generate(log_path: str, worker_id: str):
+    """生成の代わりに、処理した連番をワーカーごとのログに追記する"""
+    def generate_fn(dialogues, config, client, output_dir):
+        results = []
+        for d in dialogues:
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(f"{d.index}\n")
+            time.sleep(0.005)
+            results.append({"index": d.index, "character": d.character, "status": "success",
+                            "filepath": os.path.join(output_dir, f"{d.index}_{d.character}.mp3")})
+        return results
+    return generate_fn
+
+
+def _worker_main(db_path: str, out_dir: str, worker_id: str):
+    distributed.POLL_INTERVAL = POLL
+    queue = WorkQueue(db_path)
+    try:
+        distributed.run_worker(queue, {}, None, out_dir, worker_id,
+                               generate_fn=_generate(os.path.join(out_dir, f"{worker_id}.log"), worker_id))
+    finally:
+        queue.close()
+
+
+def _dialogues(n: int, text: str) -> list[DialogueLine]:
+    return [DialogueLine(index=i, character="ヒナ", text=f"{text}{i}", char_count=2) for i in range(1, n + 1)]
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "_queue.sqlite")
+
+
+def _processed(out_dir) -> collections.Counter:
+    counts = collections.Counter()
+    for name in os.listdir(out_dir):
+        if name.endswith(".log"):
+            with open(os.path.join(out_dir, name), encoding="utf-8") as f:
+                counts.update(int(line) for line in f if line.strip())
+    return counts
+
+
+def test_workers_started_before_coordinator_share_tasks(queue_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(distributed, "POLL_INTERVAL", POLL)
+    out_dir = str(tmp_path / "voice")
+    os.makedirs(out_dir)
+
+    # 前回の実行が終わったままのキュー
+    old = WorkQueue(queue_path)
+    distributed.run_coordinator(old, _dialogues(3, "前回"), {}, None, out_dir, "old",
+                                generate_fn=_generate(os.path.join(str(tmp_path), "old.log"), "old"))
+    old.close()
+
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=_worker_main, args=(queue_path, out_dir, f"w{i}")) for i in range(3)]
+    for p in workers:
+        p.start()
+    try:
+        time.sleep(1.0)
+        # 登録前なので、終わった前回の実行を見て終了してはいけない
+        assert all(p.is_alive() for p in workers)
+        assert _processed(out_dir) == collections.Counter()
+
+        queue = WorkQueue(queue_path)
+        results = distributed.run_coordinator(
+            queue, _dialogues(60, "今回"), {}, None, out_dir, "coord",
+            generate_fn=_generate(os.path.join(out_dir, "coord.log"), "coord"))
+        queue.close()
+        for p in workers:
+            p.join(timeout=30)
+            assert p.exitcode == 0
+    finally:
+        for p in workers:
+            if p.is_alive():
+                p.terminate()
+
+    processed = _processed(out_dir)
+    assert sorted(processed) == list(range(1, 61))
+    assert set(processed.values()) == {1}
+    assert [r["index"] for r in results] == list(range(1, 61))
+    assert all(r["status"] == "success" for r in results)
+
+
+def test_current_run_follows_populate_and_close(queue_path):
+    queue = WorkQueue(queue_path)
+    assert queue.current_run() is None
+    queue.populate(_dialogues(2, "a"))
+    run_id = queue.current_run()
+    assert run_id
+    queue.close_run()
+    assert queue.current_run() is None
+    queue.populate(_dialogues(2, "b"))
+    assert queue.current_run() not in (None, run_id)
+    queue.close()
+
+
+def test_second_run_returns_only_its_own_serials(queue_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(distributed, "POLL_INTERVAL", POLL)
+    out_dir = str(tmp_path / "voice")
+    os.makedirs(out_dir)
+    queue = WorkQueue(queue_path)
+    try:
+        first = distributed.run_coordinator(
+            queue, _dialogues(5, "a"), {}, None, out_dir, "coord",
+            generate_fn=_generate(os.path.join(out_dir, "coord.log"), "coord"))
+        assert [r["index"] for r in first] == [1, 2, 3, 4, 5]
+
+        # 台本が2行に減った2回目: 前回の 3〜5 は結果にもキューにも残らない
+        second = distributed.run_coordinator(
+            queue, _dialogues(2, "b"), {}, None, out_dir, "coord",
+            generate_fn=_generate(os.path.join(out_dir, "coord.log"), "coord"))
+        assert [r["index"] for r in second] == [1, 2]
+        assert [r["index"] for r in queue.results()] == [1, 2]
+        assert queue.counts() == {"done": 2}
+    finally:
+        queue.close()
@@ -0,0 +1,121 @@
+"""core.job_server: 終わったジョブの掃除と、サーバー優先のクライアント生成"""
+import threading
+import time
+import urllib.error
+from dataclasses import asdict
+
+import pytest
+
+import core.client
+import core.generator as generator
+import core.job_server as job_server
+from core.job_server import JobClient, JobLostError, JobServer
+from core.parser import DialogueLine
+
+DIALOGUES = [DialogueLine(index=1, character="ヒナ", text="こんにちは", char_count=5)]
+
+
+@pytest.fixture
+def server():
+    server = JobServer(port=0)
+    yield server
+    server._loop.stop()
+
+
+@pytest.fixture
+def http_client(server):
+    """server を別スレッドで HTTP 起動し、つながる JobClient を返す"""
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    while server._httpd is None:
+        time.sleep(0.01)
+    yield JobClient(*server._httpd.server_address[:2])
+    server.shutdown()
+    thread.join(timeout=5)
+
+
+def _add_job(server: JobServer, job_id: str, status: str, finished: float | None = None):
+    server.jobs[job_id] = {"id": job_id, "status": status, "events": [], "results": None, "error": None}
+    if finished is not None:
+        server.jobs[job_id]["finished"] = finished
+
+
+def test_prune_drops_expired_and_excess_finished_jobs(server, monkeypatch):
+    monkeypatch.setattr(job_server, "MAX_FINISHED_JOBS", 2)
+    monkeypatch.setattr(job_server.time, "time", lambda: 10_000.0)
+    _add_job(server, "running", "running")
+    _add_job(server, "expired", "done", 10_000.0 - job_server.JOB_TTL - 1)
+    _add_job(server, "old", "error", 9_000.0)
+    _add_job(server, "mid", "done", 9_500.0)
+    _add_job(server, "new", "done", 9_900.0)
+
+    with server._cond:
+        server._prune()
+
+    assert sorted(server.jobs) == ["mid", "new", "running"]
+
+
+def test_update_marks_finished_time(server):
+    _add_job(server, "a", "queued")
+    server._update(server.jobs["a"], status="running")
+    assert "finished" not in server.jobs["a"]
+    server._update(server.jobs["a"], status="done", results=[])
+    assert server.jobs["a"]["finished"] > 0
+
+
+def test_generate_dialogues_uses_server_without_sdk_client(monkeypatch, tmp_path):
+    results = [{"index": 1, "character": "ヒナ", "status": "success"}]
+    monkeypatch.setattr(job_server, "run_via_server", lambda *args, **kwargs: results)
+
+    def no_client():
+        raise AssertionError("ジョブサーバー経由なのにクライアントを作った")
+
+    monkeypatch.setattr(core.client, "get_client", no_client)
+
+    assert generator.generate_dialogues(DIALOGUES, {}, None, str(tmp_path)) == results
+
+
+def test_generate_dialogues_creates_client_on_fallback(monkeypatch, tmp_path):
+    client = object()
+    monkeypatch.setattr(job_server, "run_via_server", lambda *args, **kwargs: None)
+    monkeypatch.setattr(core.client, "get_client", lambda: client)
+    calls = []
+    monkeypatch.setattr(generator, "process_dialogues",
+                        lambda dialogues, config, c, output_dir: calls.append(c) or [])
+
+    generator.generate_dialogues(DIALOGUES, {}, None, str(tmp_path))
+
+    assert calls == [client]
+
+
+@pytest.mark.parametrize("missing", ["dialogues", "config", "output_dir"])
+def test_submit_rejects_incomplete_job_before_scheduling(server, missing):
+    payload = {"dialogues": [asdict(d) for d in DIALOGUES], "config": {}, "output_dir": "/tmp/x"}
+    del payload[missing]
+    scheduled = []
+    server._loop.submit = scheduled.append
+
+    with pytest.raises(ValueError, match=missing):
+        server.submit(payload)
+
+    assert server.jobs == {}
+    assert scheduled == []
+
+
+def test_post_without_output_dir_is_400(http_client):
+    with pytest.raises(urllib.error.HTTPError) as e:
+        http_client._request("POST", "/jobs", {"dialogues": [asdict(d) for d in DIALOGUES], "config": {}})
+    assert e.value.code == 400
+
+
+def test_follow_pruned_job_raises_job_lost(http_client):
+    with pytest.raises(JobLostError):
+        http_client.follow("gone", poll_timeout=0.1)
+
+
+def test_run_via_server_falls_back_when_job_is_lost(http_client, monkeypatch, tmp_path):
+    host, port = http_client.base_url.rsplit(":", 1)
+    config = {"job_server": {"host": host.removeprefix("http://"), "port": int(port)}}
+    monkeypatch.setattr(JobClient, "submit", lambda self, *args, **kwargs: "gone")
+
+    assert job_server.run_via_server(DIALOGUES, config, str(tmp_path)) is None
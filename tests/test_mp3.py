@@ -0,0 +1,32 @@
+"""core.mp3 の構造チェック"""
+import pytest
+
+from core.mp3 import MIN_FRAMES, read_layout, scan_folder, silence_mp3, validate_mp3
+
+
+def test_scan_folder_reports_sample_rate_mismatch_separately(tmp_path):
+    (tmp_path / "1_a_ok.mp3").write_bytes(silence_mp3(1000))
+    (tmp_path / "2_a_rate.mp3").write_bytes(silence_mp3(1000, 22050, 32))
+    (tmp_path / "3_a_cut.mp3").write_bytes(silence_mp3(1000)[:-100])
+
+    broken, mismatched = scan_folder(str(tmp_path), 44100)
+
+    assert [name for name, _ in broken] == ["3_a_cut.mp3"]
+    assert mismatched == [("2_a_rate.mp3", 22050)]
+
+
+def test_scan_folder_without_expected_rate(tmp_path):
+    (tmp_path / "1_a_rate.mp3").write_bytes(silence_mp3(1000, 22050, 32))
+
+    assert scan_folder(str(tmp_path)) == ([], [])
+
+
+@pytest.mark.parametrize("sample_rate, bitrate", [(44100, 128), (48000, 192), (22050, 32), (16000, 32)])
+@pytest.mark.parametrize("duration_ms", [0, 1, 20, 50, 100, 1500])
+def test_silence_mp3_passes_validation(duration_ms, sample_rate, bitrate):
+    data = silence_mp3(duration_ms, sample_rate, bitrate)
+
+    assert validate_mp3(data, sample_rate) == (True, "")
+    layout = read_layout(data)
+    assert len(layout.frames) >= MIN_FRAMES
+    assert layout.duration_ms == pytest.approx(duration_ms, abs=1)
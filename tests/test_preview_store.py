@@ -0,0 +1,39 @@
+"""core.preview_store: 問い合わせだけでは最終利用時刻を更新しない"""
+import os
+
+from core.preview_store import PreviewStore
+
+
+def _set_mtime(path: str, t: float):
+    os.utime(path, (t, t))
+
+
+def test_lookup_without_touch_keeps_lru_order(tmp_path):
+    store = PreviewStore(str(tmp_path), max_bytes=250)
+    old = store.put("old", b"a" * 100)
+    new = store.put("new", b"b" * 100)
+    _set_mtime(old, 1_000.0)
+    _set_mtime(new, 2_000.0)
+
+    # 履歴を選ぶだけ（有効/無効の判定）では古い方の時刻は変わらない
+    assert store.get("old", touch=False) == old
+    assert os.path.getmtime(old) == 1_000.0
+    assert store.get("missing", touch=False) is None
+
+    store.put("third", b"c" * 100)
+    assert not os.path.exists(old)
+    assert os.path.exists(new)
+
+
+def test_get_touches_for_playback(tmp_path):
+    store = PreviewStore(str(tmp_path), max_bytes=250)
+    old = store.put("old", b"a" * 100)
+    new = store.put("new", b"b" * 100)
+    _set_mtime(old, 1_000.0)
+    _set_mtime(new, 2_000.0)
+
+    # 再生したものは新しくなり、次に消されるのはもう一方
+    assert store.get("old") == old
+    store.put("third", b"c" * 100)
+    assert os.path.exists(old)
+    assert not os.path.exists(new)
@@ -0,0 +1,164 @@
+"""core.voice_design の一括生成（API の代わりに偽クライアントを使う）"""
+import base64
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import core.voice_design as voice_design
+from core.voice_design import VoicePrompt, design_batch, read_prompt_sheet
+
+SAMPLE = "あ" * voice_design.MIN_SAMPLE_TEXT
+
+
+class ApiError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class FakeTextToVoice:
+    """create_previews の偽物。同時実行数を数え、説明文に応じて 429 / 400 を返す"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = []
+        self.throttled = set()
+
+    def create_previews(self, voice_description, text, auto_generate_text, guidance_scale, seed):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.calls.append((voice_description, seed))
+            n = len(self.calls)
+        try:
+            time.sleep(0.02)
+            if voice_description == "壊れる":
+                raise ApiError(400)
+            if voice_description == "混雑" and seed not in self.throttled:
+                # 同じ seed の1回目だけ 429
+                with self.lock:
+                    self.throttled.add(seed)
+                raise ApiError(429)
+            audio = base64.b64encode(f"audio-{seed}".encode()).decode()
+            return SimpleNamespace(previews=[SimpleNamespace(audio_base_64=audio, generated_voice_id=f"gv{n}")])
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(voice_design, "RETRY_WAIT", 0)
+    return SimpleNamespace(text_to_voice=FakeTextToVoice())
+
+
+def test_design_batch(client, tmp_path):
+    prompts = [
+        VoicePrompt("ヒナ", "落ち着いた声", 2.0, SAMPLE, 4),
+        VoicePrompt("ホシノ", "混雑", 3.0, None, 3),
+        VoicePrompt("ア/ル", "壊れる", 2.0, None, 2),
+    ]
+    log_path = tmp_path / "log.jsonl"
+    messages = []
+
+    results = design_batch(client, prompts, str(tmp_path / "out"), concurrency=2,
+                           batch_name="b1", log=messages.append, log_path=str(log_path))
+
+    assert client.text_to_voice.peak <= 2
+    by_name = {r["char_name"]: r for r in results}
+    assert [len(by_name[n]["candidates"]) for n in ("ヒナ", "ホシノ", "ア/ル")] == [4, 3, 0]
+    # 429 は再試行して成功、400 は再試行せずエラー
+    assert sum(1 for desc, _ in client.text_to_voice.calls if desc == "混雑") == 6
+    assert sum(1 for desc, _ in client.text_to_voice.calls if desc == "壊れる") == 2
+    assert [e["index"] for e in by_name["ア/ル"]["errors"]] == [0, 1]
+
+    meta = json.loads((tmp_path / "out" / "ヒナ" / "candidates.json").read_text(encoding="utf-8"))
+    assert meta["batch"] == "b1"
+    assert meta["prompt"]["sample_text"] == SAMPLE
+    assert [c["index"] for c in meta["candidates"]] == [0, 1, 2, 3]
+    for c in meta["candidates"]:
+        assert c["path"] == f"{c['index'] + 1:02d}_{c['generated_voice_id']}.mp3"
+        audio = (tmp_path / "out" / "ヒナ" / c["path"]).read_bytes()
+        assert audio == f"audio-{c['seed']}".encode()
+    broken = json.loads((tmp_path / "out" / "ア_ル" / "candidates.json").read_text(encoding="utf-8"))
+    assert broken["candidates"] == [] and len(broken["errors"]) == 2
+
+    entries = [json.loads(line) for line in log_path.read_text(encoding="utf-8").splitlines()]
+    assert len(entries) == 7
+    assert all(e["type"] == "preview_design" and e["batch"] == "b1" for e in entries)
+    assert {e["char_name"] for e in entries} == {"ヒナ", "ホシノ"}
+    assert all(e["preview_path"].endswith(f"_{e['generated_voice_id']}.mp3") for e in entries)
+    assert sum("生成失敗" in m for m in messages) == 2
+
+
+def test_design_batch_many_rows_share_pool(client, tmp_path):
+    """行数が多くてもスレッドは concurrency 分だけ"""
+    prompts = [VoicePrompt(f"キャラ{i}", "声", count=1) for i in range(40)]
+    before = threading.active_count()
+    seen = []
+
+    def log(message):
+        seen.append(threading.active_count())
+
+    results = design_batch(client, prompts, str(tmp_path / "out"), concurrency=3,
+                           log=log, log_path=str(tmp_path / "log.jsonl"))
+
+    assert all(len(r["candidates"]) == 1 for r in results)
+    assert max(seen) - before <= 3
+    assert client.text_to_voice.peak <= 3
+
+
+def test_read_prompt_sheet(tmp_path):
+    sheet = tmp_path / "sheet.csv"
+    sheet.write_text(
+        "character,description,guidance,sample_text,count\n"
+        f"ヒナ,落ち着いた声,2.5,{SAMPLE},4\n"
+        "ホシノ,眠そうな声,,,\n"
+        ",,,,\n"
+        "アル,,,,\n"
+        "ムツキ,明るい声,abc,,\n"
+        "カヨコ,低い声,,短い,0\n"
+        "ハルカ,小さな声,,短い,2\n",
+        encoding="utf-8-sig")
+
+    prompts, errors = read_prompt_sheet(str(sheet))
+
+    assert prompts == [
+        VoicePrompt("ヒナ", "落ち着いた声", 2.5, SAMPLE, 4),
+        VoicePrompt("ホシノ", "眠そうな声", voice_design.DEFAULT_GUIDANCE, None, voice_design.DEFAULT_COUNT),
+        VoicePrompt("ハルカ", "小さな声", voice_design.DEFAULT_GUIDANCE, None, 2),
+    ]
+    assert len(errors) == 4
+    assert errors[0].startswith("5行目")
+    assert "ハルカ" in errors[3] and "自動生成" in errors[3]
+
+
+def test_read_prompt_sheet_missing_columns(tmp_path):
+    sheet = tmp_path / "sheet.csv"
+    sheet.write_text("name,prompt\nヒナ,声\n", encoding="utf-8")
+
+    assert read_prompt_sheet(str(sheet)) == ([], ["列がありません: character, description"])
+
+
+def test_generate_previews_reports_on_ready_failure_and_continues():
+    def request(seed):
+        audio = base64.b64encode(f"audio-{seed}".encode()).decode()
+        return SimpleNamespace(previews=[SimpleNamespace(audio_base_64=audio, generated_voice_id=f"gv{seed}")])
+
+    ready, errors = [], []
+
+    def on_ready(preview):
+        if preview.index == 1:
+            raise OSError("書き込み失敗")
+        ready.append(preview.index)
+
+    done = voice_design.generate_previews(request, 3, on_ready, lambda i, e: errors.append((i, str(e))))
+
+    assert sorted(ready) == [0, 2]
+    assert [p.index for p in done] == [0, 2]
+    assert errors == [(1, "書き込み失敗")]
@@ -0,0 +1,95 @@
+"""core.ymmp の差分更新"""
+import json
+
+import pytest
+
+from core.mp3 import silence_mp3
+from core.ymmp import VOICE_ITEM_TYPE, load_ymmp, save_ymmp, update_voices
+
+FPS = 60
+TEXT_ITEM_TYPE = "YukkuriMovieMaker.Project.Items.TextItem"
+
+
+def _voice(serial: int, frame: int, length: int, text: str) -> dict:
+    return {"$type": f"{VOICE_ITEM_TYPE}, YukkuriMovieMaker", "Frame": frame, "Length": length,
+            "Layer": 15, "Hatsuon": f"D:\\proj\\ボイス\\{serial}_ヒナ_{text}.mp3", "Serif": text}
+
+
+def _text(frame: int, length: int, text: str) -> dict:
+    return {"$type": f"{TEXT_ITEM_TYPE}, YukkuriMovieMaker", "Frame": frame, "Length": length,
+            "Layer": 5, "Text": text}
+
+
+@pytest.fixture
+def project(tmp_path):
+    """1秒のボイス3つ（間隔 18 フレーム = gap_seconds 0.3）+ 同じ長さのテロップ + 全体にかかるBGM"""
+    items = [{"$type": "YukkuriMovieMaker.Project.Items.AudioItem, YukkuriMovieMaker",
+              "Frame": 0, "Length": 500, "Layer": 1}]
+    for i, text in enumerate(["あ", "い", "う"]):
+        frame = i * (FPS + 18)
+        items += [_text(frame, FPS, text), _voice(i + 1, frame, FPS, text)]
+    path = tmp_path / "p.ymmp"
+    data = {"Characters": [], "Timelines": [{"VideoInfo": {"FPS": FPS}, "Items": items}]}
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8-sig")
+    return path
+
+
+def _mp3(tmp_path, name: str, ms: int) -> str:
+    path = tmp_path / name
+    path.write_bytes(silence_mp3(ms))
+    return str(path)
+
+
+def test_update_voices_ripples_following_items(project, tmp_path):
+    doc = load_ymmp(str(project))
+    doc.voice_by_serial[3]["Serif"] = "手直しした"
+    new = _mp3(tmp_path, "2_ヒナ_いいい.mp3", 2000)
+
+    deltas = update_voices(doc, {2: new}, {2: "いいい"})
+    save_ymmp(doc)
+
+    assert deltas == {2: FPS}
+    reloaded = json.loads(project.read_text(encoding="utf-8-sig"))
+    items = reloaded["Timelines"][0]["Items"]
+    bgm, t1, v1, t2, v2, t3, v3 = items
+    # 変えた行より前はそのまま
+    assert (v1["Frame"], v1["Length"], t1["Frame"], t1["Length"]) == (0, FPS, 0, FPS)
+    # 変えた行は伸び、終わりが揃っているテロップも伸びる
+    assert (v2["Frame"], v2["Length"]) == (78, 2 * FPS)
+    assert (t2["Frame"], t2["Length"]) == (78, 2 * FPS)
+    assert v2["Hatsuon"] == "D:\\proj\\ボイス\\2_ヒナ_いいい.mp3"
+    assert v2["Serif"] == "いいい"
+    # 後ろは差だけずれて、間隔は保たれる
+    assert v3["Frame"] == t3["Frame"] == 156 + FPS
+    assert v3["Frame"] - (v2["Frame"] + v2["Length"]) == 18
+    # 渡していない行の手直しは残る
+    assert v3["Serif"] == "手直しした"
+    # 変更点をまたぐアイテムは伸びる
+    assert bgm["Length"] == 500 + FPS
+
+
+def test_update_voices_shrink_and_multiple(project, tmp_path):
+    doc = load_ymmp(str(project))
+    files = {1: _mp3(tmp_path, "1_ヒナ_あ.mp3", 500), 3: _mp3(tmp_path, "3_ヒナ_う.mp3", 1500)}
+
+    assert update_voices(doc, files) == {1: -30, 3: 30}
+    assert [(v["Frame"], v["Length"]) for v in doc.voice_items] == [(0, 30), (48, FPS), (126, 90)]
+    assert doc.voice_by_serial[1]["Serif"] == "あ"
+
+
+def test_update_voices_unknown_serial_changes_nothing(project, tmp_path):
+    doc = load_ymmp(str(project))
+    before = json.dumps(doc.data)
+
+    with pytest.raises(ValueError):
+        update_voices(doc, {1: _mp3(tmp_path, "1_ヒナ_あ.mp3", 500), 9: _mp3(tmp_path, "9_ヒナ_x.mp3", 500)})
+    assert json.dumps(doc.data) == before
+
+
+def test_save_ymmp_is_picked_up_by_load_ymmp(project, tmp_path):
+    doc = load_ymmp(str(project))
+    update_voices(doc, {1: _mp3(tmp_path, "1_ヒナ_あ.mp3", 500)})
+    save_ymmp(doc)
+
+    assert load_ymmp(str(project)) is doc
+    assert not list(tmp_path.glob("*.tmp"))
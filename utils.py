@@ -4,12 +4,12 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from core.config import BASE_DIR, load_config, save_config
+from core.config import BASE_DIR, load_config, save_config, set_character_voices, update_config
 from core.client import get_client
 from core.csv_io import read_csv_rows, check_csv_alignment
 
 __all__ = [
-    'BASE_DIR', 'load_config', 'save_config',
+    'BASE_DIR', 'load_config', 'save_config', 'set_character_voices', 'update_config',
     'get_client',
     'read_csv_rows', 'check_csv_alignment',
 ]
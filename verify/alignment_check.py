@@ -0,0 +1,187 @@
+"""アライメント（文字単位タイムスタンプ）によるオフライン読み上げ検証
+
+config.json の "save_alignment": true で生成したMP3には <ファイル名>.alignment.json がある。
+音声認識APIに音声を送らず、このタイムスタンプだけで次を確認する。
+- カバレッジ: 台本の文字（句読点・記号を除く）のうち、発話時間が付いている割合
+- タイミング: 時刻の逆行、音声長との食い違い（途切れ・余分な音声）、長すぎる間、速すぎる読み上げ
+
+使い方:
+    python verify/alignment_check.py <voice_dir> [--csv <elevenlabs_csv>]
+
+    --csv: 台本と照合する（生成後に台本が変わった行も検出）
+"""
+import argparse
+import difflib
+import os
+import re
+import sys
+import unicodedata
+
+# プロジェクトルートをパスに追加（verify/ の1つ上）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.alignment import ALIGNMENT_SUFFIX, load_alignment
+from core.csv_io import read_csv_rows
+from core.mp3 import Mp3Error, read_layout_file
+
+# 発話時間が付いた文字の割合がこれ未満なら読み飛ばしの疑い
+MIN_COVERAGE = 0.9
+# 文字と文字の間がこれ以上空いたら警告（秒）
+MAX_PAUSE_SEC = 2.0
+# 最初の文字の前・最後の文字の後の音声がこれ以上なら警告（秒）
+MAX_EDGE_SEC = 2.0
+# 最後の文字の終了時刻が音声長をこれ以上超えたら途切れとみなす（秒）
+END_TOLERANCE_SEC = 0.15
+# 1秒あたりの文字数がこれを超えたら読み飛ばしの疑い
+MAX_CHARS_PER_SEC = 15.0
+
+
+def _is_spoken(c: str) -> bool:
+    """発話される文字か（空白・句読点・記号は除く）"""
+    return unicodedata.category(c)[0] not in "ZPSC"
+
+
+def _strip_tags(text: str) -> str:
+    """eleven_v3 の [whispers] 等のタグを除く"""
+    return re.sub(r"\[.*?\]", "", text)
+
+
+def check_alignment(expected_text: str, alignment: dict, duration_ms: int) -> list[str]:
+    """1ファイル分のアライメントを検査し、問題の説明リストを返す（問題なしなら空）"""
+    issues = []
+    chars = alignment["characters"]
+    starts = alignment["starts"]
+    ends = alignment["ends"]
+    if not (len(chars) == len(starts) == len(ends)):
+        return ["アライメントの長さが不正です"]
+
+    # タグ内の文字は読まれないので除外（アライメント側も同じ位置で除く）
+    in_tag = False
+    spoken = []     # (文字, 開始, 終了)
+    for c, s, e in zip(chars, starts, ends):
+        if c == "[":
+            in_tag = True
+        elif c == "]":
+            in_tag = False
+        elif not in_tag and _is_spoken(c):
+            spoken.append((c, s, e))
+
+    # カバレッジ: 台本の文字を順序どおりに対応付け、発話時間（終了 > 開始）があるものを数える
+    expected = [c for c in _strip_tags(expected_text) if _is_spoken(c)]
+    if expected:
+        aligned = [c for c, _, _ in spoken]
+        matcher = difflib.SequenceMatcher(None, expected, aligned, autojunk=False)
+        covered = 0
+        for block in matcher.get_matching_blocks():
+            for k in range(block.size):
+                _, s, e = spoken[block.b + k]
+                if e > s:
+                    covered += 1
+        coverage = covered / len(expected)
+        if coverage < MIN_COVERAGE:
+            issues.append(f"カバレッジ {coverage:.0%}（読み飛ばしの疑い）")
+
+    if not spoken:
+        return issues or ["発話された文字がありません"]
+
+    # タイミング
+    backwards = sum(1 for a, b in zip(starts, starts[1:]) if b < a)
+    if backwards or any(e < s for s, e in zip(starts, ends)):
+        issues.append("タイムスタンプが逆行しています")
+
+    duration = duration_ms / 1000
+    first_start = spoken[0][1]
+    last_end = max(e for _, _, e in spoken)
+    if last_end > duration + END_TOLERANCE_SEC:
+        issues.append(f"音声が途中で切れています（音声 {duration:.2f}秒 < 発話終了 {last_end:.2f}秒）")
+    elif duration - last_end > MAX_EDGE_SEC:
+        issues.append(f"最後の文字の後に {duration - last_end:.1f}秒の音声があります")
+    if first_start > MAX_EDGE_SEC:
+        issues.append(f"最初の文字まで {first_start:.1f}秒あります")
+
+    longest = max((b[1] - a[2] for a, b in zip(spoken, spoken[1:])), default=0.0)
+    if longest > MAX_PAUSE_SEC:
+        issues.append(f"途中に {longest:.1f}秒の間があります")
+
+    span = last_end - first_start
+    if span > 0 and len(spoken) / span > MAX_CHARS_PER_SEC:
+        issues.append(f"読み上げが速すぎます（{len(spoken) / span:.0f}字/秒）")
+    return issues
+
+
+def check_folder(voice_dir: str, script: dict[int, str] | None = None,
+                 files: list[str] | None = None) -> dict:
+    """ボイスフォルダのアライメントをまとめて検査する
+
+    Args:
+        script: {連番: 台本テキスト}。渡すと生成時のテキストと照合する
+        files: 対象のMP3ファイル名（省略時は全件）
+
+    Returns:
+        {"checked": 件数, "no_alignment": [ファイル名], "issues": [(ファイル名, [問題])]}
+    """
+    if files is None:
+        files = sorted(f for f in os.listdir(voice_dir) if f.endswith(".mp3"))
+    result = {"checked": 0, "no_alignment": [], "issues": []}
+    for fname in files:
+        path = os.path.join(voice_dir, fname)
+        data = load_alignment(path)
+        if data is None:
+            result["no_alignment"].append(fname)
+            continue
+        try:
+            duration_ms = read_layout_file(path).duration_ms
+        except (Mp3Error, OSError) as e:
+            result["issues"].append((fname, [f"MP3を読めません: {e}"]))
+            continue
+
+        text = data.get("text", "")
+        issues = []
+        head = fname.split("_", 1)[0]
+        if script is not None and head.isdigit():
+            current = script.get(int(head))
+            # 発音ルールで書き換えて送った場合は書き換え前の台本と比べる
+            if current is not None and current.strip() != data.get("script", text).strip():
+                issues.append("生成後に台本が変更されています")
+        issues += check_alignment(text, data, duration_ms)
+        result["checked"] += 1
+        if issues:
+            result["issues"].append((fname, issues))
+    return result
+
+
+def has_alignments(voice_dir: str) -> bool:
+    """フォルダにアライメントファイルが1つでもあるか"""
+    return any(f.endswith(ALIGNMENT_SUFFIX) for f in os.listdir(voice_dir))
+
+
+def print_alignment_report(result: dict, limit: int = 20):
+    """check_folder の結果を表示"""
+    print(f"  検査: {result['checked']}件（アライメントなし: {len(result['no_alignment'])}件）")
+    if not result["issues"]:
+        print("  ✓ アライメント検証OK")
+        return
+    print(f"  ⚠ {len(result['issues'])}件に問題:")
+    for fname, issues in result["issues"][:limit]:
+        print(f"    {fname}")
+        for issue in issues:
+            print(f"      - {issue}")
+    if len(result["issues"]) > limit:
+        print(f"    ...他 {len(result['issues']) - limit}件")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="アライメントによるオフライン読み上げ検証")
+    parser.add_argument("voice_dir", help="voice MP3 directory")
+    parser.add_argument("--csv", default=None, help="elevenlabs CSV path（台本と照合）")
+    args = parser.parse_args()
+
+    script = None
+    if args.csv:
+        script = {r["serial"]: r["text"] for r in read_csv_rows(args.csv)}
+    result = check_folder(args.voice_dir, script)
+    print_alignment_report(result)
+    if result["issues"]:
+        sys.exit(1)
@@ -0,0 +1,121 @@
+"""台本と文字起こし結果の一致度（文字誤り率 CER）
+
+比較前に両方を正規化する（NFKC・タグ/記号/空白の除去・カタカナ→ひらがな）。
+pykakasi がインストールされていれば漢字も読みのひらがなにそろえるので、
+音声認識が漢字とかなを書き分けても誤りとして数えない。
+
+編集距離はビット並列アルゴリズム（Myers / Hyyrö）で求める。短い方の文字列を
+ビット列にして長い方の1文字につき数回の整数演算で済むので、数千組でも1秒かからない。
+"""
+import difflib
+import functools
+import importlib.util
+import re
+import unicodedata
+from dataclasses import dataclass
+
+# pykakasi は辞書の読み込みが重いので、最初に正規化するときに初期化する
+HAS_KAKASI = importlib.util.find_spec("pykakasi") is not None
+
+_TAG_PATTERN = re.compile(r"\[.*?\]")
+# カタカナ → ひらがな（ァ〜ヶ を ぁ〜ゖ に）
+_KATA_TO_HIRA = {c: c - 0x60 for c in range(ord("ァ"), ord("ヶ") + 1)}
+
+
+@dataclass
+class SimilarityResult:
+    """1組の比較結果"""
+    expected: str       # 正規化後の台本
+    actual: str         # 正規化後の文字起こし
+    distance: int       # 編集距離
+    cer: float          # 文字誤り率（distance / 台本の文字数）
+    similarity: float   # 1 - CER（0 未満は 0）
+    diff: str           # 台本を基準にした差分表示（一致していれば空）
+
+
+@functools.lru_cache(maxsize=1)
+def _kakasi():
+    import pykakasi
+    return pykakasi.kakasi()
+
+
+@functools.lru_cache(maxsize=8192)
+def normalize_text(text: str) -> str:
+    """比較用に正規化する"""
+    s = unicodedata.normalize("NFKC", _TAG_PATTERN.sub("", text))
+    if HAS_KAKASI:
+        s = "".join(item["hira"] for item in _kakasi().convert(s))
+    s = s.translate(_KATA_TO_HIRA)
+    # 空白・句読点・記号・制御文字を除く（長音 ー は発音に関わるので残す）
+    return "".join(c for c in s if c == "ー" or unicodedata.category(c)[0] not in "ZPSC")
+
+
+def edit_distance(a: str, b: str) -> int:
+    """レーベンシュタイン距離（ビット並列。Hyyrö 2003 による Myers のアルゴリズム）"""
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if m == 0:
+        return len(a)
+
+    # 短い方の各文字が現れる位置のビットマスク
+    peq = {}
+    for i, c in enumerate(b):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for c in a:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return score
+
+
+def aligned_diff(expected: str, actual: str) -> str:
+    """差分を1行で表示する（置換 [台本→認識]、脱落 [-台本]、挿入 [+認識]）"""
+    parts = []
+    matcher = difflib.SequenceMatcher(None, expected, actual, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            parts.append(expected[i1:i2])
+        elif op == "replace":
+            parts.append(f"[{expected[i1:i2]}→{actual[j1:j2]}]")
+        elif op == "delete":
+            parts.append(f"[-{expected[i1:i2]}]")
+        else:
+            parts.append(f"[+{actual[j1:j2]}]")
+    return "".join(parts)
+
+
+def score_pair(expected: str, actual: str, with_diff: bool = True) -> SimilarityResult:
+    """台本と文字起こし1組の一致度"""
+    e = normalize_text(expected)
+    a = normalize_text(actual)
+    distance = edit_distance(e, a)
+    if e:
+        cer = distance / len(e)
+    else:
+        cer = 0.0 if not a else 1.0
+    diff = aligned_diff(e, a) if with_diff and distance else ""
+    return SimilarityResult(e, a, distance, cer, max(0.0, 1.0 - cer), diff)
+
+
+def score_pairs(pairs: list[tuple[str, str]], with_diff: bool = True) -> list[SimilarityResult]:
+    """(台本, 文字起こし) の組をまとめて採点する"""
+    return [score_pair(expected, actual, with_diff) for expected, actual in pairs]
+
+
+def similarity(expected: str, actual: str) -> float:
+    """一致度（1 - CER）。0.0〜1.0"""
+    return score_pair(expected, actual, with_diff=False).similarity
@@ -0,0 +1,246 @@
+"""話者の一貫性チェック（声の取り違え検出）
+
+config.json の voice_id を編集した後などに、別キャラの声で生成されたセリフを聞かずに見つける。
+各MP3の MFCC（メル周波数ケプストラム係数）を NumPy で求め、発話区間の平均と標準偏差を
+声の特徴ベクトルにする。キャラごとの中心（中央値）から大きく離れたファイルを外れ値として報告し、
+他キャラの中心の方が近ければそのキャラ名も示す。
+
+特徴ベクトルはボイスフォルダの _manifest.json（sections["speaker_embeddings"]）に
+ファイルのサイズ+更新時刻つきでキャッシュするので、再チェックでは変わったファイルだけ解析する。
+
+使い方:
+    python verify/speaker_check.py <voice_dir>
+"""
+import argparse
+import functools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# プロジェクトルートをパスに追加（verify/ の1つ上）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from core.audio_analysis import decode_audio
+from core.manifest import RunManifest, file_fingerprint
+
+SECTION = "speaker_embeddings"
+# 特徴量の計算方法を変えたら上げる（古いキャッシュを捨てる）
+EMBEDDING_VERSION = 1
+FRAME_MS = 25
+HOP_MS = 10
+N_MELS = 40
+N_MFCC = 20
+FMIN_HZ = 80
+FMAX_HZ = 7600
+# 最大エネルギーからこの dB 以内のフレームを発話とみなす
+VOICED_RANGE_DB = 40
+# 発話フレームがこれ未満のファイルは特徴量を作らない（短すぎて不安定）
+MIN_VOICED_FRAMES = 30
+# キャラごとのファイル数がこれ未満なら判定しない
+MIN_FILES_PER_CHARACTER = 5
+# 中心からの距離のロバストzスコア（中央値と MAD）がこれを超えたら外れ値
+OUTLIER_Z = 3.5
+
+
+@functools.lru_cache(maxsize=8)
+def _mel_filterbank(sample_rate: int, n_fft: int) -> "np.ndarray":
+    """三角形のメルフィルタバンク (N_MELS, n_fft//2+1)"""
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    fmax = min(FMAX_HZ, sample_rate / 2)
+    mels = np.linspace(hz_to_mel(FMIN_HZ), hz_to_mel(fmax), N_MELS + 2)
+    bins = np.fft.rfftfreq(n_fft, 1 / sample_rate)
+    edges = mel_to_hz(mels)
+    bank = np.zeros((N_MELS, len(bins)))
+    for m in range(N_MELS):
+        left, center, right = edges[m], edges[m + 1], edges[m + 2]
+        rising = (bins - left) / (center - left)
+        falling = (right - bins) / (right - center)
+        bank[m] = np.maximum(0, np.minimum(rising, falling))
+    return bank
+
+
+@functools.lru_cache(maxsize=2)
+def _dct_matrix() -> "np.ndarray":
+    """DCT-II（直交正規化）の行列 (N_MFCC, N_MELS)"""
+    n = np.arange(N_MELS)
+    k = np.arange(N_MFCC)[:, None]
+    dct = np.cos(np.pi * k * (2 * n + 1) / (2 * N_MELS)) * np.sqrt(2 / N_MELS)
+    dct[0] /= np.sqrt(2)
+    return dct
+
+
+def mfcc(samples: "np.ndarray", sample_rate: int) -> tuple["np.ndarray", "np.ndarray"]:
+    """MFCC (フレーム数, N_MFCC) と各フレームの対数エネルギー(dB) を返す"""
+    frame = sample_rate * FRAME_MS // 1000
+    hop = sample_rate * HOP_MS // 1000
+    if len(samples) < frame:
+        return np.zeros((0, N_MFCC)), np.zeros(0)
+    n_frames = 1 + (len(samples) - frame) // hop
+    # フレーム分割はコピーせずストライドで作る
+    frames = np.lib.stride_tricks.as_strided(
+        samples.astype(np.float64),
+        shape=(n_frames, frame),
+        strides=(hop * 8, 8),
+    ) * np.hamming(frame)
+    n_fft = 1 << (frame - 1).bit_length()
+    power = np.abs(np.fft.rfft(frames, n_fft)) ** 2 / n_fft
+    energy_db = 10 * np.log10(np.maximum(power.sum(axis=1), 1e-12))
+    mel = np.log(np.maximum(power @ _mel_filterbank(sample_rate, n_fft).T, 1e-10))
+    return mel @ _dct_matrix().T, energy_db
+
+
+def embed_samples(samples: "np.ndarray", sample_rate: int) -> list[float] | None:
+    """発話フレームの MFCC（c0 を除く）の平均と標準偏差をつなげた特徴ベクトル"""
+    coeffs, energy_db = mfcc(samples, sample_rate)
+    if not len(energy_db):
+        return None
+    voiced = coeffs[energy_db > energy_db.max() - VOICED_RANGE_DB, 1:]
+    if len(voiced) < MIN_VOICED_FRAMES:
+        return None
+    return [round(float(v), 4) for v in np.concatenate([voiced.mean(axis=0), voiced.std(axis=0)])]
+
+
+def embed_file(path: str) -> dict:
+    """MP3を1つ解析する（{"embedding": [...] or None} / デコード失敗時は {"error": ...}）"""
+    try:
+        samples, sample_rate = decode_audio(path)
+    except Exception as e:
+        return {"error": str(e)}
+    return {"embedding": embed_samples(samples, sample_rate)}
+
+
+def compute_embeddings(voice_dir: str, files: list[str] | None = None,
+                       workers: int | None = None) -> dict[str, list[float] | None]:
+    """ボイスフォルダのMP3の特徴ベクトル {ファイル名: ベクトル or None}
+
+    マニフェストのキャッシュが有効なファイルは読み直さない。未解析のファイルはプロセスプールで並列に解析する。
+    """
+    if not HAS_NUMPY:
+        raise ImportError("話者チェックには numpy が必要です（pip install numpy）")
+
+    all_mp3s = sorted(f for f in os.listdir(voice_dir) if f.endswith(".mp3"))
+    names = all_mp3s if files is None else [f for f in files if f in set(all_mp3s)]
+
+    manifest = RunManifest.load(voice_dir)
+    cache = manifest.section(SECTION)
+    results = {}
+    pending = []
+    for name in names:
+        fp = file_fingerprint(os.path.join(voice_dir, name))
+        cached = cache.get(name)
+        if cached and cached.get("fp") == fp and cached.get("version") == EMBEDDING_VERSION:
+            results[name] = cached["embedding"]
+        else:
+            pending.append((name, fp))
+
+    if pending:
+        paths = [os.path.join(voice_dir, name) for name, _ in pending]
+        if len(paths) <= 2 or workers == 1:
+            analyzed = [embed_file(p) for p in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                analyzed = list(pool.map(embed_file, paths, chunksize=4))
+        for (name, fp), result in zip(pending, analyzed):
+            if "error" in result:
+                continue
+            results[name] = result["embedding"]
+            cache[name] = {"fp": fp, "version": EMBEDDING_VERSION, "embedding": result["embedding"]}
+
+    if files is None:
+        for name in set(cache) - set(all_mp3s):
+            del cache[name]
+    if pending or files is None:
+        manifest.save()
+    return results
+
+
+def _character_of(fname: str) -> str:
+    parts = os.path.splitext(fname)[0].split("_", 2)
+    return parts[1] if len(parts) >= 2 else ""
+
+
+def find_outliers(embeddings: dict[str, list[float]]) -> list[tuple[str, str, float, str | None]]:
+    """キャラごとの中心から外れたファイルを (ファイル名, キャラ, zスコア, より近い他キャラ) で返す"""
+    names = [n for n, e in embeddings.items() if e is not None]
+    if len(names) < MIN_FILES_PER_CHARACTER:
+        return []
+    x = np.array([embeddings[n] for n in names])
+    # 次元ごとの尺度をそろえる
+    x = (x - x.mean(axis=0)) / np.maximum(x.std(axis=0), 1e-9)
+    chars = np.array([_character_of(n) for n in names])
+
+    centroids = {}
+    for c in set(chars):
+        members = x[chars == c]
+        if len(members) >= MIN_FILES_PER_CHARACTER:
+            centroids[c] = np.median(members, axis=0)
+    if not centroids:
+        return []
+    labels = list(centroids)
+    centers = np.array([centroids[c] for c in labels])
+    # 全ファイル × 全キャラ中心の距離
+    dists = np.linalg.norm(x[:, None, :] - centers[None, :, :], axis=2)
+
+    outliers = []
+    for ci, c in enumerate(labels):
+        idx = np.flatnonzero(chars == c)
+        own = dists[idx, ci]
+        median = np.median(own)
+        mad = np.median(np.abs(own - median)) * 1.4826
+        z = (own - median) / max(mad, 1e-9)
+        for k, score in zip(idx, z):
+            if score <= OUTLIER_Z:
+                continue
+            nearest = str(labels[int(np.argmin(dists[k]))])
+            outliers.append((names[k], str(c), float(score), nearest if nearest != c else None))
+    return sorted(outliers, key=lambda o: -o[2])
+
+
+def check_speakers(voice_dir, files=None, verbose=True):
+    """話者チェック: キャラの他のセリフと声が大きく違うファイルを検出
+
+    中心はフォルダ全体から求め、files 指定時はそのファイルだけ報告する。
+    """
+    embeddings = compute_embeddings(voice_dir)
+    outliers = find_outliers(embeddings)
+    if files is not None:
+        targets = set(files)
+        outliers = [o for o in outliers if o[0] in targets]
+    anomalies = [(fname.split('_')[0], fname, char, score, nearest)
+                 for fname, char, score, nearest in outliers]
+
+    if verbose:
+        counted = sum(1 for e in embeddings.values() if e is not None)
+        print(f"\n{'='*60}")
+        print(f"話者チェック（{counted}件, 外れ値 z>{OUTLIER_Z}）")
+        print(f"{'='*60}")
+        if anomalies:
+            for serial, fname, char, score, nearest in anomalies:
+                hint = f" → {nearest} の声に近い" if nearest else ""
+                print(f"  ★ #{serial} [{char}] z={score:.1f}{hint} | {fname[:50]}")
+            print(f"\n異常: {len(anomalies)}件")
+        else:
+            print("  異常なし ✓")
+    return anomalies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="話者の一貫性チェック")
+    parser.add_argument("voice_dir", help="voice MP3 directory")
+    args = parser.parse_args()
+
+    if check_speakers(args.voice_dir):
+        sys.exit(1)
@@ -2,13 +2,16 @@
 
 生成済みMP3の品質を検証する。
 1. 音声長チェック: 文字数に対して異常に長い音声を検出（全件・高速）
-2. 文字起こし検証: Google Speech APIで台本との一致を確認（オプション）
+   音量チェック: ラウドネスが他と大きく違う・クリップしている音声を検出
+   話者チェック: 同じキャラの他のセリフと声が大きく違う（別の voice_id で生成された）音声を検出
+2. アライメント検証: 文字単位タイムスタンプ（save_alignment で生成）で台本との一致を確認（オフライン）
+3. 文字起こし検証: アライメントのないファイルを Google Speech APIで台本と照合（オプション）
 
 使い方:
     python verify_voice.py <elevenlabs_csv> <voice_dir> [--sample N] [--duration-only]
 
     --sample N: 文字起こし検証をランダムN件のみ（省略時は全件）
-    --duration-only: 音声長チェックのみ実行（文字起こしスキップ）
+    --duration-only: 音声長・音量・話者チェックのみ実行（文字起こしスキップ）
 """
 
 import sys
@@ -25,12 +28,25 @@ except ImportError:
     print("ERROR: pip install pydub が必要です")
     sys.exit(1)
 
+# プロジェクトルートをパスに追加（verify/ の1つ上）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
 try:
     import speech_recognition as sr
     HAS_SR = True
 except ImportError:
     HAS_SR = False
 
+from verify.alignment_check import check_folder, has_alignments, print_alignment_report
+from verify.similarity import score_pairs, similarity
+
+# 音量チェック: フォルダ内の中央値からこれ以上ずれたら警告(dB)
+LEVEL_TOLERANCE_DB = 6.0
+# 音量チェック: ピークがこれ以上ならクリップの疑い(dBFS)
+CLIP_PEAK_DBFS = -0.1
+
 
 def clean_serif(text):
     """タグ・カッコを除去して比較用テキストを作る"""
@@ -57,15 +73,12 @@ def transcribe_mp3(recognizer, mp3_path, tmp_wav):
 
 
 def calc_similarity(expected, actual):
-    """文字単位の一致率"""
-    if not expected:
-        return 1.0 if not actual else 0.0
-    match_chars = sum(1 for c in expected if c in actual)
-    return match_chars / len(expected)
+    """一致率（1 - 文字誤り率）。かな/カナ・記号の違いは正規化して比較"""
+    return similarity(expected, actual)
 
 
-def check_durations(csv_path, voice_dir, verbose=True):
-    """音声長チェック: 文字数に対して異常に長いファイルを検出"""
+def check_durations(csv_path, voice_dir, verbose=True, files=None):
+    """音声長チェック: 文字数に対して異常に長いファイルを検出（files 指定時はそのファイル名のみ）"""
     with open(csv_path, 'r', encoding='utf-8-sig') as f:
         reader = csv.reader(f)
         next(reader)
@@ -75,16 +88,19 @@ def check_durations(csv_path, voice_dir, verbose=True):
             csv_rows[r[0]] = (r[1], clean, len(clean))
 
     mp3s = [f for f in os.listdir(voice_dir) if f.endswith('.mp3')]
+    if files is not None:
+        targets = set(files)
+        mp3s = [f for f in mp3s if f in targets]
     anomalies = []
 
+    from core.audio_analysis import analyze_files  # numpy/scipy はこのチェックで初めて読み込む
+    analysis = analyze_files(voice_dir, files=mp3s)
     for fname in mp3s:
         serial = fname.split('_')[0]
-        fpath = os.path.join(voice_dir, fname)
-        try:
-            a = AudioSegment.from_mp3(fpath)
-            dur = len(a) / 1000
-        except Exception:
+        info = analysis.get(fname, {})
+        if 'error' in info or 'duration_ms' not in info:
             continue
+        dur = info['duration_ms'] / 1000
 
         char, text, tlen = csv_rows.get(serial, ('?', '?', 0))
 
@@ -107,19 +123,57 @@ def check_durations(csv_path, voice_dir, verbose=True):
     return anomalies
 
 
+def check_levels(voice_dir, files=None, tolerance_db=LEVEL_TOLERANCE_DB, verbose=True):
+    """音量チェック: ラウドネスがフォルダの中央値から大きくずれた・クリップしているファイルを検出
+
+    中央値はフォルダ全体から求め、files 指定時はそのファイルだけ判定する。
+    """
+    from core.audio_analysis import analyze_files
+    analysis = analyze_files(voice_dir)
+    levels = {f: a for f, a in analysis.items()
+              if 'loudness_lufs' in a and a['content_end_ms'] > 0}
+    if not levels:
+        return []
+
+    louds = sorted(a['loudness_lufs'] for a in levels.values())
+    median = louds[len(louds) // 2]
+    targets = levels if files is None else {f: levels[f] for f in files if f in levels}
+
+    anomalies = []
+    for fname, a in sorted(targets.items()):
+        delta = a['loudness_lufs'] - median
+        clipped = a['peak_dbfs'] >= CLIP_PEAK_DBFS
+        if abs(delta) > tolerance_db or clipped:
+            anomalies.append((fname.split('_')[0], fname, a['loudness_lufs'], delta, a['peak_dbfs']))
+
+    if verbose:
+        unit = 'LUFS' if next(iter(levels.values()))['k_weighted'] else 'LUFS(近似)'
+        print(f"\n{'='*60}")
+        print(f"音量チェック（全{len(targets)}件, 中央値 {median:.1f}{unit}, 許容 ±{tolerance_db:.0f}dB）")
+        print(f"{'='*60}")
+        if anomalies:
+            for serial, fname, loud, delta, peak in anomalies:
+                clip = " クリップ" if peak >= CLIP_PEAK_DBFS else ""
+                print(f"  ★ #{serial} {loud:.1f}{unit} ({delta:+.1f}dB) ピーク{peak:.1f}dBFS{clip} | {fname[:50]}")
+            print(f"\n異常: {len(anomalies)}件")
+        else:
+            print("  異常なし ✓")
+
+    return anomalies
+
+
 def verify_voices(csv_path, voice_dir, sample_n=None, verbose=True, duration_only=False):
     """メイン検証処理"""
     # 1. 音声長チェック（常に全件実行）
     anomalies = check_durations(csv_path, voice_dir, verbose=verbose)
+    level_anomalies = check_levels(voice_dir, verbose=verbose)
+    from verify.speaker_check import check_speakers
+    speaker_anomalies = check_speakers(voice_dir, verbose=verbose)
 
     if duration_only:
-        return {'duration_anomalies': anomalies}
+        return {'duration_anomalies': anomalies, 'level_anomalies': level_anomalies,
+                'speaker_anomalies': speaker_anomalies}
 
-    if not HAS_SR:
-        print("WARNING: SpeechRecognition未インストール。文字起こし検証スキップ。")
-        return {'duration_anomalies': anomalies}
-
-    # 2. 文字起こし検証
     # CSV読み込み
     with open(csv_path, 'r', encoding='utf-8-sig') as f:
         reader = csv.reader(f)
@@ -129,6 +183,28 @@ def verify_voices(csv_path, voice_dir, sample_n=None, verbose=True, duration_onl
     # MP3一覧
     mp3s = [f for f in os.listdir(voice_dir) if f.endswith('.mp3')]
 
+    # 2. アライメント検証（タイムスタンプ付きで生成したファイルは音声認識を使わない）
+    alignment_result = None
+    if has_alignments(voice_dir):
+        script = {int(k): v[1] for k, v in csv_rows.items() if k.isdigit()}
+        alignment_result = check_folder(voice_dir, script, files=mp3s)
+        mp3s = alignment_result['no_alignment']
+        if verbose:
+            print(f"\n{'='*60}")
+            print("アライメント検証（オフライン）")
+            print(f"{'='*60}")
+            print_alignment_report(alignment_result)
+        if not mp3s:
+            return {'duration_anomalies': anomalies, 'level_anomalies': level_anomalies,
+                    'speaker_anomalies': speaker_anomalies, 'alignment': alignment_result}
+
+    if not HAS_SR:
+        print("WARNING: SpeechRecognition未インストール。文字起こし検証スキップ。")
+        return {'duration_anomalies': anomalies, 'level_anomalies': level_anomalies,
+                'speaker_anomalies': speaker_anomalies, 'alignment': alignment_result}
+
+    # 3. 文字起こし検証（アライメントのないファイルのみ）
+
     # テスト対象（無音・短すぎるセリフを除外）
     candidates = []
     for mp3 in mp3s:
@@ -160,21 +236,31 @@ def verify_voices(csv_path, voice_dir, sample_n=None, verbose=True, duration_onl
         print(f"  音声: {voice_dir}")
         print()
 
+    # 文字起こし（API待ちが大半）→ まとめて採点
+    transcripts = []
     for i, (mp3, serial, csv_char, csv_serif) in enumerate(
             sorted(targets, key=lambda x: int(x[1]))):
         filepath = os.path.join(voice_dir, mp3)
-        clean = clean_serif(csv_serif)
-
         transcript = transcribe_mp3(recognizer, filepath, tmp_wav)
 
         if transcript.startswith("(API_ERROR"):
             results['api_error'] += 1
             if verbose:
                 print(f"  #{serial} [{csv_char}] API_ERROR")
-            continue
+        else:
+            transcripts.append((serial, csv_char, clean_serif(csv_serif), transcript))
+
+        # Progress
+        if verbose and (i + 1) % 100 == 0:
+            print(f"  ... {i+1}/{len(targets)} 完了")
 
-        ratio = calc_similarity(clean, transcript)
+    # Cleanup
+    if os.path.exists(tmp_wav):
+        os.remove(tmp_wav)
 
+    scores = score_pairs([(clean, transcript) for _, _, clean, transcript in transcripts])
+    for i, ((serial, csv_char, clean, transcript), score) in enumerate(zip(transcripts, scores)):
+        ratio = score.similarity
         if ratio >= 0.5:
             mark = "○"
             results['ok'] += 1
@@ -184,18 +270,10 @@ def verify_voices(csv_path, voice_dir, sample_n=None, verbose=True, duration_onl
         else:
             mark = "✗"
             results['fail'] += 1
-            failures.append((serial, csv_char, clean, transcript, ratio))
+            failures.append((serial, csv_char, clean, transcript, ratio, score.diff))
 
         if verbose and (mark != "○" or (i + 1) % 50 == 0):
-            print(f"  #{serial} [{csv_char}] {mark} ({ratio:.0%}) 台本:{clean[:30]} 認識:{transcript[:30]}")
-
-        # Progress
-        if verbose and (i + 1) % 100 == 0:
-            print(f"  ... {i+1}/{len(targets)} 完了")
-
-    # Cleanup
-    if os.path.exists(tmp_wav):
-        os.remove(tmp_wav)
+            print(f"  #{serial} [{csv_char}] {mark} ({ratio:.0%}) 差分:{score.diff[:60] or '-'}")
 
     # Summary
     total = results['ok'] + results['warn'] + results['fail']
@@ -206,11 +284,14 @@ def verify_voices(csv_path, voice_dir, sample_n=None, verbose=True, duration_onl
 
         if failures:
             print(f"\n✗ 不一致リスト:")
-            for serial, char, expected, actual, ratio in failures:
-                print(f"  #{serial} [{char}] ({ratio:.0%})")
+            for serial, char, expected, actual, ratio, diff in failures:
+                print(f"  #{serial} [{char}] (一致率{ratio:.0%})")
                 print(f"    台本: {expected[:50]}")
                 print(f"    認識: {actual[:50]}")
+                print(f"    差分: {diff[:80]}")
 
+    results['speaker_anomalies'] = speaker_anomalies
+    results['alignment'] = alignment_result
     return results
 
 
@@ -219,7 +300,7 @@ if __name__ == "__main__":
     parser.add_argument("csv", help="elevenlabs CSV path")
     parser.add_argument("voice_dir", help="voice MP3 directory")
     parser.add_argument("--sample", type=int, default=None, help="文字起こし検証をランダムN件のみ")
-    parser.add_argument("--duration-only", action="store_true", help="音声長チェックのみ（文字起こしスキップ）")
+    parser.add_argument("--duration-only", action="store_true", help="音声長・音量・話者チェックのみ（文字起こしスキップ）")
     args = parser.parse_args()
 
     verify_voices(args.csv, args.voice_dir, sample_n=args.sample, duration_only=args.duration_only)
@@ -17,6 +17,13 @@ import tempfile
 
 import speech_recognition as sr
 
+# プロジェクトルートをパスに追加（verify/ の1つ上）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from verify.similarity import score_pair
+
 FFMPEG_PATH = "D:/YukkuriMovieMaker4/user/resources/ffmpeg/ffmpeg.exe"
 
 
@@ -89,7 +96,7 @@ def main():
     print(f"チェック対象: {len(mp3_files)} ファイル\n")
 
     if args.csv:
-        print("ファイル名,キャラ,期待テキスト,文字起こし結果")
+        print("ファイル名,キャラ,期待テキスト,文字起こし結果,一致率")
 
     for i, filename in enumerate(mp3_files):
         mp3_path = os.path.join(folder, filename)
@@ -102,14 +109,17 @@ def main():
         finally:
             os.unlink(wav_path)
 
+        score = score_pair(expected, result)
         if args.csv:
             # CSV出力
             safe = lambda s: f'"{s}"' if "," in s else s
-            print(f"{safe(filename)},{character},{safe(expected)},{safe(result)}")
+            print(f"{safe(filename)},{character},{safe(expected)},{safe(result)},{score.similarity:.2f}")
         else:
-            print(f"[{i+1:03d}/{len(mp3_files)}] {character}")
+            print(f"[{i+1:03d}/{len(mp3_files)}] {character}  一致率 {score.similarity:.0%}")
             print(f"  期待: {expected}")
             print(f"  結果: {result}")
+            if score.diff:
+                print(f"  差分: {score.diff}")
             print()
 
 
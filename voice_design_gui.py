@@ -3,11 +3,8 @@
 ElevenLabs ボイスデザイン & ボイスリミックスツール - GUI版
 """
 
-import json
 import os
-import random
 import sys
-import tempfile
 import threading
 import tkinter as tk
 from datetime import datetime
@@ -21,18 +18,16 @@ os.chdir(BASE_DIR)
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
-from utils import load_config, save_config, get_client as get_elevenlabs_client
+from utils import load_config, set_character_voices, get_client as get_elevenlabs_client
+from core.preview_store import get_preview_store
+from core.voice_history import PAGE_SIZE, VoiceHistory
+from core.voice_design import append_voice_log, generate_previews
 
 VOICE_LOG_PATH = os.path.join(BASE_DIR, "voice_design_log.jsonl")
+# 以前のバージョンがプレビューを保存していた場所（履歴タブの再生で参照するだけ）
 PREVIEW_DIR = os.path.join(BASE_DIR, "output", "previews")
-os.makedirs(PREVIEW_DIR, exist_ok=True)
-
-
-def append_voice_log(entry: dict):
-    """ボイスデザイン/リミックスの操作ログをJSONLファイルに追記"""
-    entry["timestamp"] = datetime.now().isoformat()
-    with open(VOICE_LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+# 履歴タブで保存済みボイスを試聴するときのテキスト
+HISTORY_SAMPLE_TEXT = "こんにちは先生！今日はいい天気ですね！"
 
 
 def make_scrollable_frame(parent) -> tuple[tk.Canvas, ttk.Frame]:
@@ -61,7 +56,7 @@ def make_scrollable_frame(parent) -> tuple[tk.Canvas, ttk.Frame]:
 class VoiceDesignTab:
     def __init__(self, notebook, log_func):
         self.log = log_func
-        self.previews: list[dict] = []
+        self.previews: list[dict | None] = []
         self.selected_idx: int | None = None
 
         frame = ttk.Frame(notebook)
@@ -175,7 +170,7 @@ class VoiceDesignTab:
             self.preview_rows[i]['label'].config(text="生成中...")
             self.preview_rows[i]['play'].config(state=tk.DISABLED)
             self.preview_rows[i]['select'].config(state=tk.DISABLED)
-        self.previews.clear()
+        self.previews = [None] * gen_count
         self.selected_idx = None
         self.selected_label.config(text="選択中: なし")
         self.save_btn.config(state=tk.DISABLED)
@@ -183,7 +178,6 @@ class VoiceDesignTab:
 
     def _generate_thread(self, desc: str, gen_count: int):
         try:
-            import base64
             client = get_elevenlabs_client()
             sample = self.sample_text.get('1.0', tk.END).strip() or None
             if sample and len(sample) < 100:
@@ -191,45 +185,30 @@ class VoiceDesignTab:
                 sample = None
             auto_gen = sample is None
 
-            # 6種: 各回で説明文にユニークIDを付けて1つずつ取る（確実に全部違う声）
-            self.log(f"プレビュー生成中...（{gen_count}種 / API {gen_count}回）")
+            # 候補ごとに別の seed で同時にリクエストする（確実に全部違う声）
+            self.log(f"プレビュー生成中...（{gen_count}種 / API {gen_count}回を並列）")
             self.log(f"説明: {desc[:60]}{'...' if len(desc)>60 else ''}")
 
             guidance = self.guidance_var.get()
-            all_previews = []
-            for call_idx in range(gen_count):
-                if call_idx > 0:
-                    self.log(f"生成中...（{call_idx+1}/{gen_count}）")
-                # 毎回異なるseedで確実に違う声を生成
-                seed = random.randint(0, 2147483647)
-                resp = client.text_to_voice.create_previews(
+            toplevel = self.preview_rows[0]['label'].winfo_toplevel()
+
+            def request(seed):
+                return client.text_to_voice.create_previews(
                     voice_description=desc,
                     text=sample if not auto_gen else None,
                     auto_generate_text=auto_gen,
                     guidance_scale=guidance,
                     seed=seed,
                 )
-                previews_data = resp.previews if hasattr(resp, 'previews') else [resp]
-                if previews_data:
-                    all_previews.append(previews_data[0])
-
-            self.previews.clear()
-            for i, preview in enumerate(all_previews[:gen_count]):
-                audio_bytes = b""
-                if hasattr(preview, 'audio_base_64') and preview.audio_base_64:
-                    try:
-                        audio_bytes = base64.b64decode(preview.audio_base_64)
-                    except Exception as e:
-                        self.log(f"  base64デコード失敗: {e}")
-
-                vid = getattr(preview, 'generated_voice_id', f'preview_{i}')
-                preview_path = os.path.join(PREVIEW_DIR, f"{vid}.mp3")
-                with open(preview_path, 'wb') as pf:
-                    pf.write(audio_bytes)
-
-                self.previews.append({'generated_voice_id': vid,
-                                      'audio_bytes': audio_bytes,
-                                      'temp_path': preview_path})
+
+            def on_ready(preview):
+                # ワーカースレッドから届いた順に呼ばれる（届いた候補から再生できる）
+                i, vid = preview.index, preview.generated_voice_id
+                preview_path = get_preview_store().put(vid, preview.audio_bytes)
+
+                self.previews[i] = {'generated_voice_id': vid,
+                                    'audio_bytes': preview.audio_bytes,
+                                    'path': preview_path}
 
                 # プレビュー候補をログに記録
                 append_voice_log({
@@ -242,16 +221,22 @@ class VoiceDesignTab:
                     "preview_index": i,
                     "preview_count": gen_count,
                     "timestamp": datetime.now().isoformat(),
-                })
+                }, VOICE_LOG_PATH)
 
                 def update_row(idx=i, voice_id=vid):
                     self.preview_rows[idx]['label'].config(text=f"#{idx+1} {voice_id[:24]}...")
                     self.preview_rows[idx]['play'].config(state=tk.NORMAL)
                     self.preview_rows[idx]['select'].config(state=tk.NORMAL)
-                self.preview_rows[i]['label'].winfo_toplevel().after(0, update_row)
+                toplevel.after(0, update_row)
                 self.log(f"  #{i+1} 生成完了: {vid[:24]}...")
 
-            self.log(f"{len(self.previews)}件のプレビューを生成しました")
+            def on_error(i, e):
+                self.log(f"  #{i+1} 生成失敗: {e}")
+                toplevel.after(0, lambda idx=i: self.preview_rows[idx]['label'].config(
+                    text=f"#{idx+1} 生成失敗"))
+
+            done = generate_previews(request, gen_count, on_ready, on_error, fallback_prefix='preview')
+            self.log(f"{len(done)}件のプレビューを生成しました")
         except Exception as e:
             self.log(f"エラー: {e}")
             messagebox.showerror("エラー", str(e))
@@ -260,16 +245,17 @@ class VoiceDesignTab:
                 0, lambda: self.preview_btn.config(state=tk.NORMAL))
 
     def play_preview(self, idx: int):
-        if idx >= len(self.previews):
-            return
-        path = self.previews[idx]['temp_path']
-        if not os.path.exists(path):
-            messagebox.showerror("エラー", "音声ファイルが見つかりません")
+        if idx >= len(self.previews) or self.previews[idx] is None:
             return
+        preview = self.previews[idx]
+        path = get_preview_store().get(preview['generated_voice_id'])
+        if path is None:
+            # 容量上限で消えていたら手元の音声から置き直す
+            path = get_preview_store().put(preview['generated_voice_id'], preview['audio_bytes'])
         os.startfile(path)
 
     def select_preview(self, idx: int):
-        if idx >= len(self.previews):
+        if idx >= len(self.previews) or self.previews[idx] is None:
             return
         self.selected_idx = idx
         vid = self.previews[idx]['generated_voice_id']
@@ -311,6 +297,8 @@ class VoiceDesignTab:
             )
             voice_id = voice.voice_id
             self.log(f"保存完了: voice_id = {voice_id}")
+            # 履歴タブから API を呼ばずに試聴できるよう、候補の音声を voice_id でも引けるようにする
+            get_preview_store().alias(generated_voice_id, voice_id)
             # 旧ボイスをElevenLabsから削除
             if old_voice_id and old_voice_id != voice_id:
                 try:
@@ -318,9 +306,7 @@ class VoiceDesignTab:
                     self.log(f"旧ボイス削除: {old_voice_id}")
                 except Exception as del_e:
                     self.log(f"旧ボイス削除失敗（無視）: {del_e}")
-            config = load_config()
-            config['character_voices'][char_name] = voice_id
-            save_config(config)
+            set_character_voices({char_name: voice_id})
             self.log(f'config.json に登録: "{char_name}" → {voice_id}')
             append_voice_log({
                 "type": "design",
@@ -330,7 +316,7 @@ class VoiceDesignTab:
                 "prompt": desc,
                 "guidance_scale": self.guidance_var.get(),
                 "old_voice_id_deleted": old_voice_id,
-            })
+            }, VOICE_LOG_PATH)
             messagebox.showinfo("登録完了", f'"{char_name}" を登録しました\n\nvoice_id: {voice_id}')
             self.char_name_var.set('')
         except Exception as e:
@@ -353,7 +339,7 @@ class VoiceRemixTab:
     """
     def __init__(self, notebook, log_func):
         self.log = log_func
-        self.previews: list[dict] = []
+        self.previews: list[dict | None] = []
         self.selected_idx: int | None = None
 
         frame = ttk.Frame(notebook)
@@ -542,7 +528,7 @@ class VoiceRemixTab:
             self.preview_rows[i]['label'].config(text="生成中...")
             self.preview_rows[i]['play'].config(state=tk.DISABLED)
             self.preview_rows[i]['select'].config(state=tk.DISABLED)
-        self.previews.clear()
+        self.previews = [None] * gen_count
         self.selected_idx = None
         self.selected_label.config(text="選択中: なし")
         self.save_btn.config(state=tk.DISABLED)
@@ -551,7 +537,6 @@ class VoiceRemixTab:
 
     def _remix_thread(self, voice_id: str, desc: str, gen_count: int):
         try:
-            import base64
             client = get_elevenlabs_client()
             sample = self.sample_text.get('1.0', tk.END).strip() or None
             if sample and len(sample) < 100:
@@ -559,18 +544,17 @@ class VoiceRemixTab:
                 sample = None
             auto_gen = sample is None
 
-            # 各回で説明文にユニークIDを付けて1つずつ取る（確実に全部違う声）
-            self.log(f"リミックス生成中...（{gen_count}種 / API {gen_count}回）")
+            # 候補ごとに別の seed で同時にリクエストする（確実に全部違う声）
+            self.log(f"リミックス生成中...（{gen_count}種 / API {gen_count}回を並列）")
             self.log(f"ベース: {self.voice_var.get()} / 説明: {desc[:50]}...")
 
             guidance = self.guidance_var.get()
             prompt_strength = self.prompt_strength_var.get()
-            all_previews = []
-            for call_idx in range(gen_count):
-                if call_idx > 0:
-                    self.log(f"生成中...（{call_idx+1}/{gen_count}）")
-                seed = random.randint(0, 2147483647)
-                resp = client.text_to_voice.remix(
+            base_voice = self.voice_var.get()
+            toplevel = self.preview_rows[0]['label'].winfo_toplevel()
+
+            def request(seed):
+                return client.text_to_voice.remix(
                     voice_id=voice_id,
                     voice_description=desc,
                     text=sample if not auto_gen else None,
@@ -579,27 +563,15 @@ class VoiceRemixTab:
                     prompt_strength=prompt_strength,
                     seed=seed,
                 )
-                previews_data = resp.previews if hasattr(resp, 'previews') else [resp]
-                if previews_data:
-                    all_previews.append(previews_data[0])
-
-            self.previews.clear()
-            for i, preview in enumerate(all_previews[:gen_count]):
-                audio_bytes = b""
-                if hasattr(preview, 'audio_base_64') and preview.audio_base_64:
-                    try:
-                        audio_bytes = base64.b64decode(preview.audio_base_64)
-                    except Exception as e:
-                        self.log(f"  base64デコード失敗: {e}")
-
-                vid = getattr(preview, 'generated_voice_id', f'remix_{i}')
-                preview_path = os.path.join(PREVIEW_DIR, f"{vid}.mp3")
-                with open(preview_path, 'wb') as pf:
-                    pf.write(audio_bytes)
-
-                self.previews.append({'generated_voice_id': vid,
-                                      'audio_bytes': audio_bytes,
-                                      'temp_path': preview_path})
+
+            def on_ready(preview):
+                # ワーカースレッドから届いた順に呼ばれる（届いた候補から再生できる）
+                i, vid = preview.index, preview.generated_voice_id
+                preview_path = get_preview_store().put(vid, preview.audio_bytes)
+
+                self.previews[i] = {'generated_voice_id': vid,
+                                    'audio_bytes': preview.audio_bytes,
+                                    'path': preview_path}
 
                 # プレビュー候補をログに記録
                 append_voice_log({
@@ -607,7 +579,7 @@ class VoiceRemixTab:
                     "char_name": "",
                     "voice_id": vid,
                     "generated_voice_id": vid,
-                    "base_voice": self.voice_var.get(),
+                    "base_voice": base_voice,
                     "base_voice_id": voice_id,
                     "prompt": desc,
                     "guidance_scale": guidance,
@@ -615,16 +587,22 @@ class VoiceRemixTab:
                     "preview_index": i,
                     "preview_count": gen_count,
                     "timestamp": datetime.now().isoformat(),
-                })
+                }, VOICE_LOG_PATH)
 
                 def update_row(idx=i, voice_id=vid):
                     self.preview_rows[idx]['label'].config(text=f"#{idx+1} {voice_id[:24]}...")
                     self.preview_rows[idx]['play'].config(state=tk.NORMAL)
                     self.preview_rows[idx]['select'].config(state=tk.NORMAL)
-                self.preview_rows[i]['label'].winfo_toplevel().after(0, update_row)
+                toplevel.after(0, update_row)
                 self.log(f"  #{i+1} 生成完了: {vid[:24]}...")
 
-            self.log(f"{len(self.previews)}件のリミックスを生成しました")
+            def on_error(i, e):
+                self.log(f"  #{i+1} 生成失敗: {e}")
+                toplevel.after(0, lambda idx=i: self.preview_rows[idx]['label'].config(
+                    text=f"#{idx+1} 生成失敗"))
+
+            done = generate_previews(request, gen_count, on_ready, on_error, fallback_prefix='remix')
+            self.log(f"{len(done)}件のリミックスを生成しました")
         except Exception as e:
             self.log(f"エラー: {e}")
             messagebox.showerror("エラー", str(e))
@@ -633,16 +611,17 @@ class VoiceRemixTab:
                 0, lambda: self.remix_btn.config(state=tk.NORMAL))
 
     def play_preview(self, idx: int):
-        if idx >= len(self.previews):
-            return
-        path = self.previews[idx]['temp_path']
-        if not os.path.exists(path):
-            messagebox.showerror("エラー", "音声ファイルが見つかりません")
+        if idx >= len(self.previews) or self.previews[idx] is None:
             return
+        preview = self.previews[idx]
+        path = get_preview_store().get(preview['generated_voice_id'])
+        if path is None:
+            # 容量上限で消えていたら手元の音声から置き直す
+            path = get_preview_store().put(preview['generated_voice_id'], preview['audio_bytes'])
         os.startfile(path)
 
     def select_preview(self, idx: int):
-        if idx >= len(self.previews):
+        if idx >= len(self.previews) or self.previews[idx] is None:
             return
         self.selected_idx = idx
         vid = self.previews[idx]['generated_voice_id']
@@ -684,6 +663,8 @@ class VoiceRemixTab:
             )
             voice_id = voice.voice_id
             self.log(f"保存完了: voice_id = {voice_id}")
+            # 履歴タブから API を呼ばずに試聴できるよう、候補の音声を voice_id でも引けるようにする
+            get_preview_store().alias(generated_voice_id, voice_id)
             # 旧ボイスをElevenLabsから削除
             if old_voice_id and old_voice_id != voice_id:
                 try:
@@ -691,9 +672,7 @@ class VoiceRemixTab:
                     self.log(f"旧ボイス削除: {old_voice_id}")
                 except Exception as del_e:
                     self.log(f"旧ボイス削除失敗（無視）: {del_e}")
-            config = load_config()
-            config['character_voices'][char_name] = voice_id
-            save_config(config)
+            set_character_voices({char_name: voice_id})
             self.log(f'config.json に登録: "{char_name}" → {voice_id}')
             append_voice_log({
                 "type": "remix",
@@ -706,7 +685,7 @@ class VoiceRemixTab:
                 "guidance_scale": self.guidance_var.get(),
                 "prompt_strength": self.prompt_strength_var.get(),
                 "old_voice_id_deleted": old_voice_id,
-            })
+            }, VOICE_LOG_PATH)
             messagebox.showinfo("登録完了", f'"{char_name}" を登録しました\n\nvoice_id: {voice_id}')
             self.char_name_var.set('')
         except Exception as e:
@@ -723,15 +702,24 @@ class VoiceRemixTab:
 # ══════════════════════════════════════════════════════════════════════════════
 
 class VoiceHistoryTab:
-    MAX_ENTRIES = 100
+    # 種別フィルタ → 対象の type
+    TYPE_FILTERS = {
+        "すべて": None,
+        "保存済み": ["design", "remix"],
+        "候補": ["preview_design", "preview_remix"],
+    }
 
     def __init__(self, notebook: ttk.Notebook, log_func, design_tab: VoiceDesignTab, remix_tab: VoiceRemixTab):
         self.log = log_func
         self.notebook = notebook
         self.design_tab = design_tab
         self.remix_tab = remix_tab
-        self.entries: list[dict] = []
+        self.entries: list[dict] = []      # 表示中のページ
         self.selected_entry: dict | None = None
+        self.page = 0
+        self.total = 0
+        self._search_job = None
+        self.history = VoiceHistory(VOICE_LOG_PATH)
 
         frame = ttk.Frame(notebook)
         notebook.add(frame, text="履歴")
@@ -739,12 +727,28 @@ class VoiceHistoryTab:
         self._load_history()
 
     def _build(self, parent: ttk.Frame):
-        # 上部: 更新ボタン + 件数
+        # 上部: 更新ボタン + 検索 + 種別 + ページ送り + 件数
         top = ttk.Frame(parent)
         top.pack(fill=tk.X, padx=10, pady=(10, 5))
         ttk.Button(top, text="更新", command=self._load_history).pack(side=tk.LEFT)
+        ttk.Label(top, text="検索:").pack(side=tk.LEFT, padx=(10, 2))
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(top, textvariable=self.search_var, width=24)
+        search_entry.pack(side=tk.LEFT)
+        search_entry.bind("<KeyRelease>", self._on_search)
+        self.type_var = tk.StringVar(value="すべて")
+        type_combo = ttk.Combobox(top, textvariable=self.type_var, values=list(self.TYPE_FILTERS),
+                                  state="readonly", width=8)
+        type_combo.pack(side=tk.LEFT, padx=(6, 0))
+        type_combo.bind("<<ComboboxSelected>>", lambda e: self._show_page(0))
+        self.next_btn = ttk.Button(top, text="▶", width=3, command=lambda: self._show_page(self.page + 1))
+        self.next_btn.pack(side=tk.RIGHT)
+        self.page_label = ttk.Label(top, text="")
+        self.page_label.pack(side=tk.RIGHT, padx=4)
+        self.prev_btn = ttk.Button(top, text="◀", width=3, command=lambda: self._show_page(self.page - 1))
+        self.prev_btn.pack(side=tk.RIGHT)
         self.count_label = ttk.Label(top, text="")
-        self.count_label.pack(side=tk.LEFT, padx=10)
+        self.count_label.pack(side=tk.RIGHT, padx=10)
 
         # メイン: 左=リスト、右=詳細
         paned = tk.PanedWindow(parent, orient=tk.HORIZONTAL, sashrelief=tk.RAISED, sashwidth=4)
@@ -804,40 +808,47 @@ class VoiceHistoryTab:
         self.reuse_btn.pack(side=tk.LEFT)
 
     def _load_history(self):
-        self.entries.clear()
-        self.tree.delete(*self.tree.get_children())
-        if not os.path.exists(VOICE_LOG_PATH):
-            self.count_label.config(text="0件")
-            return
+        """ログの追記分を索引に取り込んで、先頭ページを表示する"""
         try:
-            with open(VOICE_LOG_PATH, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        self.entries.append(json.loads(line))
-                    except json.JSONDecodeError:
-                        continue
-        except Exception:
+            added = self.history.ingest()
+        except Exception as e:
             self.count_label.config(text="読み込みエラー")
+            self.log(f"履歴の読み込みエラー: {e}")
             return
+        if added:
+            self.log(f"履歴: {added}件を取り込みました")
+        self._show_page(0)
+
+    def _on_search(self, event=None):
+        # 入力が止まってから検索する
+        if self._search_job is not None:
+            self.tree.after_cancel(self._search_job)
+        self._search_job = self.tree.after(200, lambda: self._show_page(0))
+
+    def _show_page(self, page: int):
+        self._search_job = None
+        types = self.TYPE_FILTERS.get(self.type_var.get())
+        offset = max(0, page) * PAGE_SIZE
+        self.entries, self.total = self.history.query(
+            self.search_var.get().strip(), types, limit=PAGE_SIZE, offset=offset)
+        self.page = max(0, page)
+        self.selected_entry = None
+        self.tree.delete(*self.tree.get_children())
 
-        # 新しい順
-        self.entries.reverse()
-        if len(self.entries) > self.MAX_ENTRIES:
-            self.entries = self.entries[:self.MAX_ENTRIES]
-
+        type_map = {"design": "デザイン", "remix": "リミックス",
+                    "preview_design": "候補(デザイン)", "preview_remix": "候補(リミックス)"}
         for entry in self.entries:
             ts = entry.get("timestamp", "")[:16].replace("T", " ")
-            type_map = {"design": "デザイン", "remix": "リミックス",
-                        "preview_design": "候補(デザイン)", "preview_remix": "候補(リミックス)"}
             etype = type_map.get(entry.get("type", ""), entry.get("type", ""))
             name = entry.get("char_name", "")
             prompt = entry.get("prompt", "")[:50]
             self.tree.insert("", tk.END, values=(ts, etype, name, prompt))
 
-        self.count_label.config(text=f"{len(self.entries)}件")
+        pages = max(1, -(-self.total // PAGE_SIZE))
+        self.count_label.config(text=f"{self.total}件")
+        self.page_label.config(text=f"{self.page + 1}/{pages}")
+        self.prev_btn.config(state=tk.NORMAL if self.page > 0 else tk.DISABLED)
+        self.next_btn.config(state=tk.NORMAL if self.page + 1 < pages else tk.DISABLED)
 
     def _on_select(self, event):
         sel = self.tree.selection()
@@ -865,11 +876,30 @@ class VoiceHistoryTab:
         self.prompt_text.config(state=tk.DISABLED)
 
         # ローカルにプレビュー音声があるか、保存済みボイスなら再生可能
-        local_exists = os.path.exists(os.path.join(PREVIEW_DIR, f"{entry.get('voice_id', '')}.mp3"))
+        local_exists = self._local_preview_path(entry, touch=False) is not None
         is_saved = entry.get("type") in ("design", "remix")
         self.play_btn.config(state=tk.NORMAL if (local_exists or is_saved) else tk.DISABLED)
         self.reuse_btn.config(state=tk.NORMAL)
 
+    @staticmethod
+    def _local_preview_path(entry: dict, touch: bool = True) -> str | None:
+        """手元にある試聴用の音声（なければ None）
+
+        一括生成の候補は preview_path、それ以外はプレビューストア（候補の音声 → 試聴済みの音声）、
+        最後に以前のバージョンの保存先を探す。ストアの最終利用時刻は touch=True（再生時）だけ更新する。
+        """
+        voice_id = entry.get("voice_id", "")
+        preview_path = entry.get("preview_path")
+        if preview_path and os.path.exists(preview_path):
+            return preview_path
+        if voice_id:
+            store = get_preview_store()
+            path = store.get(voice_id, touch=touch) or store.get(voice_id, HISTORY_SAMPLE_TEXT, touch=touch)
+            if path:
+                return path
+        legacy = os.path.join(PREVIEW_DIR, f"{voice_id}.mp3")
+        return legacy if voice_id and os.path.exists(legacy) else None
+
     def _play_voice(self):
         if not self.selected_entry:
             return
@@ -879,8 +909,8 @@ class VoiceHistoryTab:
             return
 
         # ローカルにプレビュー音声があればそれを再生
-        local_path = os.path.join(PREVIEW_DIR, f"{voice_id}.mp3")
-        if os.path.exists(local_path):
+        local_path = self._local_preview_path(self.selected_entry)
+        if local_path:
             os.startfile(local_path)
             self.log(f"ローカル再生: {voice_id[:12]}...")
             return
@@ -894,16 +924,14 @@ class VoiceHistoryTab:
                 client = get_elevenlabs_client()
                 audio = client.text_to_speech.convert(
                     voice_id=voice_id,
-                    text="こんにちは先生！今日はいい天気ですね！",
+                    text=HISTORY_SAMPLE_TEXT,
                     model_id="eleven_v3",
                     language_code="ja",
                     output_format="mp3_44100_128",
                 )
-                tmp = tempfile.NamedTemporaryFile(suffix=".mp3", prefix="history_", delete=False)
-                for chunk in audio:
-                    tmp.write(chunk)
-                tmp.close()
-                os.startfile(tmp.name)
+                # 次回からは API を呼ばずに再生できるようストアに保存する
+                path = get_preview_store().put(voice_id, b"".join(audio), HISTORY_SAMPLE_TEXT)
+                os.startfile(path)
                 self.log("再生開始")
             except Exception as e:
                 err = str(e)
@@ -1017,6 +1045,9 @@ proc ::ttk::combobox::PlacePopdown {cb popdown} {
 def main():
     root = tk.Tk()
     app = MainApp(root)
+    if os.environ.get("STARTUP_BENCH"):
+        # 起動時間の計測用（cli/bench_startup.py）: 画面を作り終えたら閉じる
+        root.after(1, root.destroy)
     root.mainloop()
 
 